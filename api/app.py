@@ -1,69 +1,616 @@
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from werkzeug.exceptions import HTTPException, UnsupportedMediaType
+import functools
 import numpy as np
-import pandas as pd
 import os
-import lightgbm 
+import sys
+import time
+import uuid
+
+# Permet de lancer l'API aussi bien via "gunicorn api.app:app" que "python api/app.py"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import metrics
+from api.audit import AuditLog
+from api.batcher import MicroBatcher
+from api.drift import DriftMonitor
+from api.cache import PredictionCache
+from api.metrics import stage
+from api.inference import FEATURE_NAMES, N_FEATURES, as_matrix, format_result
+from api.registry import load_registry
+from api.stream import NDJSON, iter_lines, score_stream
+from api.wire import OCTET_STREAM, decode_features, encode_probabilities, is_binary
 
 app = Flask(__name__)
 
 # --- CONFIGURATION ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, '..', 'models', 'best_model.pkl')
-SCALER_PATH = os.path.join(BASE_DIR, '..', 'models', 'scaler.pkl')
+MODELS_DIR = os.path.join(BASE_DIR, '..', 'models')
+MODEL_PATH = os.path.join(MODELS_DIR, 'best_model.pkl')
+SCALER_PATH = os.path.join(MODELS_DIR, 'scaler.pkl')
+
+# Format des artefacts : "native" (best_model.txt + scaler_params.npy, cf. scripts/export_model.py),
+# "pickle" (.pkl) ou "auto" (natif s'il existe et est à jour, sinon pickle)
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "auto")
+
+# Nombre max de lignes acceptées par /predict_batch (configurable par variable d'env)
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "10000"))
+
+# Moteur d'inférence : "lightgbm" (booster natif) ou "flat" (tableaux numpy, api/tree_engine.py,
+# limité aux lots d'au plus FLAT_MAX_ROWS lignes, 1 par défaut ; au-delà, booster LightGBM)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "lightgbm")
+
+# Threads OpenMP de chaque appel LightGBM (0 = réglage du modèle) ; fixé avec le nombre de
+# workers et de threads par gunicorn.conf.py (api/topology.py)
+MODEL_NUM_THREADS = int(os.environ.get("MODEL_NUM_THREADS", "0"))
+
+# Micro-batching de /predict : fenêtre d'attente (ms, 0 = désactivé) et taille max d'un lot.
+# Utile avec des workers multi-threads (gunicorn --threads) qui reçoivent des requêtes concurrentes.
+MICROBATCH_WINDOW_MS = float(os.environ.get("MICROBATCH_WINDOW_MS", "0"))
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_TIMEOUT_S = 10.0
+
+# Cache LRU des prédictions (nombre d'entrées, 0 = désactivé) et durée de vie des entrées
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "0"))
+PREDICTION_CACHE_TTL_S = float(os.environ.get("PREDICTION_CACHE_TTL_S", "300"))
+
+# Nombre de contributions renvoyées par défaut par /explain et /explain_batch
+EXPLAIN_TOP_K = int(os.environ.get("EXPLAIN_TOP_K", "5"))
+
+# Taille des blocs scorés par /predict_stream (mémoire bornée à un bloc par connexion)
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "1024"))
+
+# Journal d'audit des prédictions (dossier, vide = désactivé), écrit en différé par un thread :
+# taille de la file, intervalle d'écriture, politique fsync (always/rotate/never), taille des segments
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", "")
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_FLUSH_INTERVAL_S = float(os.environ.get("AUDIT_FLUSH_INTERVAL_S", "1.0"))
+AUDIT_FSYNC = os.environ.get("AUDIT_FSYNC", "rotate")
+AUDIT_SEGMENT_MB = int(os.environ.get("AUDIT_SEGMENT_MB", "64"))
+
+# Suivi de dérive des features face au scaler d'entraînement (toujours actif par défaut) :
+# lignes par fenêtre, nombre de fenêtres glissantes et valeurs observées avant toute alerte
+DRIFT_MONITOR = os.environ.get("DRIFT_MONITOR", "1") == "1"
+DRIFT_WINDOW_ROWS = int(os.environ.get("DRIFT_WINDOW_ROWS", "10000"))
+DRIFT_WINDOWS = int(os.environ.get("DRIFT_WINDOWS", "6"))
+DRIFT_MIN_ROWS = int(os.environ.get("DRIFT_MIN_ROWS", "1000"))
 
-FEATURE_NAMES = [f"var_{i}" for i in range(200)]
+# En-tête Server-Timing (détail des étapes) sur toutes les réponses, ou à la demande
+# via l'en-tête de requête "X-Server-Timing: 1"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# Version servie au démarrage (défaut : celle de models/registry.json, sinon "default")
+MODEL_VERSION = os.environ.get("MODEL_VERSION") or None
+
+# Tiers de modèle sélectionnables par requête (en-tête X-Model-Tier ou ?tier=) : "fast" sert la
+# variante compacte de la version active (scripts/build_compact_model.py), pour le pré-filtrage ;
+# sans variante compacte, la requête est servie par le modèle complet (en-tête de réponse X-Model-Tier)
+MODEL_TIERS = ('full', 'fast')
+
+# Jeton exigé (en-tête X-Admin-Token) par les routes /admin/* ; sans jeton, seules
+# les requêtes locales (127.0.0.1) sont acceptées
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
 # --- CHARGEMENT ---
-model = None
-scaler = None
+# Fait une seule fois à l'import : avec gunicorn --preload (gunicorn.conf.py), dans le
+# master, puis partagé en copy-on-write par les workers forkés. Les versions suivantes
+# sont chargées à chaud par chaque worker (api/registry.py).
+registry = load_registry(MODELS_DIR, MODEL_FORMAT, INFERENCE_BACKEND, MODEL_VERSION, MODEL_NUM_THREADS)
+
+# --- SCORING ---
+def score_matrix(features):
+    """Score un lot de lignes (N x 200) en une seule passe scaler + modèle.
+
+    Renvoie un tableau numpy des probabilités de la classe 1.
+    """
+    metrics.rows_scored_total.inc(len(features))
+    probabilities = registry.active.scorer.predict_proba(features)
+    # Échantillon rejoué sur la version fantôme, hors du chemin de la réponse
+    registry.submit_shadow(features, probabilities)
+    return probabilities
+
+
+batcher = None
+if MICROBATCH_WINDOW_MS > 0:
+    batcher = MicroBatcher(score_matrix, MICROBATCH_WINDOW_MS, MICROBATCH_MAX_SIZE)
+    print(f"🧺 Micro-batching actif ({MICROBATCH_WINDOW_MS} ms, {MICROBATCH_MAX_SIZE} lignes max)")
+
+# Clés préfixées par la version active : une bascule de version ne sert jamais
+# d'anciennes prédictions. Vidé aussi si le modèle ou le scaler chargé est réécrit.
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S,
+                                       watch_paths=registry.active.paths if registry.active else ())
+
+
+audit_log = None
+if AUDIT_LOG_DIR:
+    audit_log = AuditLog(AUDIT_LOG_DIR, AUDIT_QUEUE_SIZE, AUDIT_FLUSH_INTERVAL_S,
+                         segment_max_bytes=AUDIT_SEGMENT_MB << 20, fsync=AUDIT_FSYNC)
+    print(f"📝 Journal d'audit actif : {AUDIT_LOG_DIR} (fsync : {AUDIT_FSYNC})")
+
+
+drift_monitor = None
+
+
+def get_drift_monitor():
+    """Moniteur de dérive de la version active (recréé si la version change)."""
+    global drift_monitor
+    active = registry.active
+    if drift_monitor is None or drift_monitor.version != active.tag:
+        drift_monitor = DriftMonitor.for_version(active, DRIFT_WINDOW_ROWS, DRIFT_WINDOWS, DRIFT_MIN_ROWS)
+    return drift_monitor
+
+
+def observe_scored(features, probabilities, tier='full'):
+    """Lignes scorées de la requête courante : suivi de dérive + journal d'audit (en différé).
+
+    Les lignes réduites aux colonnes du tier "fast" sont journalisées replacées dans le
+    schéma complet (NaN hors des colonnes compactes) mais pas suivies en dérive.
+    """
+    if features.shape[1] != N_FEATURES:
+        features = registry.active.compact.expand(features)
+    elif DRIFT_MONITOR:
+        get_drift_monitor().observe(features)
+    if audit_log:
+        latency_ms = (time.perf_counter() - g.request_started) * 1000.0
+        version = registry.active.tag if tier == 'full' else f'{registry.active.tag}#{tier}'
+        audit_log.record(request.path, features, probabilities, version, latency_ms, g.request_id)
+
+
+def score_rows(features, score_fn=score_matrix):
+    """Score les lignes en passant par le cache de prédictions s'il est actif."""
+    if prediction_cache:
+        return prediction_cache.score(features, score_fn, namespace=registry.active.tag.encode())
+    return score_fn(features)
+
+
+def score_fast(features, version):
+    """Score les lignes sur la variante compacte de `version` (cache séparé, pas de fantôme)."""
+    def score_fn(rows):
+        metrics.fast_rows_scored_total.inc(len(rows))
+        return version.compact.predict_proba(rows)
+
+    if prediction_cache:
+        return prediction_cache.score(features, score_fn, namespace=f'fast:{version.tag}'.encode())
+    return score_fn(features)
+
+
+def read_tier():
+    """Version active si le tier "fast" est demandé et disponible, None sinon (modèle complet)."""
+    tier = (request.headers.get('X-Model-Tier') or request.args.get('tier') or 'full').lower()
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Tier inconnu : {tier} ({', '.join(MODEL_TIERS)})")
+    version = registry.active
+    fast = version if tier == 'fast' and version.compact is not None else None
+    g.model_tier = 'fast' if fast else 'full'
+    return fast
+
+
+def score_single(features):
+    """Score une ligne via le micro-batcher s'il est actif."""
+    return [batcher.predict(features[0], timeout=MICROBATCH_TIMEOUT_S)]
+
+
+def json_float(x):
+    """float JSON strict : NaN / ±inf (feature manquante...) deviennent null."""
+    x = float(x)
+    return x if np.isfinite(x) else None
+
+
+def explain_rows(features, top_k):
+    """Probabilité et top_k contributions (|valeur| décroissante) de chaque ligne.
+
+    Les contributions passent par le cache de prédictions (namespace séparé) :
+    une demande d'explication répétée ne recalcule pas TreeSHAP.
+    """
+    version = registry.active
+    if prediction_cache:
+        contrib = prediction_cache.score(features, version.scorer.contributions,
+                                         namespace=f'contrib:{version.tag}'.encode())
+    else:
+        contrib = version.scorer.contributions(features)
+    per_feature, base = contrib[:, :-1], contrib[:, -1]
+    probabilities = 1.0 / (1.0 + np.exp(-contrib.sum(axis=1)))
+
+    top_k = max(1, min(top_k, per_feature.shape[1]))
+    top = np.argpartition(-np.abs(per_feature), top_k - 1, axis=1)[:, :top_k]
+    top_values = np.take_along_axis(per_feature, top, axis=1)
+    order = np.argsort(-np.abs(top_values), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+
+    results = []
+    for i in range(len(features)):
+        result = format_result(probabilities[i])
+        result['base_value'] = float(base[i])
+        result['contributions'] = [{
+            'feature': FEATURE_NAMES[j],
+            'value': json_float(features[i, j]),
+            'contribution': json_float(per_feature[i, j]),
+        } for j in top[i]]
+        results.append(result)
+    return results
+
+
+def read_top_k():
+    data = request.get_json(silent=True) or {}
+    return int(data.get('top_k', request.args.get('top_k', EXPLAIN_TOP_K)))
+
+
+def read_features(fast=None):
+    """Lit la matrice de features de la requête (JSON, octets bruts ou .npy).
+
+    Tier "fast" avec l'en-tête X-Feature-Set: compact (ou ?feature_set=compact) : chaque
+    ligne ne contient que les colonnes de la variante compacte, dans son ordre.
+    """
+    n_features = N_FEATURES
+    if fast and (request.headers.get('X-Feature-Set') or request.args.get('feature_set')) == 'compact':
+        n_features = fast.compact.n_columns
+    if is_binary(request.mimetype):
+        dtype = request.headers.get('X-Dtype') or request.args.get('dtype', 'float32')
+        return decode_features(request.get_data(cache=False), request.mimetype, dtype, n_features)
+    features = read_json().get('features')
+    if not isinstance(features, list) or len(features) == 0:
+        raise ValueError("'features' doit être une ligne ou une liste non vide de lignes")
+    return as_matrix(features, n_features)
+
+
+def read_json():
+    """Corps JSON (objet) de la requête : 415 si ce n'est pas du JSON, ValueError (400) s'il est invalide."""
+    if not request.is_json:
+        raise UnsupportedMediaType(f"Content-Type non supporté : {request.mimetype or 'absent'}")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Corps JSON invalide : objet attendu")
+    return data
+
+
+def wants_binary():
+    """Le client demande-t-il les probabilités en float32 brut ?"""
+    return request.accept_mimetypes.best == OCTET_STREAM
+
+
+def binary_response(probabilities):
+    return Response(encode_probabilities(probabilities), mimetype=OCTET_STREAM,
+                    headers={'X-Rows': str(len(probabilities)), 'X-Dtype': 'float32'})
+
+
+def model_unavailable():
+    """Réponse 503 si aucune version n'est chargée (None sinon)."""
+    if registry.active:
+        return None
+    return jsonify({'error': 'Model not loaded', 'detail': registry.error}), 503
+
+
+def scoring_endpoint(error_message):
+    """Décorateur des routes de scoring : réponses d'erreur communes.
+
+    503 sans modèle chargé, ValueError -> 400, erreurs HTTP (415, 413...) laissées à
+    http_error(), toute autre exception journalisée sous error_message -> 500.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            unavailable = model_unavailable()
+            if unavailable:
+                return unavailable
+            try:
+                return view(*args, **kwargs)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except HTTPException:
+                raise  # statut propre à l'erreur, cf. http_error()
+            except Exception as e:
+                app.logger.exception(error_message)
+                return jsonify({'error': str(e)}), 500
+        return wrapper
+    return decorator
+
+
+def admin_denied():
+    """Réponse 403 si l'appelant n'est pas autorisé sur /admin/* (None sinon)."""
+    if ADMIN_TOKEN:
+        allowed = request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    else:
+        allowed = request.remote_addr in ('127.0.0.1', '::1')
+    return None if allowed else (jsonify({'error': 'Forbidden'}), 403)
+
+
+# --- INSTRUMENTATION ---
+@app.before_request
+def start_timer():
+    metrics.begin_request()
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    # Nouvelle version publiée dans models/registry.json ? (un stat toutes les 2 s au plus)
+    registry.refresh()
+
+
+@app.after_request
+def record_request(response):
+    timer = metrics.end_request()
+    endpoint = request.endpoint or 'unknown'
+    metrics.requests_total.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 400:
+        metrics.errors_total.inc(endpoint=endpoint)
+    if timer is not None:
+        metrics.request_seconds.observe(time.perf_counter() - timer.started, endpoint=endpoint)
+        if SERVER_TIMING or request.headers.get('X-Server-Timing') == '1':
+            response.headers['Server-Timing'] = timer.server_timing()
+    if audit_log:
+        response.headers['X-Request-ID'] = g.request_id
+    if 'model_tier' in g:
+        response.headers['X-Model-Tier'] = g.model_tier
+    return response
+
+
+@app.errorhandler(HTTPException)
+def http_error(e):
+    """Erreurs HTTP (415, 413, 404...) en JSON, comme les autres réponses d'erreur de l'API."""
+    return jsonify({'error': e.description}), e.code
 
-try:
-    print("🔄 Chargement du modèle et du scaler...")
-    scaler = joblib.load(SCALER_PATH)
-    model = joblib.load(MODEL_PATH)
-    print(f"✅ Modèle LightGBM chargé avec succès !")
-except Exception as e:
-    print(f"⚠️ ERREUR CRITIQUE : {e}")
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'API online', 'backend': 'LightGBM'})
+    active = registry.active
+    return jsonify({
+        'status': 'API online',
+        'backend': 'LightGBM',
+        'engine': active.scorer.backend if active else None,
+        'parity_error': active.scorer.parity_error if active else None,
+        'version': active.tag if active else None
+    })
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """200 dès que le modèle est chargé (sondé par start.sh), 503 sinon."""
+    active = registry.active
+    if not active:
+        return jsonify({'ready': False, 'error': 'Model not loaded', 'detail': registry.error}), 503
+    return jsonify({'ready': True, 'engine': active.scorer.backend, 'version': active.tag,
+                    'parity_error': active.scorer.parity_error, 'load_ms': active.load_seconds * 1000,
+                    'fast_tier': active.compact.feature_names if active.compact else None})
 
 @app.route('/predict', methods=['POST'])
+@scoring_endpoint("Erreur de prédiction")
 def predict():
-    if not model:
-        return jsonify({'error': 'Model not loaded'}), 500
-    
-    try:
-        data = request.get_json()
-        features = data.get('features')
-        
-        # 1. Création d'un DataFrame avec les noms de colonnes (Fix du Warning)
-        # On s'assure que c'est une liste de listes (2D)
-        features_df = pd.DataFrame([features], columns=FEATURE_NAMES)
-        
-        # 2. Scaling (Le scaler renvoie un numpy array, on le remet en DF)
-        features_scaled = scaler.transform(features_df)
-        # LightGBM veut un dataframe si on veut garder les noms, 
-        # mais le scaler a enlevé les noms. On les remet.
-        features_scaled_df = pd.DataFrame(features_scaled, columns=FEATURE_NAMES)
-        
-        # 3. Prédiction
-        prediction_binary = model.predict(features_scaled_df)[0]
-        probability = model.predict_proba(features_scaled_df)[0][1]
-        
+    # Buffer numpy contigu (1 x 200) : ni DataFrame, ni double passe predict/predict_proba
+    with stage('parse'):
+        fast = read_tier()
+        features = read_features(fast)
+    if len(features) != 1:
+        return jsonify({'error': '/predict attend une seule ligne (voir /predict_batch)'}), 400
+    if fast:
+        probability = score_fast(features, fast)[0]
+    else:
+        # Si absente du cache, regroupée avec les autres requêtes concurrentes du worker
+        probability = score_rows(features, score_single if batcher else score_matrix)[0]
+    observe_scored(features, [probability], g.model_tier)
+
+    with stage('serialize'):
+        if wants_binary():
+            return binary_response([probability])
+        return jsonify(format_result(probability))
+
+@app.route('/predict_batch', methods=['POST'])
+@scoring_endpoint("Erreur de prédiction batch")
+def predict_batch():
+    """Score N lignes en un seul appel.
+
+    Corps JSON {"features": [[200 floats], ...]}, ou binaire (octets float32/float64
+    bruts, .npy) ; réponse JSON ou float32 bruts si Accept: application/octet-stream.
+    X-Model-Tier: fast (ou ?tier=fast) score le lot sur la variante compacte.
+    """
+    with stage('parse'):
+        fast = read_tier()
+        features = read_features(fast)
+    if len(features) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch trop grand ({len(features)} > {MAX_BATCH_SIZE})'}), 413
+
+    # Une seule passe vectorisée pour tout le lot
+    probabilities = score_fast(features, fast) if fast else score_rows(features)
+    observe_scored(features, probabilities, g.model_tier)
+
+    with stage('serialize'):
+        if wants_binary():
+            return binary_response(probabilities)
         return jsonify({
-            'prediction': int(prediction_binary),
-            'probability': float(probability),
-            'risk_level': 'High' if probability > 0.5 else 'Low',
-            'message': 'Transaction Suspecte' if probability > 0.5 else 'Transaction Normale'
+            'count': len(probabilities),
+            'results': [format_result(p) for p in probabilities]
         })
 
-    except Exception as e:
-        # En cas d'erreur, on l'affiche dans le terminal de l'API
-        print(f"Erreur de prédiction : {e}")
-        return jsonify({'error': str(e)}), 500
+@app.route('/explain', methods=['POST'])
+@scoring_endpoint("Erreur d'explication")
+def explain():
+    """Top-K des contributions TreeSHAP (log-odds) d'une ligne : codes motifs d'une décision.
+
+    Corps : {"features": [200 floats], "top_k": 5}. Une contribution positive pousse
+    vers la classe 1 (refus) ; base_value + somme de toutes les contributions = logit.
+    """
+    with stage('parse'):
+        features = read_features()
+        top_k = read_top_k()
+    if len(features) != 1:
+        return jsonify({'error': '/explain attend une seule ligne (voir /explain_batch)'}), 400
+    result = explain_rows(features, top_k)[0]
+    observe_scored(features, [result['probability']])
+    with stage('serialize'):
+        return jsonify(result)
+
+@app.route('/explain_batch', methods=['POST'])
+@scoring_endpoint("Erreur d'explication batch")
+def explain_batch():
+    """Version lot d'/explain : {"features": [[200 floats], ...], "top_k": 5}."""
+    with stage('parse'):
+        features = read_features()
+        top_k = read_top_k()
+    if len(features) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch trop grand ({len(features)} > {MAX_BATCH_SIZE})'}), 413
+    results = explain_rows(features, top_k)
+    observe_scored(features, [r['probability'] for r in results])
+    with stage('serialize'):
+        return jsonify({'count': len(results), 'results': results})
+
+@app.route('/predict_stream', methods=['POST'])
+@scoring_endpoint("Erreur de prédiction en flux")
+def predict_stream():
+    """Score un corps NDJSON (une ligne de features par enregistrement) et renvoie un flux NDJSON.
+
+    Lecture, scoring par blocs de STREAM_CHUNK_SIZE lignes et écriture sont entrelacés :
+    la mémoire ne dépend pas de la taille du corps. Le cache de prédictions est ignoré
+    (des millions de lignes uniques ne feraient que le vider).
+    """
+    def score_chunk(features):
+        probabilities = score_matrix(features)
+        observe_scored(features, probabilities)
+        return probabilities
+
+    results = score_stream(iter_lines(request.stream), score_chunk, STREAM_CHUNK_SIZE)
+    return Response(stream_with_context(results), mimetype=NDJSON)
+
+@app.route('/sensitivity', methods=['POST'])
+@scoring_endpoint("Erreur de sensibilité")
+def sensitivity():
+    """Effet d'une perturbation +delta sur chaque feature d'une liste, en un seul appel vectorisé.
+
+    Corps : {"features": [200 floats], "indices": [139, 81, ...], "delta": 0.35}
+    Réponse : probabilité de base et écart signé de probabilité pour chaque indice.
+    """
+    data = read_json()
+    base = as_matrix(data.get('features'))
+    if len(base) != 1:
+        return jsonify({'error': "'features' doit être une seule ligne"}), 400
+    indices = [int(i) for i in data.get('indices', [])]
+    if any(i < 0 or i >= base.shape[1] for i in indices):
+        return jsonify({'error': f'Indices hors de [0, {base.shape[1] - 1}]'}), 400
+    if len(indices) + 1 > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Trop d\'indices ({len(indices)})'}), 413
+    delta = float(data.get('delta', 0.35))
+
+    # Ligne 0 = base, ligne k = base avec +delta sur indices[k-1]
+    rows = np.repeat(base, len(indices) + 1, axis=0)
+    rows[np.arange(1, len(indices) + 1), indices] += delta
+    probabilities = score_rows(rows)
+
+    return jsonify({
+        'base_probability': float(probabilities[0]),
+        'delta': delta,
+        'indices': indices,
+        'deltas': (probabilities[1:] - probabilities[0]).tolist()
+    })
+
+@app.route('/stats/batcher', methods=['GET'])
+def batcher_stats():
+    """Distribution des tailles de lot et des délais d'attente du micro-batching."""
+    if not batcher:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **batcher.stats()})
+
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    """Compteurs hit/miss du cache de prédictions."""
+    if not prediction_cache:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **prediction_cache.stats()})
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """Version active, version fantôme (et son écart avec l'active), versions disponibles."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify(registry.stats())
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Active une version (ou recharge l'active) sans interruption : {"version": "v2"}.
+
+    La demande est écrite dans models/registry.json : ce worker charge la version
+    en arrière-plan et les autres la récupèrent à leur prochaine requête.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    current = registry.active.name if registry.active else None
+    try:
+        started = registry.request(version=data.get('version') or current or 'default')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'started': started, **registry.stats()}), 202
+
+@app.route('/admin/shadow', methods=['POST'])
+def admin_shadow():
+    """Scoring fantôme : {"version": "v3", "fraction": 0.05} ; {"version": null} le désactive."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    try:
+        fraction = float(data.get('fraction', 0.1))
+        if not 0.0 <= fraction <= 1.0:
+            raise ValueError("'fraction' doit être dans [0, 1]")
+        started = registry.request(shadow=data.get('version'), fraction=fraction)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'started': started, **registry.stats()}), 202
+
+@app.route('/drift', methods=['GET'])
+def drift():
+    """Dérive des features sur la fenêtre glissante du worker : PSI, z-shift, variance relative."""
+    if not DRIFT_MONITOR:
+        return jsonify({'enabled': False})
+    unavailable = model_unavailable()
+    if unavailable:
+        return unavailable
+    monitor = get_drift_monitor()
+    top_k = int(request.args.get('top_k', 10))
+    return jsonify({'enabled': True, 'version': monitor.version, **monitor.report(top_k, FEATURE_NAMES)})
+
+@app.route('/stats/audit', methods=['GET'])
+def audit_stats():
+    """Compteurs du journal d'audit (lignes écrites, délestées, profondeur de file)."""
+    if not audit_log:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **audit_log.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métriques du worker au format texte Prometheus."""
+    lines = [metrics.registry.render()]
+    extra = metrics.MetricsRegistry()
+    if prediction_cache:
+        gauge = extra.gauge('api_prediction_cache', 'Statistiques du cache de prédictions')
+        for key, value in prediction_cache.stats().items():
+            gauge.set(value, stat=key)
+    if batcher:
+        gauge = extra.gauge('api_microbatch', 'Statistiques du micro-batching')
+        for key in ('batches', 'rows', 'mean_batch_size', 'mean_queue_delay_ms'):
+            gauge.set(batcher.stats()[key], stat=key)
+    if audit_log:
+        gauge = extra.gauge('api_audit', "Journal d'audit des prédictions")
+        for key, value in audit_log.stats().items():
+            if key not in ('fsync', 'segment'):
+                gauge.set(value, stat=key)
+    if DRIFT_MONITOR and registry.active:
+        report = get_drift_monitor().report(top_k=0)
+        gauge = extra.gauge('api_drift', 'Dérive des features (fenêtre glissante du worker)')
+        gauge.set(report['rows'], stat='rows')
+        if report['rows']:
+            gauge.set(report['max_psi'], stat='max_psi')
+            gauge.set(report['mean_psi'], stat='mean_psi')
+            gauge.set(len(report['alerts']), stat='alerts')
+    model_info = extra.gauge('api_model_info', 'Versions chargées (role="active" ou "shadow")')
+    for role, version in (('active', registry.active), ('shadow', registry.shadow)):
+        if version:
+            model_info.set(1, role=role, version=version.tag)
+    shadow = registry.stats()['shadow']
+    if shadow:
+        gauge = extra.gauge('api_shadow', 'Comparaison de la version fantôme avec la version active')
+        for key in ('fraction', 'rows', 'dropped', 'errors', 'mean_abs_diff', 'max_abs_diff', 'disagreement_rate'):
+            gauge.set(shadow[key], stat=key)
+    lines.append(extra.render())
+    return Response(''.join(lines), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     # ⚠️ IMPORTANT : use_reloader=False empêche l'API de redémarrer en boucle
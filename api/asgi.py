@@ -0,0 +1,323 @@
+"""Point d'entrée ASGI (Starlette) de l'API : même contrat /health, /ready et /predict que api/app.py.
+
+Les entrées/sorties des requêtes (lecture du corps, écriture de la réponse) se font
+sur la boucle asyncio : un client lent n'occupe qu'une coroutine, pas un worker.
+Seul le scoring, CPU, part dans un pool de threads borné (LightGBM et numpy
+relâchent le GIL pendant le calcul).
+
+Contrôle d'admission : au plus ASGI_MAX_PENDING scorings en file ou en cours par
+process ; au-delà, la requête est rejetée immédiatement (503 + Retry-After) au lieu
+d'allonger la file et la latence de toutes les autres. Une place n'est rendue qu'à la
+fin du calcul, même si le client s'est déconnecté entre-temps.
+
+Mêmes crochets que /predict de api/app.py, configurés par les mêmes variables :
+cache de prédictions, scoring fantôme, suivi de dérive et journal d'audit.
+
+Lancement : uvicorn api.asgi:app --host 127.0.0.1 --port 5000 [--workers N]
+         ou python api/asgi.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Permet de lancer l'API aussi bien via "uvicorn api.asgi:app" que "python api/asgi.py"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import metrics
+from api.audit import AuditLog
+from api.cache import PredictionCache
+from api.drift import DriftMonitor
+from api.inference import as_matrix, format_result
+from api.registry import load_registry
+from api.topology import available_cpus
+from api.wire import OCTET_STREAM, decode_features, encode_probabilities, is_binary
+
+# --- CONFIGURATION ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, '..', 'models')
+
+# Mêmes variables que api/app.py pour le modèle servi
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "auto")
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "lightgbm")
+MODEL_VERSION = os.environ.get("MODEL_VERSION") or None
+MODEL_NUM_THREADS = int(os.environ.get("MODEL_NUM_THREADS", "0"))
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "0"))
+PREDICTION_CACHE_TTL_S = float(os.environ.get("PREDICTION_CACHE_TTL_S", "300"))
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", "")
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_FLUSH_INTERVAL_S = float(os.environ.get("AUDIT_FLUSH_INTERVAL_S", "1.0"))
+AUDIT_FSYNC = os.environ.get("AUDIT_FSYNC", "rotate")
+AUDIT_SEGMENT_MB = int(os.environ.get("AUDIT_SEGMENT_MB", "64"))
+DRIFT_MONITOR = os.environ.get("DRIFT_MONITOR", "1") == "1"
+DRIFT_WINDOW_ROWS = int(os.environ.get("DRIFT_WINDOW_ROWS", "10000"))
+DRIFT_WINDOWS = int(os.environ.get("DRIFT_WINDOWS", "6"))
+DRIFT_MIN_ROWS = int(os.environ.get("DRIFT_MIN_ROWS", "1000"))
+
+# Threads de scoring (défaut : un par cœur utilisable) et nombre max de scorings en file ou en cours
+ASGI_INFERENCE_THREADS = int(os.environ.get("ASGI_INFERENCE_THREADS", str(available_cpus())))
+ASGI_MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", str(16 * ASGI_INFERENCE_THREADS)))
+# Taille max d'un corps de requête /predict (une ligne de 200 features : quelques Ko)
+ASGI_MAX_BODY_BYTES = int(os.environ.get("ASGI_MAX_BODY_BYTES", str(64 << 10)))
+# Délai conseillé au client après un rejet 503 (en-tête Retry-After, secondes)
+ASGI_RETRY_AFTER_S = os.environ.get("ASGI_RETRY_AFTER_S", "1")
+
+
+# --- CHARGEMENT ---
+registry = load_registry(MODELS_DIR, MODEL_FORMAT, INFERENCE_BACKEND, MODEL_VERSION, MODEL_NUM_THREADS)
+
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S,
+                                       watch_paths=registry.active.paths if registry.active else ())
+
+audit_log = None
+if AUDIT_LOG_DIR:
+    audit_log = AuditLog(AUDIT_LOG_DIR, AUDIT_QUEUE_SIZE, AUDIT_FLUSH_INTERVAL_S,
+                         segment_max_bytes=AUDIT_SEGMENT_MB << 20, fsync=AUDIT_FSYNC)
+    print(f"📝 Journal d'audit actif : {AUDIT_LOG_DIR} (fsync : {AUDIT_FSYNC})")
+
+drift_monitor = None
+
+
+def get_drift_monitor():
+    """Moniteur de dérive de la version active (recréé si la version change)."""
+    global drift_monitor
+    active = registry.active
+    if drift_monitor is None or drift_monitor.version != active.tag:
+        drift_monitor = DriftMonitor.for_version(active, DRIFT_WINDOW_ROWS, DRIFT_WINDOWS, DRIFT_MIN_ROWS)
+    return drift_monitor
+
+
+class Admission:
+    """Borne le nombre de scorings en file ou en cours ; au-delà, rejet immédiat.
+
+    Manipulé uniquement depuis la boucle asyncio : pas de verrou.
+    """
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.pending = 0
+        self.peak = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def try_acquire(self):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return False
+        self.pending += 1
+        self.admitted += 1
+        self.peak = max(self.peak, self.pending)
+        return True
+
+    def release(self):
+        self.pending -= 1
+
+    def stats(self):
+        return {'pending': self.pending, 'max_pending': self.max_pending, 'peak': self.peak,
+                'admitted': self.admitted, 'rejected': self.rejected}
+
+
+# Créés au démarrage de la boucle (un jeu par worker uvicorn)
+executor = None
+admission = Admission(ASGI_MAX_PENDING)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global executor
+    executor = ThreadPoolExecutor(ASGI_INFERENCE_THREADS, thread_name_prefix='scoring')
+    print(f"🧵 Scoring : {ASGI_INFERENCE_THREADS} thread(s), {ASGI_MAX_PENDING} requête(s) en attente max")
+    try:
+        yield
+    finally:
+        executor.shutdown(wait=True)
+        # uvicorn relance SIGTERM après l'arrêt : les handlers atexit ne s'exécutent pas
+        if audit_log:
+            audit_log.close()
+
+
+# --- HELPERS ---
+def error(message, status, headers=None):
+    return JSONResponse({'error': message}, status_code=status, headers=headers)
+
+
+async def read_body(request, limit=ASGI_MAX_BODY_BYTES):
+    """Corps de la requête, lu sur la boucle par morceaux ; None s'il dépasse `limit` octets."""
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > limit:
+        return None
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def parse_features(body, request):
+    """Matrice de features du corps (JSON, octets bruts ou .npy), comme api/app.read_features."""
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip()
+    if is_binary(mimetype):
+        dtype = request.headers.get('x-dtype') or request.query_params.get('dtype', 'float32')
+        return decode_features(body, mimetype, dtype)
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ValueError("Corps JSON invalide")
+    features = data.get('features') if isinstance(data, dict) else None
+    if not isinstance(features, list) or len(features) == 0:
+        raise ValueError("'features' doit être une ligne ou une liste non vide de lignes")
+    return as_matrix(features)
+
+
+def score_rows(version, features):
+    """Scoring (thread du pool) via le cache de prédictions ; échantillon rejoué sur la version fantôme."""
+    def score_fn(rows):
+        metrics.rows_scored_total.inc(len(rows))
+        probabilities = version.scorer.predict_proba(rows)
+        registry.submit_shadow(rows, probabilities)
+        return probabilities
+
+    if prediction_cache:
+        return prediction_cache.score(features, score_fn, namespace=version.tag.encode())
+    return score_fn(features)
+
+
+def _scored(future):
+    """Fin du calcul (boucle asyncio) : place d'admission rendue, erreur d'un client parti lue."""
+    admission.release()
+    if not future.cancelled():
+        future.exception()
+
+
+async def score(version, features):
+    """Score sur le pool borné ; None si la file d'admission est pleine (rejet immédiat).
+
+    La place est rendue à la fin du calcul, pas de l'attente : si le client se déconnecte,
+    la coroutine est annulée (shield) mais le thread continue de scorer et reste compté.
+    """
+    if not admission.try_acquire():
+        return None
+    try:
+        future = asyncio.get_running_loop().run_in_executor(executor, score_rows, version, features)
+    except BaseException:
+        admission.release()
+        raise
+    future.add_done_callback(_scored)
+    return await asyncio.shield(future)
+
+
+def observe_scored(request, features, probabilities, version, started):
+    """Lignes scorées : suivi de dérive + journal d'audit (en différé), comme api/app.py."""
+    if DRIFT_MONITOR:
+        get_drift_monitor().observe(features)
+    if audit_log:
+        request_id = request.headers.get('x-request-id') or uuid.uuid4().hex
+        audit_log.record(request.url.path, features, probabilities, version.tag,
+                         (time.perf_counter() - started) * 1000.0, request_id)
+
+
+def record(endpoint, status, started):
+    metrics.requests_total.inc(endpoint=endpoint, status=status)
+    if status >= 400:
+        metrics.errors_total.inc(endpoint=endpoint)
+    metrics.request_seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+
+
+# --- ROUTES ---
+async def health_check(request):
+    active = registry.active
+    return JSONResponse({
+        'status': 'API online',
+        'backend': 'LightGBM',
+        'engine': active.scorer.backend if active else None,
+        'parity_error': active.scorer.parity_error if active else None,
+        'version': active.tag if active else None
+    })
+
+
+async def readiness_check(request):
+    """200 dès que le modèle est chargé, 503 sinon."""
+    active = registry.active
+    if not active:
+        return JSONResponse({'ready': False, 'error': 'Model not loaded', 'detail': registry.error},
+                            status_code=503)
+    return JSONResponse({'ready': True, 'engine': active.scorer.backend, 'version': active.tag,
+                         'parity_error': active.scorer.parity_error, 'load_ms': active.load_seconds * 1000})
+
+
+async def predict(request):
+    started = time.perf_counter()
+    response = await _predict(request, started)
+    record('predict', response.status_code, started)
+    return response
+
+
+async def _predict(request, started):
+    # Nouvelle version publiée dans models/registry.json ? (un stat toutes les 2 s au plus)
+    registry.refresh()
+    if not registry.active:
+        return JSONResponse({'error': 'Model not loaded', 'detail': registry.error}, status_code=503)
+
+    body = await read_body(request)
+    if body is None:
+        return error(f'Corps trop grand (> {ASGI_MAX_BODY_BYTES} octets)', 413)
+    try:
+        features = parse_features(body, request)
+        if len(features) != 1:
+            return error('/predict attend une seule ligne', 400)
+        version = registry.active
+        probabilities = await score(version, features)
+    except ValueError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        print(f"⚠️ Erreur de prédiction : {e}")
+        return error(str(e), 500)
+    if probabilities is None:
+        return error('Overloaded', 503, {'Retry-After': ASGI_RETRY_AFTER_S})
+    observe_scored(request, features, probabilities, version, started)
+
+    if request.headers.get('accept') == OCTET_STREAM:
+        return Response(encode_probabilities(probabilities), media_type=OCTET_STREAM,
+                        headers={'X-Rows': '1', 'X-Dtype': 'float32'})
+    return JSONResponse(format_result(probabilities[0]))
+
+
+async def admission_stats(request):
+    """File d'admission du scoring : en attente, pic, admises, rejetées."""
+    return JSONResponse({'threads': ASGI_INFERENCE_THREADS, **admission.stats()})
+
+
+async def metrics_endpoint(request):
+    """Métriques du worker au format texte Prometheus."""
+    extra = metrics.MetricsRegistry()
+    gauge = extra.gauge('api_admission', "File d'admission du scoring (mode ASGI)")
+    for key, value in admission.stats().items():
+        gauge.set(value, stat=key)
+    return Response(metrics.registry.render() + extra.render(), media_type='text/plain; version=0.0.4')
+
+
+app = Starlette(routes=[
+    Route('/health', health_check, methods=['GET']),
+    Route('/ready', readiness_check, methods=['GET']),
+    Route('/predict', predict, methods=['POST']),
+    Route('/stats/admission', admission_stats, methods=['GET']),
+    Route('/metrics', metrics_endpoint, methods=['GET']),
+], lifespan=lifespan)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Démarrage du serveur ASGI sur le port 5000...")
+    uvicorn.run(app, host='127.0.0.1', port=5000)
@@ -0,0 +1,210 @@
+"""Journal d'audit des prédictions, écrit en différé (write-behind).
+
+Chaque requête scorée dépose un enregistrement dans une file mémoire bornée
+(`record()`, jamais bloquant) ; un thread d'écriture les sérialise par lots en
+JSONL compressé (gzip), une ligne par ligne scorée :
+    {"ts": ..., "request_id": ..., "endpoint": "/predict", "version": "default@...",
+     "latency_ms": ..., "row": 0, "features": [200 floats], "probability": ..., "prediction": 0}
+(tier "fast" : version suffixée "#fast", NaN hors des colonnes de la variante compacte)
+Même format que les journaux rejoués par scripts/benchmark.py (clés "endpoint" et
+"features") : un segment d'audit peut servir de jeu de charge.
+
+Segments : <dossier>/audit-<pid>-<horodatage>-<n>.jsonl.gz, un fichier par process
+(workers gunicorn), suffixe .part tant qu'il est ouvert, tourné par taille ou par âge.
+File pleine : l'enregistrement est abandonné et compté (délestage), la requête
+n'attend jamais le disque.
+
+Politique fsync : "always" (après chaque lot), "rotate" (à la fermeture d'un
+segment) ou "never" (laissé à l'OS).
+"""
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from api.threads import ensure_thread
+
+FSYNC_POLICIES = ('always', 'rotate', 'never')
+_STOP = object()  # déposé en file par close() : le thread d'écriture termine son lot puis s'arrête
+
+
+class AuditLog:
+    def __init__(self, directory, max_queue=10000, flush_interval_s=1.0, batch_size=256,
+                 segment_max_bytes=64 << 20, segment_max_age_s=3600.0, fsync='rotate'):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Politique fsync inconnue : {fsync} ({', '.join(FSYNC_POLICIES)})")
+        self.directory = directory
+        self.flush_interval = flush_interval_s
+        self.batch_size = batch_size
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age_s
+        self.fsync = fsync
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # segment courant : thread d'écriture ou close()
+        self._thread = None
+        self._file = None
+        self._raw = None
+        self._path = None
+        self._segment_bytes = 0
+        self._segment_opened = 0.0
+        self._segment_seq = 0
+        self._counts = {'enqueued': 0, 'dropped': 0, 'written': 0, 'batches': 0,
+                        'segments': 0, 'bytes': 0, 'errors': 0}
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+
+    def record(self, endpoint, features, probabilities, version, latency_ms, request_id):
+        """Dépose les lignes scorées d'une requête ; False si la file est pleine (délestage)."""
+        # Copie : l'appelant peut réutiliser son tampon (cf. /predict_stream)
+        entry = (time.time(), request_id, endpoint, version, latency_ms,
+                 np.array(features, dtype=np.float64), np.array(probabilities, dtype=np.float64))
+        with self._lock:
+            self._thread = ensure_thread(self._thread, self._run, 'audit-writer')
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self._counts['dropped'] += len(entry[5])
+            return False
+        with self._lock:
+            self._counts['enqueued'] += len(entry[5])
+        return True
+
+    # --- ÉCRITURE (thread de fond) ---
+    def _run(self):
+        while True:
+            batch, stop = self._drain()
+            with self._io_lock:
+                if batch:
+                    try:
+                        self._write(batch)
+                    except Exception as e:
+                        with self._lock:
+                            self._counts['errors'] += 1
+                        print(f"⚠️ Audit : écriture impossible ({e})")
+                elif self._file is not None and time.time() - self._segment_opened > self.segment_max_age:
+                    self._rotate()
+            if stop:
+                return
+
+    def _drain(self):
+        """Attend au plus flush_interval puis prend tout ce qui est en file (borné à batch_size).
+
+        Renvoie (lot, arrêt demandé par close()).
+        """
+        try:
+            entry = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        if entry is _STOP:
+            return [], True
+        batch = [entry]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _write(self, batch):
+        lines = []
+        rows = 0
+        for ts, request_id, endpoint, version, latency_ms, features, probabilities in batch:
+            for i, (row, p) in enumerate(zip(features.tolist(), probabilities.tolist())):
+                lines.append(json.dumps({
+                    'ts': round(ts, 6), 'request_id': request_id, 'endpoint': endpoint,
+                    'version': version, 'latency_ms': round(latency_ms, 3), 'row': i,
+                    'features': row, 'probability': p, 'prediction': int(p > 0.5),
+                }, separators=(',', ':')))
+            rows += len(probabilities)
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._file.flush()  # bloc gzip complet : lisible même si le process s'arrête
+        if self.fsync == 'always':
+            os.fsync(self._raw.fileno())
+        self._segment_bytes += len(data)
+        with self._lock:
+            self._counts['written'] += rows
+            self._counts['batches'] += 1
+            self._counts['bytes'] += len(data)
+        if self._segment_bytes >= self.segment_max_bytes \
+                or time.time() - self._segment_opened > self.segment_max_age:
+            self._rotate()
+
+    def _open(self):
+        self._segment_seq += 1
+        name = f"audit-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{self._segment_seq}.jsonl.gz"
+        self._path = os.path.join(self.directory, name)
+        self._raw = open(self._path + '.part', 'wb')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6)
+        self._segment_bytes = 0
+        self._segment_opened = time.time()
+        with self._lock:
+            self._counts['segments'] += 1
+
+    def _rotate(self):
+        """Ferme le segment courant et le rend visible sous son nom définitif."""
+        if self._file is None:
+            return
+        self._file.close()
+        if self.fsync != 'never':
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self._path + '.part', self._path)
+        self._file = self._raw = None
+
+    def close(self, timeout=5.0):
+        """Arrête le thread d'écriture, écrit ce qui reste en file puis ferme le segment (arrêt du worker)."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            # Le thread peut tenir un lot déjà retiré de la file : on attend qu'il l'ait écrit
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                thread.join(max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                pass
+            if thread.is_alive():
+                print(f"⚠️ Audit : thread d'écriture toujours actif après {timeout} s")
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                batch.append(entry)
+        with self._io_lock:
+            try:
+                if batch:
+                    self._write(batch)
+                self._rotate()
+            except Exception as e:
+                print(f"⚠️ Audit : fermeture incomplète ({e})")
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counts,
+                'queue_depth': self._queue.qsize(),
+                'queue_size': self._queue.maxsize,
+                'fsync': self.fsync,
+                'segment': os.path.basename(self._path) if self._file is not None else None,
+            }
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from api.threads import ensure_thread
+
+# Bornes (en lignes) des classes de l'histogramme des tailles de lot
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+# Bornes (en ms) des classes de l'histogramme des délais d'attente
+QUEUE_DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class MicroBatcher:
+    """Regroupe les appels mono-ligne concurrents en un seul appel vectorisé.
+
+    Chaque requête dépose sa ligne et attend un Future. Un thread de fond
+    attend la première ligne, laisse la fenêtre `window_ms` se remplir (ou
+    s'arrête dès `max_batch` lignes), score tout le lot avec `score_fn`
+    puis redistribue les probabilités aux requêtes en attente.
+    """
+
+    def __init__(self, score_fn, window_ms=2.0, max_batch=64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._batch_hist = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._delay_hist = [0] * (len(QUEUE_DELAY_BUCKETS_MS) + 1)
+        self._batches = 0
+        self._rows = 0
+        self._delay_sum_ms = 0.0
+        self._thread = None
+
+    def submit(self, row):
+        """Dépose une ligne (200 floats) ; renvoie un Future résolu avec sa probabilité."""
+        future = Future()
+        with self._cond:
+            self._thread = ensure_thread(self._thread, self._run, 'micro-batcher')
+            self._pending.append((row, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def predict(self, row, timeout=None):
+        """Version bloquante de submit()."""
+        return self.submit(row).result(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.perf_counter() + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._pending.popleft()
+                         for _ in range(min(self.max_batch, len(self._pending)))]
+            self._score(batch)
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        try:
+            probabilities = self.score_fn(np.asarray([row for row, _, _ in batch], dtype=np.float64))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), probability in zip(batch, probabilities):
+            future.set_result(float(probability))
+        self._record(len(batch), [(started - queued) * 1000.0 for _, _, queued in batch])
+
+    def _record(self, size, delays_ms):
+        with self._lock:
+            self._batches += 1
+            self._rows += size
+            self._batch_hist[_bucket(size, BATCH_SIZE_BUCKETS)] += 1
+            for delay in delays_ms:
+                self._delay_hist[_bucket(delay, QUEUE_DELAY_BUCKETS_MS)] += 1
+                self._delay_sum_ms += delay
+
+    def stats(self):
+        """Distribution des tailles de lot et des délais d'attente depuis le démarrage."""
+        with self._lock:
+            return {
+                'window_ms': self.window * 1000.0,
+                'max_batch': self.max_batch,
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'mean_queue_delay_ms': self._delay_sum_ms / self._rows if self._rows else 0.0,
+                'batch_size_histogram': _histogram(BATCH_SIZE_BUCKETS, self._batch_hist),
+                'queue_delay_ms_histogram': _histogram(QUEUE_DELAY_BUCKETS_MS, self._delay_hist),
+            }
+
+
+def _bucket(value, bounds):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def _histogram(bounds, counts):
+    labels = [f"<={b}" for b in bounds] + [f">{bounds[-1]}"]
+    return dict(zip(labels, counts))
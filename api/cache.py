@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def row_key(row):
+    """Clé de cache : hash blake2b (128 bits) des octets float64 de la ligne."""
+    return hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float64).tobytes(),
+                           digest_size=16).digest()
+
+
+def files_fingerprint(paths):
+    """Empreinte (taille, mtime) des fichiers : change dès qu'un artefact est réécrit."""
+    fingerprint = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            fingerprint.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+
+class PredictionCache:
+    """Cache LRU borné (taille + TTL) des résultats de scoring, indexé par le hash de la ligne.
+
+    Les probabilités et les autres résultats par ligne (contributions d'/explain...)
+    partagent la même capacité ; un `namespace` distinct sépare leurs clés.
+
+    Le cache est vidé automatiquement si l'un des fichiers surveillés
+    (modèle, scaler) change ; la vérification (un stat par fichier) est
+    faite au plus toutes les `check_interval_s` secondes.
+    """
+
+    def __init__(self, maxsize=10000, ttl_s=300.0, watch_paths=(), check_interval_s=2.0):
+        self.maxsize = maxsize
+        self.ttl = ttl_s
+        self.watch_paths = tuple(watch_paths)
+        self.check_interval = check_interval_s
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = files_fingerprint(self.watch_paths)
+        self._next_check = time.monotonic() + check_interval_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_files(self, now):
+        # Appelé sous self._lock
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        fingerprint = files_fingerprint(self.watch_paths)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._data.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._check_files(now)
+            entry = self._data.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def score(self, X, score_fn, namespace=b''):
+        """Résultats de X : lus dans le cache, les absents calculés en un seul appel à score_fn.
+
+        score_fn renvoie un résultat par ligne : un scalaire (probabilité) ou un
+        vecteur (contributions) ; la sortie a la forme (N,) ou (N, k).
+        """
+        keys = [namespace + row_key(row) for row in X]
+        values = [self.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            scored = np.asarray(score_fn(X[missing]), dtype=np.float64)
+            for i, value in zip(missing, scored):
+                values[i] = value if value.ndim else float(value)
+                self.put(keys[i], values[i])
+        return np.array(values, dtype=np.float64)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
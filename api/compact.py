@@ -0,0 +1,88 @@
+"""Variante compacte du modèle, servie comme tier "fast" (pré-filtrage du trafic).
+
+Un petit ensemble LightGBM ré-entraîné sur les features les plus contributives
+(SHAP) du modèle complet, compilé en tableaux plats (api/tree_engine.py) avec le
+scaler replié et les seuils quantifiés en float32 (scripts/build_compact_model.py).
+Il est enregistré dans le dossier de la version, à côté du modèle complet :
+    compact_model.npz    ensemble plat + indices des colonnes utilisées
+    compact_report.json  coût en AUC, gains de latence et de mémoire
+
+Le scorer accepte des lignes complètes (200 features, seules les colonnes utiles
+sont lues) ou réduites aux seules colonnes du modèle compact, dans l'ordre de
+`columns` : le client peut alors n'envoyer que k valeurs par ligne.
+"""
+import os
+
+import numpy as np
+
+from api.inference import FEATURE_NAMES, N_FEATURES, as_matrix
+from api.metrics import stage
+from api.tree_engine import FlatEnsemble
+
+COMPACT_MODEL_NAME = 'compact_model.npz'
+COMPACT_REPORT_NAME = 'compact_report.json'
+
+
+class CompactScorer:
+    """Ensemble plat sur un sous-ensemble de colonnes (scaler déjà replié dans les seuils)."""
+
+    backend = 'flat'
+
+    def __init__(self, flat, columns, n_inputs=N_FEATURES):
+        self.flat = flat
+        self.columns = np.ascontiguousarray(columns, dtype=np.int64)
+        if flat.n_features != len(self.columns):
+            raise ValueError(f"L'ensemble attend {flat.n_features} features, {len(self.columns)} colonnes fournies")
+        self.n_inputs = int(n_inputs)
+        self.n_columns = len(self.columns)
+
+    @property
+    def feature_names(self):
+        return [FEATURE_NAMES[i] for i in self.columns]
+
+    def select(self, features):
+        """Matrice (N x k) des colonnes utiles, à partir de lignes complètes ou déjà réduites."""
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 2 and X.shape[1] == self.n_columns != self.n_inputs:
+            return np.ascontiguousarray(X)
+        return as_matrix(features, self.n_inputs)[:, self.columns]
+
+    def expand(self, X):
+        """Lignes réduites (N x k) replacées dans le schéma complet (N x n_inputs), NaN ailleurs."""
+        full = np.full((len(X), self.n_inputs), np.nan)
+        full[:, self.columns] = X
+        return full
+
+    def predict_proba(self, features):
+        """Probabilité de la classe 1 pour chaque ligne (tableau numpy de taille N)."""
+        X = self.select(features)
+        with stage('predict'):
+            return self.flat.predict_proba(X)
+
+    def info(self):
+        return {'features': self.feature_names, 'trees': self.flat.n_trees,
+                'nodes': self.flat.n_nodes, 'bytes': self.flat.nbytes}
+
+    # --- PERSISTANCE ---
+    def save(self, path):
+        """Sauvegarde en .npz ; seuils et feuilles (déjà quantifiés) stockés en float32."""
+        fields = self.flat._fields()
+        fields['threshold'] = fields['threshold'].astype(np.float32)
+        fields['value'] = fields['value'].astype(np.float32)
+        np.savez(path, columns=self.columns, n_inputs=self.n_inputs, **fields)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            fields = {k: data[k] for k in data.files}
+        columns = fields.pop('columns')
+        n_inputs = int(fields.pop('n_inputs'))
+        return cls(FlatEnsemble.from_fields(fields), columns, n_inputs)
+
+
+def load_compact(directory):
+    """CompactScorer du dossier de version, ou None s'il n'a pas été construit."""
+    path = os.path.join(directory, COMPACT_MODEL_NAME)
+    if not os.path.exists(path):
+        return None
+    return CompactScorer.load(path)
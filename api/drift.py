@@ -0,0 +1,211 @@
+"""Surveillance incrémentale de la dérive des features, par rapport au scaler d'entraînement.
+
+Chaque lot scoré est ramené dans l'espace du scaler (z = (x - mean_) / scale_) puis
+agrégé sans stocker les lignes :
+  - moyenne et variance par feature : mise à jour de Welford vectorisée (fusion de
+    Chan entre le lot et la fenêtre courante) ;
+  - histogramme grossier par feature, sur des bornes communes en z (un seul
+    searchsorted + bincount pour toute la matrice).
+Les valeurs manquantes (NaN, acceptées par l'API et traitées comme telles par
+LightGBM, ou infinies) sont exclues de ces statistiques : chaque feature a son propre
+nombre de valeurs observées, et un taux de valeurs manquantes est suivi à part.
+Les fenêtres de `window_rows` lignes tournent dans un anneau de `n_windows` :
+les statistiques couvrent les dernières window_rows x n_windows lignes environ.
+
+Scores de dérive par feature :
+  - z_shift : écart de la moyenne en nombre d'écarts-types d'entraînement ;
+  - var_ratio : variance observée / variance d'entraînement ;
+  - psi : Population Stability Index de l'histogramme face à la référence
+    (histogramme d'entraînement s'il a été exporté, cf. scripts/build_drift_reference.py,
+    sinon loi normale centrée réduite, approximation à interpréter avec prudence).
+Pas d'alerte pour une feature tant qu'elle compte moins de `min_rows` valeurs
+observées dans la fenêtre : sur quelques dizaines de lignes, PSI et z_shift ne
+mesurent que du bruit d'échantillonnage.
+Les statistiques sont propres à chaque process (un moniteur par worker gunicorn).
+"""
+import math
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+# Histogramme de référence exporté à côté du modèle (scripts/build_drift_reference.py)
+DRIFT_REFERENCE_NAME = 'drift_reference.npy'
+
+# Bornes des classes en z (les deux classes extrêmes sont ouvertes)
+Z_EDGES = np.array([-3.0, -2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0, 3.0])
+N_BINS = len(Z_EDGES) + 1
+PSI_ALERT = 0.2
+Z_SHIFT_ALERT = 0.25
+MIN_ALERT_ROWS = 1000
+EPS = 1e-4
+# Les petits lots (requêtes mono-ligne) sont mis de côté et agrégés par paquets de cette taille
+PENDING_ROWS = 64
+
+
+def gaussian_reference(edges=Z_EDGES):
+    """Proportions attendues par classe pour une loi N(0, 1) (forme N_BINS x 1)."""
+    cdf = np.array([0.5 * (1.0 + math.erf(z / math.sqrt(2.0))) for z in edges])
+    return np.diff(np.concatenate([[0.0], cdf, [1.0]]))[:, None]
+
+
+def bin_counts(Z, edges=Z_EDGES):
+    """Comptes (n_features x N_BINS) des valeurs finies de Z par classe (manquantes ignorées)."""
+    n_features = Z.shape[1]
+    bins = np.searchsorted(edges, Z, side='right')
+    bins += np.arange(n_features) * (len(edges) + 1)
+    return np.bincount(bins[np.isfinite(Z)], minlength=n_features * (len(edges) + 1)).reshape(n_features, -1)
+
+
+def reference_histogram(X, mean, scale, edges=Z_EDGES, chunk_rows=50000):
+    """Proportions par classe (N_BINS x n_features) d'un jeu d'entraînement, lu par blocs."""
+    counts = np.zeros((X.shape[1], len(edges) + 1), dtype=np.int64)
+    for start in range(0, len(X), chunk_rows):
+        Z = (np.asarray(X[start:start + chunk_rows], dtype=np.float64) - mean) / scale
+        counts += bin_counts(Z, edges)
+    return (counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)).T
+
+
+class _Window:
+    __slots__ = ('n', 'count', 'mean', 'm2', 'hist')
+
+    def __init__(self, n_features):
+        self.n = 0                                       # lignes
+        self.count = np.zeros(n_features, dtype=np.int64)  # valeurs observées (non manquantes) par feature
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.hist = np.zeros((n_features, N_BINS), dtype=np.int64)
+
+    def merge(self, n, count, mean, m2, hist):
+        """Fusion de Chan, feature par feature : (count, mean, m2) de n autres lignes ajoutés à la fenêtre."""
+        total = self.count + count
+        weight = np.divide(count, total, out=np.zeros(len(total)), where=total > 0)
+        delta = mean - self.mean
+        self.mean += delta * weight
+        self.m2 += m2 + delta * delta * (self.count * weight)
+        self.count = total
+        self.n += n
+        self.hist += hist
+
+
+class DriftMonitor:
+    def __init__(self, mean, scale, window_rows=10000, n_windows=6, reference=None, version=None,
+                 min_rows=MIN_ALERT_ROWS):
+        self.version = version
+        self.min_rows = min_rows
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.n_features = len(self.mean)
+        self.window_rows = window_rows
+        self.reference = gaussian_reference() if reference is None else np.asarray(reference)
+        self._current = _Window(self.n_features)
+        self._closed = deque(maxlen=n_windows - 1)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_rows = 0
+        self.total_rows = 0
+
+    @classmethod
+    def for_version(cls, version, window_rows=10000, n_windows=6, min_rows=MIN_ALERT_ROWS):
+        """Moniteur d'une version du registre (scaler, histogramme de référence de son dossier)."""
+        reference_file = os.path.join(os.path.dirname(version.paths[0]), DRIFT_REFERENCE_NAME)
+        reference = np.load(reference_file) if os.path.exists(reference_file) else None
+        return cls(version.scorer.mean, version.scorer.scale, window_rows, n_windows, reference,
+                   version=version.tag, min_rows=min_rows)
+
+    def observe(self, X):
+        """Agrège un lot (N x n_features) de lignes scorées.
+
+        Les lots de moins de PENDING_ROWS lignes sont copiés en attente et agrégés
+        ensemble : le coût fixe numpy est payé une fois pour ~PENDING_ROWS lignes.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) < PENDING_ROWS:
+            with self._lock:
+                self._pending.append(X.copy())
+                self._pending_rows += len(X)
+                if self._pending_rows < PENDING_ROWS:
+                    return
+                X = np.concatenate(self._pending)
+                self._pending, self._pending_rows = [], 0
+        self._aggregate(X)
+
+    def _aggregate(self, X):
+        Z = (X - self.mean) / self.scale
+        n = len(Z)
+        if not n:
+            return
+        observed = np.isfinite(Z)
+        count = observed.sum(axis=0)
+        hist = bin_counts(Z)
+        Z = np.where(observed, Z, 0.0)
+        mean = np.divide(Z.sum(axis=0), count, out=np.zeros(self.n_features), where=count > 0)
+        m2 = (np.where(observed, Z - mean, 0.0) ** 2).sum(axis=0)
+        with self._lock:
+            self._current.merge(n, count, mean, m2, hist)
+            self.total_rows += n
+            if self._current.n >= self.window_rows:
+                self._closed.append(self._current)
+                self._current = _Window(self.n_features)
+
+    def _merged(self):
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, [], 0
+        if pending:
+            self._aggregate(np.concatenate(pending))
+        window = _Window(self.n_features)
+        with self._lock:
+            for w in (*self._closed, self._current):
+                if w.n:
+                    window.merge(w.n, w.count, w.mean, w.m2, w.hist)
+        return window
+
+    def scores(self):
+        """Statistiques de la fenêtre glissante et scores de dérive par feature (tableaux numpy)."""
+        window = self._merged()
+        if not window.n:
+            return None
+        count = window.count
+        observed = np.maximum(window.hist.T / np.maximum(count, 1), EPS)
+        expected = np.maximum(self.reference, EPS)
+        psi = np.where(count > 0, ((observed - expected) * np.log(observed / expected)).sum(axis=0), 0.0)
+        variance = window.m2 / np.maximum(count - 1, 1)
+        return {
+            'rows': window.n,
+            'count': count,
+            'missing_rate': 1.0 - count / window.n,
+            'z_shift': window.mean,
+            'var_ratio': variance,
+            'psi': psi,
+            'z_stat': window.mean * np.sqrt(count),
+        }
+
+    def report(self, top_k=10, feature_names=None):
+        """Résumé JSON : features les plus dérivées (PSI), alertes et volume de la fenêtre."""
+        scores = self.scores()
+        if scores is None:
+            return {'rows': 0, 'total_rows': self.total_rows, 'features': []}
+        names = feature_names or [f'var_{i}' for i in range(self.n_features)]
+        alerts = (scores['count'] >= self.min_rows) \
+            & ((scores['psi'] > PSI_ALERT) | (np.abs(scores['z_shift']) > Z_SHIFT_ALERT))
+        order = np.argsort(-scores['psi'])[:top_k]
+        return {
+            'rows': int(scores['rows']),
+            'total_rows': self.total_rows,
+            'window_rows': self.window_rows,
+            'windows': len(self._closed) + 1,
+            'reference': 'gaussian' if self.reference.shape[1] == 1 else 'training',
+            'max_psi': float(scores['psi'].max()),
+            'mean_psi': float(scores['psi'].mean()),
+            'max_missing_rate': float(scores['missing_rate'].max()),
+            'alerts': [names[i] for i in np.flatnonzero(alerts)],
+            'thresholds': {'psi': PSI_ALERT, 'z_shift': Z_SHIFT_ALERT, 'min_rows': self.min_rows},
+            'features': [{
+                'feature': names[i],
+                'psi': float(scores['psi'][i]),
+                'z_shift': float(scores['z_shift'][i]),
+                'var_ratio': float(scores['var_ratio'][i]),
+                'missing_rate': float(scores['missing_rate'][i]),
+            } for i in order],
+        }
@@ -0,0 +1,190 @@
+import os
+
+import numpy as np
+
+from api.metrics import stage
+from api.tree_engine import FlatEnsemble, check_parity, compile_booster
+
+N_FEATURES = 200
+FEATURE_NAMES = [f"var_{i}" for i in range(N_FEATURES)]
+
+# Artefacts "natifs" : modèle au format texte LightGBM + paramètres du scaler en .npy.
+# Pas de pickle à charger, donc ni sklearn ni joblib à importer au démarrage.
+NATIVE_MODEL_NAME = 'best_model.txt'
+NATIVE_SCALER_NAME = 'scaler_params.npy'
+# Ensemble compilé (scaler replié) : le backend "flat" démarre sans importer lightgbm
+FLAT_MODEL_NAME = 'best_model_flat.npz'
+# Backend "flat" : lots de plus de FLAT_MAX_ROWS lignes délégués au booster LightGBM (0 = jamais).
+# Le moteur plat évalue tous les nœuds de tous les arbres (QuickScorer) là où LightGBM ne
+# parcourt qu'un chemin par arbre : mesuré aussi rapide ou plus lent dès quelques lignes.
+FLAT_MAX_ROWS = int(os.environ.get("FLAT_MAX_ROWS", "1"))
+
+
+def as_matrix(features, n_features=N_FEATURES):
+    """Convertit une ligne ou une liste de lignes en buffer float64 contigu (N x n_features)."""
+    try:
+        X = np.ascontiguousarray(features, dtype=np.float64)
+    except TypeError:
+        raise ValueError("Les features doivent être des nombres (ou null)")
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise ValueError(f"Chaque ligne doit contenir {n_features} features")
+    return X
+
+
+def format_result(probability):
+    """Construit la réponse JSON d'une ligne à partir de sa probabilité (api/app.py et api/asgi.py)."""
+    probability = float(probability)
+    return {
+        'prediction': int(probability > 0.5),
+        'probability': probability,
+        'risk_level': 'High' if probability > 0.5 else 'Low',
+        'message': 'Transaction Suspecte' if probability > 0.5 else 'Transaction Normale'
+    }
+
+
+class Scorer:
+    """Booster LightGBM + StandardScaler fusionnés pour l'inférence sans pandas.
+
+    Le scaler est réduit à deux tableaux (mean_, scale_) appliqués directement
+    sur le buffer numpy, et le booster n'est évalué qu'une seule fois : la
+    classe prédite est dérivée de la probabilité (seuil 0.5, comme
+    LGBMClassifier.predict).
+
+    backend='flat' remplace le booster par le moteur à tableaux plats
+    (api/tree_engine.py) avec le scaler replié dans les seuils, pour les lots
+    d'au plus `flat_max_rows` lignes (cf. FLAT_MAX_ROWS) ; la parité avec
+    LightGBM est vérifiée au chargement (écart max dans `parity_error`, le
+    chargement échoue au-delà de la tolérance). Un ensemble déjà compilé et
+    vérifié à l'export peut être passé via `flat` ; le booster est alors chargé
+    à la demande depuis `booster_file` (import de lightgbm différé).
+
+    `num_threads` (0 = réglage du modèle) borne les threads OpenMP de chaque appel
+    LightGBM, cf. api/topology.py.
+    """
+
+    num_threads = 0
+    flat_max_rows = FLAT_MAX_ROWS
+
+    def __init__(self, booster, mean, scale, backend='lightgbm', flat=None, booster_file=None):
+        self._booster = booster
+        self._booster_file = booster_file
+        self.mean = np.ascontiguousarray(mean, dtype=np.float64)
+        self.n_features = len(self.mean)
+        scale = scale if scale is not None else np.ones(self.n_features)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float64)
+        self.backend = 'lightgbm'
+        self.flat = None
+        self.parity_error = None
+        if flat is not None:
+            self.flat = flat
+            self.backend = 'flat'
+        elif backend == 'flat':
+            self.flat = compile_booster(self.booster).fold_scaler(self.mean, self.scale)
+            self.parity_error = self._check_flat_parity()
+            self.backend = 'flat'
+        elif backend != 'lightgbm':
+            raise ValueError(f"Backend d'inférence inconnu : {backend}")
+
+    @property
+    def booster(self):
+        if self._booster is None:
+            import lightgbm
+
+            self._booster = lightgbm.Booster(model_file=self._booster_file)
+        return self._booster
+
+    def _check_flat_parity(self, n_rows=512, tol=1e-6):
+        """Compare le moteur plat au booster sur des lignes tirées autour de la distribution du scaler."""
+        rng = np.random.default_rng(0)
+        X = self.mean + self.scale * rng.normal(0, 1.5, (n_rows, self.n_features))
+        return check_parity(self.flat, lambda rows: self.booster.predict(self.transform(rows)), X, tol)
+
+    def transform(self, X):
+        """Équivalent de scaler.transform sur un buffer numpy (copie, l'entrée n'est pas modifiée)."""
+        X_scaled = np.subtract(X, self.mean)
+        np.divide(X_scaled, self.scale, out=X_scaled)
+        return X_scaled
+
+    def predict_proba(self, features):
+        """Probabilité de la classe 1 pour chaque ligne (tableau numpy de taille N)."""
+        X = as_matrix(features, self.n_features)
+        if self.flat is not None and (not self.flat_max_rows or len(X) <= self.flat_max_rows):
+            # Scaler replié dans les seuils : pas d'étape "scale"
+            with stage('predict'):
+                return self.flat.predict_proba(X)
+        with stage('scale'):
+            X_scaled = self.transform(X)
+        with stage('predict'):
+            return self.booster.predict(X_scaled, **self._predict_params())
+
+    def contributions(self, features):
+        """Contributions TreeSHAP natives de LightGBM (pred_contrib), en log-odds.
+
+        Tableau (N x n_features + 1) : une colonne par feature, la dernière est la
+        valeur de base ; la somme d'une ligne est le score brut (sigmoïde = probabilité).
+        Toujours calculé par le booster, quel que soit le backend de prédiction.
+        """
+        X = as_matrix(features, self.n_features)
+        with stage('scale'):
+            X_scaled = self.transform(X)
+        with stage('explain'):
+            return self.booster.predict(X_scaled, pred_contrib=True, **self._predict_params())
+
+    def _predict_params(self):
+        return {'num_threads': self.num_threads} if self.num_threads else {}
+
+
+def load_scorer(model_path, scaler_path, backend='lightgbm'):
+    """Charge best_model.pkl et scaler.pkl et renvoie un Scorer prêt à l'emploi."""
+    import joblib
+
+    scaler = joblib.load(scaler_path)
+    model = joblib.load(model_path)
+    return Scorer(model.booster_, scaler.mean_, scaler.scale_, backend=backend)
+
+
+def load_native_scorer(model_file, scaler_params_file, backend='lightgbm'):
+    """Charge les artefacts natifs (best_model.txt + scaler_params.npy) sans pickle.
+
+    En backend "flat", l'ensemble compilé best_model_flat.npz voisin est utilisé
+    s'il est plus récent que le modèle et que le scaler (replié dans ses seuils) :
+    aucun import de lightgbm au démarrage.
+    """
+    mean, scale = np.load(scaler_params_file, allow_pickle=False)
+    flat_file = os.path.join(os.path.dirname(model_file), FLAT_MODEL_NAME)
+    if backend == 'flat' and os.path.exists(flat_file) \
+            and os.path.getmtime(flat_file) >= max(os.path.getmtime(model_file),
+                                                   os.path.getmtime(scaler_params_file)):
+        return Scorer(None, mean, scale, flat=FlatEnsemble.load(flat_file), booster_file=model_file)
+
+    import lightgbm
+
+    booster = lightgbm.Booster(model_file=model_file)
+    return Scorer(booster, mean, scale, backend=backend)
+
+
+def native_paths(models_dir):
+    return (os.path.join(models_dir, NATIVE_MODEL_NAME),
+            os.path.join(models_dir, NATIVE_SCALER_NAME))
+
+
+def native_is_fresh(models_dir, model_path, scaler_path):
+    """Les artefacts natifs existent-ils et sont-ils plus récents que les .pkl ?"""
+    native = native_paths(models_dir)
+    if not all(os.path.exists(p) for p in native):
+        return False
+    oldest_native = min(os.path.getmtime(p) for p in native)
+    return all(os.path.getmtime(p) <= oldest_native for p in (model_path, scaler_path))
+
+
+def export_native(model_path, scaler_path, models_dir):
+    """Exporte best_model.pkl / scaler.pkl vers best_model.txt, scaler_params.npy et best_model_flat.npz."""
+    scorer = load_scorer(model_path, scaler_path, backend='flat')
+    model_file, scaler_params_file = native_paths(models_dir)
+    flat_file = os.path.join(models_dir, FLAT_MODEL_NAME)
+    scorer.booster.save_model(model_file)
+    np.save(scaler_params_file, np.vstack([scorer.mean, scorer.scale]))
+    scorer.flat.save(flat_file)
+    return model_file, scaler_params_file, flat_file
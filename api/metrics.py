@@ -0,0 +1,210 @@
+"""Instrumentation légère de l'API : compteurs, histogrammes de latence et export Prometheus.
+
+- `stage(nom)` chronomètre une étape (horloge monotone) ; la durée alimente
+  l'histogramme global des étapes et, si une requête est en cours dans le
+  thread, son détail (en-tête Server-Timing).
+- Les histogrammes sont à classes logarithmiques fixes : observation en
+  O(log n) sans stocker les échantillons ; p50/p95/p99 sont estimés par
+  interpolation dans la classe.
+- Les métriques sont propres à chaque process (un registre par worker gunicorn).
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _log_buckets(start=1e-6, stop=100.0, factor=1.25):
+    bounds = []
+    bound = start
+    while bound < stop:
+        bounds.append(bound)
+        bound *= factor
+    bounds.append(stop)
+    return bounds
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(key)} {value}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+
+    def set(self, value, **labels):
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        for key, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(key)} {value}')
+        return lines
+
+
+class _Series:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * n_buckets
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    """Histogramme de durées (secondes), exporté en summary Prometheus (p50/p95/p99)."""
+
+    def __init__(self, name, help_text, bounds=None):
+        self.name = name
+        self.help = help_text
+        self.bounds = bounds or _log_buckets()
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bounds) + 1)
+            series.counts[i] += 1
+            series.count += 1
+            series.sum += value
+
+    def quantile(self, q, **labels):
+        with self._lock:
+            series = self._series.get(tuple(sorted(labels.items())))
+            return self._quantile(series, q) if series else math.nan
+
+    def _quantile(self, series, q):
+        if not series.count:
+            return math.nan
+        rank = q * series.count
+        seen = 0
+        for i, n in enumerate(series.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} summary']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for q in QUANTILES:
+                    labels = key + (('quantile', str(q)),)
+                    lines.append(f'{self.name}{_labels(labels)} {self._quantile(series, q):.9f}')
+                lines.append(f'{self.name}_sum{_labels(key)} {series.sum:.9f}')
+                lines.append(f'{self.name}_count{_labels(key)} {series.count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._add(Gauge(name, help_text))
+
+    def histogram(self, name, help_text):
+        return self._add(Histogram(name, help_text))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram('api_stage_duration_seconds', "Durée de chaque étape du traitement d'une requête")
+request_seconds = registry.histogram('api_request_duration_seconds', 'Durée totale des requêtes par endpoint')
+requests_total = registry.counter('api_requests_total', 'Requêtes par endpoint et code HTTP')
+errors_total = registry.counter('api_errors_total', 'Erreurs (4xx/5xx) par endpoint')
+rows_scored_total = registry.counter('api_rows_scored_total', 'Lignes scorées par le modèle')
+fast_rows_scored_total = registry.counter('api_fast_rows_scored_total',
+                                          'Lignes scorées par la variante compacte (tier "fast")')
+model_load_seconds = registry.gauge('api_model_load_seconds', 'Durée du chargement du modèle')
+
+_local = threading.local()
+
+
+class RequestTimer:
+    """Durées des étapes d'une requête, pour l'en-tête Server-Timing."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+
+    def server_timing(self):
+        total = (time.perf_counter() - self.started) * 1000.0
+        parts = [f'{name};dur={seconds * 1000.0:.3f}' for name, seconds in self.stages]
+        parts.append(f'total;dur={total:.3f}')
+        return ', '.join(parts)
+
+
+def begin_request():
+    _local.timer = RequestTimer()
+    return _local.timer
+
+
+def current_request():
+    """Chronomètre de la requête en cours dans ce thread (None hors requête)."""
+    return getattr(_local, 'timer', None)
+
+
+def end_request():
+    timer = getattr(_local, 'timer', None)
+    _local.timer = None
+    return timer
+
+
+@contextmanager
+def stage(name):
+    """Chronomètre une étape : histogramme global + détail de la requête courante."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=name)
+        timer = getattr(_local, 'timer', None)
+        if timer is not None:
+            timer.stages.append((name, elapsed))
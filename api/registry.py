@@ -0,0 +1,385 @@
+"""Registre de modèles : versions, rechargement à chaud et scoring fantôme.
+
+Une version est un dossier contenant best_model.pkl + scaler.pkl (et, s'ils sont
+à jour, les artefacts natifs exportés ; en option la variante compacte du tier
+"fast", cf. api/compact.py) :
+  models/                  -> version "default" (emplacement historique)
+  models/versions/<nom>/   -> versions publiées (scripts/publish_model.py)
+
+models/registry.json désigne la version active et, optionnellement, une version
+fantôme. Chaque worker relit ce fichier au plus toutes les `check_interval_s`
+secondes : la nouvelle version est chargée et chauffée dans un thread pendant que
+l'ancienne continue de servir, puis le pointeur `active` est remplacé d'un bloc
+(une affectation Python, atomique). Une requête lit `active` une seule fois et
+garde la même version jusqu'au bout.
+
+Le scoring fantôme rejoue une fraction tirée au hasard des lignes scorées sur la
+version candidate, dans un thread séparé et via une file bornée : la réponse
+n'attend jamais le candidat, et les lignes sont abandonnées si la file est pleine.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from api import metrics
+from api.cache import files_fingerprint
+from api.compact import COMPACT_MODEL_NAME, load_compact
+from api.inference import load_native_scorer, load_scorer, native_is_fresh, native_paths
+from api.threads import ensure_thread
+
+DEFAULT_VERSION = 'default'
+VERSIONS_DIR = 'versions'
+POINTER_NAME = 'registry.json'
+MODEL_NAME = 'best_model.pkl'
+SCALER_NAME = 'scaler.pkl'
+WARMUP_ROWS = 256
+
+
+def bundle_dir(models_dir, version):
+    if version == DEFAULT_VERSION:
+        return models_dir
+    if not version or os.sep in version or version.startswith('.'):
+        raise ValueError(f"Nom de version invalide : {version!r}")
+    return os.path.join(models_dir, VERSIONS_DIR, version)
+
+
+def list_versions(models_dir):
+    root = os.path.join(models_dir, VERSIONS_DIR)
+    names = sorted(name for name in os.listdir(root)
+                   if os.path.isfile(os.path.join(root, name, MODEL_NAME))) if os.path.isdir(root) else []
+    return [DEFAULT_VERSION] + names
+
+
+def load_bundle(directory, model_format='auto', backend='lightgbm'):
+    """(scorer, chemins chargés, format) d'un dossier de version.
+
+    model_format : "native", "pickle" ou "auto" (natif s'il existe et est à jour).
+    """
+    model_path = os.path.join(directory, MODEL_NAME)
+    scaler_path = os.path.join(directory, SCALER_NAME)
+    use_native = model_format == 'native' or (
+        model_format == 'auto' and native_is_fresh(directory, model_path, scaler_path))
+    if use_native:
+        paths = native_paths(directory)
+        return load_native_scorer(*paths, backend=backend), paths, 'natif'
+    return load_scorer(model_path, scaler_path, backend=backend), (model_path, scaler_path), 'pickle'
+
+
+def warm_up(scorer, rows=WARMUP_ROWS, seed=0, mean=None, scale=None):
+    """Premières prédictions hors trafic (une ligne puis un lot) avant de servir."""
+    rng = np.random.default_rng(seed)
+    mean = scorer.mean if mean is None else mean
+    scale = scorer.scale if scale is None else scale
+    X = mean + scale * rng.standard_normal((rows, len(mean)))
+    scorer.predict_proba(X[:1])
+    scorer.predict_proba(X)
+
+
+class ModelVersion:
+    """Une version chargée : scorer + provenance. `tag` distingue deux contenus d'un même nom."""
+
+    def __init__(self, name, scorer, paths, model_format, load_seconds, compact=None):
+        self.name = name
+        self.scorer = scorer
+        # Variante compacte (tier "fast") si elle a été construite pour cette version
+        self.compact = compact
+        self.paths = tuple(paths)
+        self.model_format = model_format
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        digest = hashlib.blake2b(repr(files_fingerprint(self.paths)).encode(), digest_size=4).hexdigest()
+        self.tag = f'{name}@{digest}'
+
+    def info(self):
+        return {
+            'version': self.name,
+            'tag': self.tag,
+            'engine': self.scorer.backend,
+            'format': self.model_format,
+            'load_ms': self.load_seconds * 1000,
+            'compact': self.compact.info() if self.compact else None,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.loaded_at)),
+        }
+
+
+class ModelRegistry:
+    def __init__(self, models_dir, model_format='auto', backend='lightgbm',
+                 check_interval_s=2.0, shadow_queue_size=64, num_threads=0):
+        self.models_dir = models_dir
+        self.model_format = model_format
+        self.backend = backend
+        self.num_threads = num_threads
+        self.check_interval = check_interval_s
+        # Lus sans verrou par les requêtes, remplacés d'un bloc par le thread de chargement
+        self.active = None
+        self.shadow = None
+        self.shadow_fraction = 0.0
+        self.loading = None
+        self.error = None
+        self.swaps = 0
+        self._model_revision = 0
+        self._lock = threading.Lock()
+        self._pointer_path = os.path.join(models_dir, POINTER_NAME)
+        self._pointer_stamp = None
+        self._next_check = 0.0
+        self._shadow_queue = queue.Queue(shadow_queue_size)
+        self._shadow_thread = None
+        self._shadow_stats = self._empty_shadow_stats()
+
+    # --- POINTEUR (models/registry.json) ---
+    def _stamp(self):
+        try:
+            st = os.stat(self._pointer_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def read_pointer(self):
+        try:
+            with open(self._pointer_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_pointer(self, **changes):
+        """Met à jour registry.json (écriture atomique) ; renvoie le nouveau contenu."""
+        pointer = self.read_pointer()
+        pointer.update(changes)
+        tmp = f'{self._pointer_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(pointer, f, indent=2)
+        os.replace(tmp, self._pointer_path)
+        return pointer
+
+    # --- CHARGEMENT ---
+    def load_version(self, name):
+        """Charge et chauffe une version (sans la rendre active)."""
+        started = time.perf_counter()
+        directory = bundle_dir(self.models_dir, name)
+        scorer, paths, model_format = load_bundle(directory, self.model_format, self.backend)
+        # Chauffe mono-thread : start() tourne dans le master gunicorn, avant le fork
+        # (un pool OpenMP créé avant fork bloque les workers)
+        scorer.num_threads = 1
+        warm_up(scorer)
+        scorer.num_threads = self.num_threads
+        compact = load_compact(directory)
+        if compact is not None:
+            # Surveillé avec le modèle : une variante reconstruite change le tag (et vide le cache)
+            paths = (*paths, os.path.join(directory, COMPACT_MODEL_NAME))
+            warm_up(compact, mean=scorer.mean, scale=scorer.scale)
+        return ModelVersion(name, scorer, paths, model_format, time.perf_counter() - started, compact)
+
+    def start(self, version=None):
+        """Chargement initial, bloquant (import de l'app, avant le fork des workers)."""
+        self._pointer_stamp = self._stamp()
+        pointer = self.read_pointer()
+        self._model_revision = pointer.get('model_revision', 0)
+        name = version or pointer.get('version') or DEFAULT_VERSION
+        try:
+            self.active = self.load_version(name)
+        except Exception as e:
+            self.error = f'{name} : {e}'
+            raise
+        if pointer.get('shadow'):
+            self.set_shadow(pointer['shadow'], pointer.get('shadow_fraction', 0.1), background=False)
+        return self.active
+
+    def _run_loader(self, name, on_loaded, background):
+        with self._lock:
+            if self.loading:
+                return False
+            self.loading = name
+
+        def run():
+            try:
+                on_loaded(self.load_version(name))
+                self.error = None
+            except Exception as e:
+                self.error = f'{name} : {e}'
+                print(f"⚠️ Échec du chargement de la version {name} : {e}")
+            finally:
+                self.loading = None
+
+        if background:
+            threading.Thread(target=run, name='model-loader', daemon=True).start()
+        else:
+            run()
+        return True
+
+    def activate(self, name, background=True):
+        """Charge `name` pendant que la version active continue de servir, puis bascule.
+
+        Renvoie False si un chargement est déjà en cours.
+        """
+        def swap(version):
+            self.active = version
+            self.swaps += 1
+            print(f"🔁 Version active : {version.tag} ({version.load_seconds * 1000:.0f} ms)")
+
+        return self._run_loader(name, swap, background)
+
+    def set_shadow(self, name, fraction=0.1, background=True):
+        """Version fantôme scorée sur `fraction` des lignes (name=None : désactivé)."""
+        if not name:
+            self.shadow, self.shadow_fraction = None, 0.0
+            return True
+
+        def install(version):
+            with self._lock:
+                self._shadow_stats = self._empty_shadow_stats()
+            self.shadow, self.shadow_fraction = version, float(fraction)
+
+        if self.shadow is not None and self.shadow.name == name:
+            self.shadow_fraction = float(fraction)
+            return True
+        return self._run_loader(name, install, background)
+
+    def request(self, version=None, shadow=False, fraction=None):
+        """Demande de changement : écrite dans registry.json (pour tous les workers) et appliquée ici.
+
+        version : version à activer (la même version est rechargée depuis le disque) ;
+        shadow : version fantôme (None pour désactiver) ; fraction : part des lignes rejouées.
+        """
+        known = list_versions(self.models_dir)
+        for name in (version, shadow):
+            if name and name not in known:
+                raise ValueError(f"Version inconnue : {name!r} (disponibles : {', '.join(known)})")
+        changes = {}
+        if version is not None:
+            changes['version'] = version
+            changes['model_revision'] = self.read_pointer().get('model_revision', 0) + 1
+        if shadow is not False:
+            changes['shadow'] = shadow
+        if fraction is not None:
+            changes['shadow_fraction'] = float(fraction)
+        with self._lock:
+            pointer = self.write_pointer(**changes)
+            self._pointer_stamp = self._stamp()
+        return self._apply(pointer)
+
+    def _apply(self, pointer):
+        """Aligne ce worker sur registry.json ; False si un chargement occupe déjà le thread."""
+        applied = True
+        name = pointer.get('version') or DEFAULT_VERSION
+        revision = pointer.get('model_revision', 0)
+        if revision != self._model_revision or self.active is None or self.active.name != name:
+            if self.activate(name):
+                self._model_revision = revision
+            else:
+                applied = False
+        shadow = pointer.get('shadow') or None
+        fraction = pointer.get('shadow_fraction', 0.1)
+        if shadow != (self.shadow.name if self.shadow else None) or (shadow and fraction != self.shadow_fraction):
+            applied = self.set_shadow(shadow, fraction) and applied
+        if not applied:
+            # À réessayer au prochain refresh()
+            with self._lock:
+                self._pointer_stamp = None
+        return applied
+
+    def refresh(self):
+        """Applique registry.json s'il a changé (au plus un stat toutes les check_interval_s)."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + self.check_interval
+            stamp = self._stamp()
+            if stamp == self._pointer_stamp or stamp is None:
+                return
+            self._pointer_stamp = stamp
+        self._apply(self.read_pointer())
+
+    # --- SCORING FANTÔME ---
+    @staticmethod
+    def _empty_shadow_stats():
+        return {'rows': 0, 'batches': 0, 'dropped': 0, 'errors': 0, 'disagreements': 0,
+                'abs_diff_sum': 0.0, 'max_abs_diff': 0.0, 'seconds': 0.0}
+
+    def submit_shadow(self, X, probabilities):
+        """Dépose un échantillon des lignes scorées pour la version fantôme (jamais bloquant)."""
+        shadow = self.shadow
+        if shadow is None or self.shadow_fraction <= 0:
+            return
+        sample = np.random.random(len(X)) < self.shadow_fraction
+        if not sample.any():
+            return
+        with self._lock:
+            self._shadow_thread = ensure_thread(self._shadow_thread, self._run_shadow, 'shadow-scorer')
+        try:
+            # L'indexation booléenne copie : X peut être un tampon réutilisé par l'appelant
+            self._shadow_queue.put_nowait((shadow, X[sample], np.asarray(probabilities)[sample]))
+        except queue.Full:
+            with self._lock:
+                self._shadow_stats['dropped'] += int(sample.sum())
+
+    def _run_shadow(self):
+        while True:
+            shadow, X, primary = self._shadow_queue.get()
+            started = time.perf_counter()
+            try:
+                candidate = shadow.scorer.predict_proba(X)
+            except Exception:
+                with self._lock:
+                    self._shadow_stats['errors'] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            diff = np.abs(candidate - primary)
+            with self._lock:
+                if self.shadow is not shadow:
+                    continue  # candidat remplacé entre-temps
+                stats = self._shadow_stats
+                stats['rows'] += len(X)
+                stats['batches'] += 1
+                stats['seconds'] += elapsed
+                stats['abs_diff_sum'] += float(diff.sum())
+                stats['max_abs_diff'] = max(stats['max_abs_diff'], float(diff.max()))
+                stats['disagreements'] += int(np.count_nonzero((candidate > 0.5) != (primary > 0.5)))
+
+    def stats(self):
+        with self._lock:
+            shadow_stats = dict(self._shadow_stats)
+        rows = shadow_stats['rows']
+        shadow = self.shadow
+        return {
+            'active': self.active.info() if self.active else None,
+            'shadow': {
+                **shadow.info(),
+                'fraction': self.shadow_fraction,
+                'rows': rows,
+                'dropped': shadow_stats['dropped'],
+                'errors': shadow_stats['errors'],
+                'mean_abs_diff': shadow_stats['abs_diff_sum'] / rows if rows else 0.0,
+                'max_abs_diff': shadow_stats['max_abs_diff'],
+                'disagreement_rate': shadow_stats['disagreements'] / rows if rows else 0.0,
+                'mean_batch_ms': shadow_stats['seconds'] * 1000 / shadow_stats['batches']
+                if shadow_stats['batches'] else 0.0,
+            } if shadow else None,
+            'loading': self.loading,
+            'error': self.error,
+            'swaps': self.swaps,
+            'versions': list_versions(self.models_dir),
+        }
+
+
+def load_registry(models_dir, model_format='auto', backend='lightgbm', version=None, num_threads=0):
+    """Registre avec sa version initiale chargée : démarrage commun à api/app.py et api/asgi.py.
+
+    Un échec de chargement n'empêche pas le démarrage : l'erreur est affichée et gardée
+    dans `registry.error`, et /ready répond 503 tant qu'aucune version n'est active.
+    """
+    registry = ModelRegistry(models_dir, model_format, backend, num_threads=num_threads)
+    try:
+        print("🔄 Chargement du modèle et du scaler...")
+        active = registry.start(version)
+        metrics.model_load_seconds.set(active.load_seconds)
+        print(f"✅ Modèle LightGBM chargé avec succès ! (version : {active.tag}, backend : {active.scorer.backend}, "
+              f"format : {active.model_format}, {active.load_seconds * 1000:.0f} ms)")
+    except Exception as e:
+        print(f"⚠️ ERREUR CRITIQUE : {e}")
+    return registry
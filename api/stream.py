@@ -0,0 +1,89 @@
+"""Scoring en flux NDJSON : une ligne JSON en entrée, une ligne JSON en sortie.
+
+Entrée (une ligne par enregistrement) :
+    {"features": [200 floats], "id": "train_0"}    ou simplement    [200 floats]
+Sortie, dans le même ordre :
+    {"line": 1, "id": "train_0", "probability": 0.0123, "prediction": 0}
+    {"line": 2, "error": "..."}                        (ligne invalide, le flux continue)
+
+Les lignes sont accumulées dans un tampon fixe (chunk_size x 200) scoré en une passe
+vectorisée ; la ligne suivante n'est lue qu'une fois les résultats du bloc précédent
+remis au serveur WSGI. La mémoire est donc bornée à un bloc quel que soit le volume,
+et un client qui ne lit pas sa réponse ralentit la lecture de sa requête (backpressure).
+"""
+import json
+
+import numpy as np
+
+from api.inference import N_FEATURES
+
+NDJSON = 'application/x-ndjson'
+MAX_LINE_BYTES = 1 << 20
+
+
+def iter_lines(stream, max_line_bytes=MAX_LINE_BYTES):
+    """Lignes non vides d'un flux binaire, lues une à une (longueur bornée)."""
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes:
+            raise ValueError(f"Ligne de plus de {max_line_bytes} octets")
+        line = line.strip()
+        if line:
+            yield line
+
+
+def parse_record(line, n_features=N_FEATURES):
+    """(features, id) d'une ligne NDJSON ; lève ValueError si invalide."""
+    record = json.loads(line)
+    record_id = None
+    if isinstance(record, dict):
+        record_id = record.get('id', record.get('ID_code'))
+        record = record.get('features')
+    features = np.asarray(record, dtype=np.float64)
+    if features.shape != (n_features,):
+        raise ValueError(f"Une ligne de {n_features} features attendue, forme reçue {features.shape}")
+    return features, record_id
+
+
+def score_stream(lines, score_fn, chunk_size=1024, n_features=N_FEATURES):
+    """Générateur de lignes NDJSON (bytes) : un bloc de résultats par bloc de chunk_size lignes."""
+    buffer = np.empty((chunk_size, n_features))
+    pending = []  # (numéro de ligne, id, position dans le tampon ou message d'erreur)
+    filled = 0
+
+    def flush():
+        probabilities = score_fn(buffer[:filled]) if filled else ()
+        out = []
+        for line_no, record_id, slot in pending:
+            if isinstance(slot, str):
+                result = {'line': line_no, 'error': slot}
+            else:
+                p = float(probabilities[slot])
+                result = {'line': line_no, 'probability': p, 'prediction': int(p > 0.5)}
+            if record_id is not None:
+                result['id'] = record_id
+            out.append(json.dumps(result))
+        return ('\n'.join(out) + '\n').encode('utf-8')
+
+    line_no = 0
+    try:
+        for line in lines:
+            line_no += 1
+            try:
+                buffer[filled], record_id = parse_record(line, n_features)
+            except (ValueError, TypeError) as e:
+                pending.append((line_no, None, str(e)))
+            else:
+                pending.append((line_no, record_id, filled))
+                filled += 1
+            # Lignes invalides comprises : la réponse ne retient jamais plus de chunk_size entrées
+            if len(pending) == chunk_size:
+                yield flush()
+                pending, filled = [], 0
+    except ValueError as e:
+        # Flux illisible (ligne trop longue...) : on rend ce qui est déjà lu puis l'erreur
+        pending.append((line_no + 1, None, str(e)))
+    if pending:
+        yield flush()
@@ -0,0 +1,15 @@
+"""Threads de fond des composants de l'API (micro-batcher, audit, scoring fantôme)."""
+import threading
+
+
+def ensure_thread(thread, target, name):
+    """Renvoie `thread` s'il tourne encore, sinon un nouveau thread démon `target`, démarré.
+
+    Un thread ne survit pas à un fork (gunicorn --preload) : l'objet créé dans le master
+    est hérité par les workers, mais pas le thread. On le relance donc au premier usage
+    dans chaque process. L'appelant tient le verrou qui protège l'attribut.
+    """
+    if thread is None or not thread.is_alive():
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+    return thread
@@ -0,0 +1,118 @@
+"""Topologie de service : workers gunicorn x threads par worker x threads LightGBM par prédiction.
+
+Les trois réglages se multiplient : chaque thread gthread d'un worker peut lancer
+une prédiction LightGBM, qui ouvre elle-même `num_threads` threads OpenMP. Au-delà
+du nombre de cœurs, les threads se disputent les mêmes cœurs (oversubscription)
+et le débit baisse. Ordre de priorité :
+  1. variables d'environnement API_WORKERS, API_THREADS, MODEL_NUM_THREADS ;
+  2. serving.json écrit par scripts/calibrate_serving.py, s'il a été calibré
+     pour le même nombre de cœurs ;
+  3. défaut : un worker par cœur, un thread, LightGBM mono-thread.
+"Cœurs" : ceux que le process peut réellement utiliser (available_cpus : affinité CPU
+et quota cgroup du conteneur), pas ceux de la machine hôte.
+
+Lu par gunicorn.conf.py avant l'import de l'application : les pools de threads
+natifs (OpenMP, BLAS) sont bornés par variables d'environnement avant d'être créés.
+Module sans dépendance (ni numpy ni lightgbm) pour cette raison.
+"""
+import json
+import math
+import os
+
+SERVING_CONFIG_NAME = 'serving.json'
+DEFAULT_SERVING_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      SERVING_CONFIG_NAME)
+
+# Pools de threads natifs lus au chargement des bibliothèques (OpenMP de LightGBM, BLAS de numpy)
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+# Quota CPU du conteneur (cgroup v2) : "<quota> <période>" ou "max <période>"
+CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+
+
+def available_cpus():
+    """Cœurs utilisables par ce process : affinité CPU, bornée par le quota cgroup s'il y en a un.
+
+    os.cpu_count() compte les cœurs de l'hôte : dans un conteneur limité (docker --cpus,
+    Kubernetes limits) ou sous taskset, il surestime et provoque l'oversubscription.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        cpus = os.cpu_count() or 1
+    try:
+        with open(CGROUP_CPU_MAX, encoding='ascii') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+class Topology:
+    def __init__(self, workers, threads=1, num_threads=1, source='default'):
+        self.workers = max(1, int(workers))
+        self.threads = max(1, int(threads))
+        self.num_threads = max(1, int(num_threads))
+        self.source = source
+
+    @property
+    def worker_class(self):
+        # LightGBM multi-thread : jamais dans le thread principal d'un worker forké (libgomp,
+        # initialisé par le master au chargement du modèle, y reste bloqué) ; gthread exécute
+        # les requêtes dans des threads créés après le fork, même avec threads=1
+        return 'gthread' if self.threads > 1 or self.num_threads > 1 else 'sync'
+
+    def oversubscription(self, cpus=None):
+        """Threads de calcul simultanés possibles par cœur (> 1 : oversubscription)."""
+        return self.workers * self.threads * self.num_threads / (cpus or available_cpus())
+
+    def as_dict(self):
+        return {'workers': self.workers, 'threads': self.threads, 'num_threads': self.num_threads}
+
+    def __repr__(self):
+        return (f"{self.workers} worker(s) x {self.threads} thread(s) x {self.num_threads} thread(s) "
+                f"LightGBM ({self.source})")
+
+
+def default_topology(cpus=None):
+    return Topology(cpus or available_cpus(), 1, 1)
+
+
+def load_topology(path=DEFAULT_SERVING_CONFIG, cpus=None):
+    """Topologie calibrée de serving.json, ou None si absente ou calibrée sur un autre nombre de cœurs."""
+    cpus = cpus or available_cpus()
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if config.get('cpus') != cpus:
+        print(f"⚠️ {os.path.basename(path)} calibré pour {config.get('cpus')} cœurs, hôte à {cpus} : ignoré")
+        return None
+    best = config['best']
+    return Topology(best['workers'], best['threads'], best['num_threads'], source=os.path.basename(path))
+
+
+def resolve_topology(path=None, environ=None):
+    """Topologie à appliquer : environnement > fichier calibré > défaut (cf. docstring du module)."""
+    environ = os.environ if environ is None else environ
+    path = path or environ.get('SERVING_CONFIG') or DEFAULT_SERVING_CONFIG
+    topology = load_topology(path) or default_topology()
+    overrides = {key: environ[var] for key, var in (('workers', 'API_WORKERS'), ('threads', 'API_THREADS'),
+                                                    ('num_threads', 'MODEL_NUM_THREADS'))
+                 if environ.get(var)}
+    if overrides:
+        topology = Topology(**{**topology.as_dict(), **overrides}, source='env')
+    return topology
+
+
+def pin_threads(num_threads, environ=None):
+    """Borne les pools de threads natifs du process (et de ses workers forkés) à num_threads.
+
+    MODEL_NUM_THREADS est aussi relu par l'application pour les appels LightGBM.
+    """
+    environ = os.environ if environ is None else environ
+    for var in THREAD_ENV_VARS:
+        environ[var] = str(num_threads)
+    environ['MODEL_NUM_THREADS'] = str(num_threads)
@@ -0,0 +1,330 @@
+"""Moteur d'évaluation d'un ensemble LightGBM compilé en tableaux numpy plats.
+
+Chaque nœud de chaque arbre est stocké dans des tableaux globaux (feature,
+seuil, fils gauche/droit, valeur de feuille). Pour l'évaluation, les arbres
+sont réorganisés façon QuickScorer : chaque nœud interne porte un masque de
+bits des feuilles de son sous-arbre gauche. On compare en une passe toutes
+les lignes du lot à tous les seuils, on combine par arbre (ET bit à bit) les
+masques des nœuds dont la condition est fausse, et la feuille de sortie est
+le bit de poids faible restant. Pas de boucle Python par arbre, ni de
+dépendance à lightgbm ou pandas une fois l'ensemble exporté en .npz.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+# Codes de missing_type LightGBM
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_CODES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# Seuil utilisé par LightGBM pour considérer une valeur comme nulle
+K_ZERO_THRESHOLD = 1e-35
+
+# Lignes évaluées par bloc : garde la matrice (nb_nœuds_internes x N) des masques en cache
+ROW_BLOCK = 32
+
+
+class FlatEnsemble:
+    """Ensemble d'arbres binaire sous forme de tableaux plats.
+
+    Les feuilles pointent sur elles-mêmes (left == right == index du nœud).
+    Un arbre peut avoir au plus 64 feuilles (masques uint32 / uint64).
+    """
+
+    def __init__(self, feature, threshold, left, right, value, default_left,
+                 missing_type, zero_value, roots, max_depth, n_features,
+                 sigmoid=1.0):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.missing_type = np.ascontiguousarray(missing_type, dtype=np.int8)
+        self.zero_value = np.ascontiguousarray(zero_value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.sigmoid = float(sigmoid)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self._build_bitvectors()
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        """Mémoire des tableaux de nœuds et des structures d'évaluation (octets)."""
+        return sum(a.nbytes for a in (*self._fields().values(), self._split_feature, self._split_threshold,
+                                      self._split_zero, self._split_mask, self._leaf_table)
+                   if isinstance(a, np.ndarray))
+
+    def _build_bitvectors(self):
+        """Prépare les structures QuickScorer à partir des tableaux de nœuds."""
+        n_leaves = []
+        split_nodes, split_masks, split_tree = [], [], []
+        leaf_values = []
+        constant = 0.0
+
+        for root in self.roots:
+            # Parcours en profondeur gauche d'abord : feuilles numérotées de gauche à droite
+            leaves = []
+            ranges = {}
+
+            def visit(node):
+                # Renvoie l'intervalle [first, end) des feuilles du sous-arbre
+                if self.is_leaf[node]:
+                    leaves.append(node)
+                    return len(leaves) - 1, len(leaves)
+                first, left_end = visit(self.left[node])
+                ranges[node] = (first, left_end)
+                _, end = visit(self.right[node])
+                return first, end
+
+            visit(int(root))
+            if len(leaves) > 64:
+                raise ValueError("Arbres de plus de 64 feuilles non supportés")
+            if len(leaves) == 1:
+                constant += self.value[leaves[0]]
+                continue
+            n_leaves.append(len(leaves))
+            leaf_values.append(self.value[leaves])
+            for node, (first, left_end) in ranges.items():
+                # Condition fausse (on part à droite) => on éteint les feuilles du sous-arbre gauche
+                mask = ((1 << len(leaves)) - 1) ^ (((1 << (left_end - first)) - 1) << first)
+                split_nodes.append(node)
+                split_masks.append(mask)
+                split_tree.append(len(n_leaves) - 1)
+
+        max_leaves = max(n_leaves, default=1)
+        self._mask_dtype = np.uint32 if max_leaves <= 32 else np.uint64
+        order = np.argsort(split_tree, kind='stable')
+        nodes = np.asarray(split_nodes, dtype=np.int64)[order]
+        self._split_feature = self.feature[nodes]
+        self._split_threshold = self.threshold[nodes]
+        self._split_zero = self.zero_value[nodes]
+        self._split_default_right = ~self.default_left[nodes]
+        self._split_missing = self.missing_type[nodes]
+        self._split_mask = np.asarray(split_masks, dtype=np.uint64)[order].astype(self._mask_dtype)
+        tree_of_split = np.asarray(split_tree, dtype=np.int64)[order]
+        self._tree_starts = np.searchsorted(tree_of_split, np.arange(len(n_leaves)))
+        self._leaf_table = np.zeros((len(n_leaves), max_leaves), dtype=np.float64)
+        for t, vals in enumerate(leaf_values):
+            self._leaf_table[t, :len(vals)] = vals
+        self._leaf_offsets = np.arange(len(n_leaves), dtype=np.int64) * max_leaves
+        self._constant = constant
+        self._plain = bool(np.all(self._split_missing == MISSING_NONE))
+        # Valeur "0" par feature (0 ou mean_ si le scaler a été replié)
+        self._feature_zero = np.zeros(self.n_features)
+        self._feature_zero[self._split_feature] = self._split_zero
+
+    # --- ÉVALUATION ---
+    def _go_right(self, XT):
+        """Matrice (nb_splits x N) des conditions fausses (x > seuil), XT = lignes transposées."""
+        if self._plain:
+            if np.isnan(XT).any():
+                # missing_type None : NaN traité comme 0 (dans l'espace des seuils)
+                XT = np.where(np.isnan(XT), self._feature_zero[:, None], XT)
+            return XT[self._split_feature] > self._split_threshold[:, None]
+        x = XT[self._split_feature]
+        missing = self._split_missing[:, None]
+        zero = self._split_zero[:, None]
+        nan = np.isnan(x)
+        x = np.where(nan & (missing != MISSING_NAN), zero, x)
+        use_default = ((missing == MISSING_ZERO) & (np.abs(x - zero) <= K_ZERO_THRESHOLD)) \
+            | ((missing == MISSING_NAN) & nan)
+        return np.where(use_default, self._split_default_right[:, None],
+                        x > self._split_threshold[:, None])
+
+    def _leaf_index(self, X):
+        """Index (dans l'arbre) de la feuille de sortie, matrice (nb_arbres x N)."""
+        go_right = self._go_right(np.ascontiguousarray(X.T))
+        # Condition vraie => masque tout à 1 (0 - 1 en non signé), sinon masque du nœud
+        masks = self._split_mask[:, None] | (go_right.astype(self._mask_dtype) - self._mask_dtype(1))
+        bits = np.bitwise_and.reduceat(masks, self._tree_starts, axis=0)
+        # Bit de poids faible = feuille la plus à gauche encore atteignable
+        lowest = bits & (~bits + self._mask_dtype(1))
+        return np.log2(lowest.astype(np.float64)).astype(np.int64)
+
+    def predict_raw(self, X):
+        """Score brut (log-odds) : somme des feuilles de tous les arbres."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Chaque ligne doit contenir {self.n_features} features")
+        out = np.full(X.shape[0], self._constant, dtype=np.float64)
+        if not len(self._tree_starts):
+            return out
+        flat_leaves = self._leaf_table.ravel()
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            leaf = self._leaf_index(X[start:start + ROW_BLOCK])
+            out[start:start + ROW_BLOCK] += flat_leaves[leaf + self._leaf_offsets[:, None]].sum(axis=0)
+        return out
+
+    def predict_proba(self, X):
+        """Probabilité de la classe 1 (sigmoïde de l'objectif binary)."""
+        return 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_raw(X)))
+
+    # --- TRANSFORMATIONS ---
+    def fold_scaler(self, mean, scale):
+        """Replie un StandardScaler dans les seuils : l'ensemble prend alors des features brutes.
+
+        (x - mean) / scale <= t  <=>  x <= t * scale + mean   (scale > 0)
+        """
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        if np.any(scale <= 0):
+            raise ValueError("fold_scaler exige des scale_ strictement positifs")
+        f = self.feature
+        internal = ~self.is_leaf
+        threshold = self.threshold.copy()
+        zero_value = self.zero_value.copy()
+        threshold[internal] = threshold[internal] * scale[f[internal]] + mean[f[internal]]
+        # La valeur 0 de l'espace standardisé correspond à mean dans l'espace brut
+        zero_value[internal] = zero_value[internal] * scale[f[internal]] + mean[f[internal]]
+        return self._replace(threshold=threshold, zero_value=zero_value)
+
+    def to_float32(self):
+        """Seuils et valeurs de feuilles quantifiés en float32 (empreinte mémoire /2).
+
+        Seuils arrondis vers le bas : pour une entrée représentable en float32 (cache
+        de scripts/data_store.py, corps binaires float32), x > t équivaut à
+        x > float32_inférieur(t) et les décisions sont inchangées. L'API convertit les
+        entrées en float64 : une valeur comprise entre les deux seuils peut changer de
+        branche, écart mesuré par scripts/build_compact_model.py (quantization_max_abs_diff).
+        """
+        threshold = self.threshold.astype(np.float32)
+        above = threshold.astype(np.float64) > self.threshold
+        threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+        return self._replace(
+            threshold=threshold.astype(np.float64),
+            value=self.value.astype(np.float32).astype(np.float64),
+        )
+
+    def _replace(self, **changes):
+        fields = self._fields()
+        fields.update(changes)
+        return FlatEnsemble(**fields)
+
+    def _fields(self):
+        return {
+            'feature': self.feature, 'threshold': self.threshold,
+            'left': self.left, 'right': self.right, 'value': self.value,
+            'default_left': self.default_left, 'missing_type': self.missing_type,
+            'zero_value': self.zero_value, 'roots': self.roots,
+            'max_depth': self.max_depth, 'n_features': self.n_features,
+            'sigmoid': self.sigmoid,
+        }
+
+    # --- PERSISTANCE ---
+    def save(self, path):
+        """Sauvegarde en .npz (chargeable sans lightgbm)."""
+        np.savez(path, **self._fields())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            fields = {k: data[k] for k in data.files}
+        return cls.from_fields(fields)
+
+    @classmethod
+    def from_fields(cls, fields):
+        """Reconstruit l'ensemble à partir des tableaux sauvegardés (cf. _fields)."""
+        fields = dict(fields)
+        for k in ('max_depth', 'n_features'):
+            fields[k] = int(fields[k])
+        fields['sigmoid'] = float(fields['sigmoid'])
+        return cls(**fields)
+
+
+def compile_booster(booster, num_iteration=None):
+    """Compile un lightgbm.Booster (objectif binary, splits numériques) en FlatEnsemble.
+
+    num_iteration : ne garde que les premiers arbres (défaut : tous, ou best_iteration).
+    """
+    dump = booster.dump_model(num_iteration=num_iteration)
+    if dump.get('num_tree_per_iteration', 1) != 1:
+        raise ValueError("Seuls les modèles binaires (1 arbre par itération) sont supportés")
+
+    sigmoid = 1.0
+    for token in dump.get('objective', '').split():
+        if token.startswith('sigmoid:'):
+            sigmoid = float(token.split(':', 1)[1])
+
+    feature, threshold, left, right, value = [], [], [], [], []
+    default_left, missing_type, roots = [], [], []
+    max_depth = 0
+
+    def add(node, depth):
+        nonlocal max_depth
+        idx = len(feature)
+        feature.append(0)
+        threshold.append(0.0)
+        left.append(idx)
+        right.append(idx)
+        value.append(0.0)
+        default_left.append(False)
+        missing_type.append(MISSING_NONE)
+        if 'leaf_value' in node:
+            value[idx] = node['leaf_value']
+            max_depth = max(max_depth, depth)
+            return idx
+        if node['decision_type'] != '<=':
+            raise ValueError("Les splits catégoriels ne sont pas supportés")
+        feature[idx] = node['split_feature']
+        threshold[idx] = node['threshold']
+        default_left[idx] = node['default_left']
+        missing_type[idx] = _MISSING_CODES[node['missing_type']]
+        left[idx] = add(node['left_child'], depth + 1)
+        right[idx] = add(node['right_child'], depth + 1)
+        return idx
+
+    for tree in dump['tree_info']:
+        roots.append(add(tree['tree_structure'], 0))
+
+    return FlatEnsemble(
+        feature, threshold, left, right, value, default_left, missing_type,
+        zero_value=np.zeros(len(feature)), roots=roots, max_depth=max_depth,
+        n_features=dump['max_feature_idx'] + 1, sigmoid=sigmoid,
+    )
+
+
+def check_parity(ensemble, reference_predict, X, tol=1e-6):
+    """Compare l'ensemble compilé à une fonction de référence sur X.
+
+    Renvoie l'écart absolu max ; lève ValueError s'il dépasse tol.
+    """
+    expected = np.asarray(reference_predict(X), dtype=np.float64)
+    got = ensemble.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected - got))) if len(got) else 0.0
+    if max_diff > tol:
+        raise ValueError(f"Parité non respectée : écart max {max_diff:.3g} > {tol:.3g}")
+    return max_diff
+
+
+if __name__ == '__main__':
+    # Compile models/best_model.pkl (+ scaler replié) en .npz et vérifie la parité
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from api.inference import load_scorer
+
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+    scorer = load_scorer(os.path.join(models_dir, 'best_model.pkl'),
+                         os.path.join(models_dir, 'scaler.pkl'))
+    flat = compile_booster(scorer.booster).fold_scaler(scorer.mean, scorer.scale)
+
+    rng = np.random.default_rng(42)
+    X = scorer.mean + scorer.scale * rng.normal(0, 1.5, (5000, scorer.n_features))
+    max_diff = check_parity(flat, scorer.predict_proba, X)
+
+    out_path = os.path.join(models_dir, 'best_model_flat.npz')
+    flat.save(out_path)
+    print(json.dumps({
+        'trees': flat.n_trees, 'nodes': flat.n_nodes, 'max_depth': flat.max_depth,
+        'max_abs_diff': max_diff, 'output': os.path.normpath(out_path),
+    }, indent=2))
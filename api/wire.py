@@ -0,0 +1,57 @@
+"""Formats binaires d'échange des vecteurs de features et des probabilités.
+
+- application/octet-stream : float32 ou float64 little-endian bruts, forme N x 200
+  déduite de la taille du corps (dtype via l'en-tête X-Dtype ou ?dtype=, float32 par défaut) ;
+- application/x-npy : fichier .npy (np.save), chargé sans pickle ;
+- réponse binaire (Accept: application/octet-stream) : probabilités float32 little-endian.
+
+Les corps bruts sont lus sans copie avec np.frombuffer.
+"""
+import io
+
+import numpy as np
+
+from api.inference import N_FEATURES
+
+OCTET_STREAM = 'application/octet-stream'
+NPY = 'application/x-npy'
+
+WIRE_DTYPES = {
+    'float32': np.dtype('<f4'), 'f4': np.dtype('<f4'),
+    'float64': np.dtype('<f8'), 'f8': np.dtype('<f8'),
+}
+
+
+def is_binary(content_type):
+    return content_type in (OCTET_STREAM, NPY)
+
+
+def decode_features(body, content_type, dtype='float32', n_features=N_FEATURES):
+    """Décode un corps binaire en matrice (N x n_features) ; lève ValueError si invalide."""
+    if content_type == NPY:
+        X = np.load(io.BytesIO(body), allow_pickle=False)
+    elif content_type == OCTET_STREAM:
+        wire_dtype = WIRE_DTYPES.get(str(dtype).lower())
+        if wire_dtype is None:
+            raise ValueError(f"dtype non supporté : {dtype} (float32 ou float64)")
+        row_bytes = n_features * wire_dtype.itemsize
+        if not body or len(body) % row_bytes:
+            raise ValueError(f"Taille du corps ({len(body)} octets) non multiple de {row_bytes} "
+                             f"({n_features} x {wire_dtype.name})")
+        X = np.frombuffer(body, dtype=wire_dtype)
+    else:
+        raise ValueError(f"Content-Type non supporté : {content_type}")
+
+    if X.dtype.kind != 'f':
+        raise ValueError("Le tableau doit être de type flottant")
+    X = X.reshape(-1, n_features) if X.ndim == 1 else X
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise ValueError(f"Chaque ligne doit contenir {n_features} features")
+    if not len(X):
+        raise ValueError("Le tableau doit contenir au moins une ligne")
+    return X
+
+
+def encode_probabilities(probabilities):
+    """Probabilités -> octets float32 little-endian."""
+    return np.asarray(probabilities, dtype='<f4').tobytes()
@@ -0,0 +1,90 @@
+"""Client HTTP partagé entre les sessions Streamlit pour appeler l'API de scoring.
+
+- une seule requests.Session (keep-alive, pool de connexions) par process Streamlit ;
+- timeouts bornés et retries avec backoff sur les erreurs transitoires ;
+- mémoïsation des requêtes identiques via st.cache_data ;
+- appel asynchrone (thread) pour animer la progression pendant le scoring.
+"""
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from urllib3.util.retry import Retry
+
+API_BASE_URL = "http://127.0.0.1:5000"
+
+# (connexion, lecture) en secondes
+TIMEOUT = (2, 8)
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Session partagée : connexions réutilisées au lieu d'un nouveau socket par appel."""
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),  # le scoring est idempotent
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _post(path: str, payload: dict) -> dict:
+    r = get_session().post(f"{API_BASE_URL}{path}", json=payload, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+@st.cache_data(ttl=600, max_entries=2000, show_spinner=False)
+def predict_proba(features: tuple) -> float:
+    """Probabilité renvoyée par /predict (mémoïsée : même simulation = pas de nouvel appel)."""
+    return float(_post("/predict", {"features": list(features)})["probability"])
+
+
+@st.cache_data(ttl=600, max_entries=100, show_spinner=False)
+def sensitivity(features: tuple, indices: tuple, delta: float) -> dict:
+    """Réponse de /sensitivity pour une base, une liste d'indices et un delta."""
+    return _post("/sensitivity", {"features": list(features), "indices": list(indices), "delta": delta})
+
+
+@st.cache_data(ttl=600, max_entries=200, show_spinner=False)
+def predict_batch(features: np.ndarray) -> np.ndarray:
+    """Probabilités de N lignes via /predict_batch en un seul appel (float64 bruts aller, float32 retour)."""
+    body = np.ascontiguousarray(features, dtype="<f8").tobytes()
+    r = get_session().post(
+        f"{API_BASE_URL}/predict_batch",
+        data=body,
+        headers={
+            "Content-Type": "application/octet-stream",
+            "X-Dtype": "float64",
+            "Accept": "application/octet-stream",
+        },
+        timeout=TIMEOUT,
+    )
+    r.raise_for_status()
+    return np.frombuffer(r.content, dtype="<f4").astype(np.float64)
+
+
+def predict_proba_async(features) -> Future:
+    """Lance predict_proba dans un thread ; renvoie un Future (la page reste animable)."""
+    future = Future()
+    features = tuple(float(x) for x in features)
+
+    def run():
+        try:
+            future.set_result(predict_proba(features))
+        except Exception as e:
+            future.set_exception(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return future
@@ -0,0 +1,112 @@
+"""Génération vectorisée des features pour une grille de scénarios de prêt.
+
+Version "tableau" de generate_smart_features (streamlit_app.py) : chaque paramètre
+peut être un scalaire ou un tableau, et toute la grille (montant, apport, durée,
+assurance) est calculée en une passe numpy. Pour un scénario donné, le vecteur
+produit est identique octet pour octet à celui de la version unitaire.
+"""
+import numpy as np
+
+N_FEATURES = 200
+TAUX_INTERET = 0.039
+TAUX_ASSURANCE = 0.005
+
+
+def offer_metrics(montant, apport, duree, revenus, charges, autres_credits, assurance):
+    """Mensualité, taux d'endettement, reste à vivre et risque métier [0..1] par scénario."""
+    montant, apport, duree, revenus, charges, autres_credits, assurance = np.broadcast_arrays(
+        *(np.asarray(v) for v in (montant, apport, duree, revenus, charges, autres_credits, assurance)))
+    duree = np.maximum(duree.astype(np.int64), 1)
+    montant_finance = np.maximum(montant - apport, 1000)
+
+    taux_assurance = np.where(assurance.astype(bool), TAUX_ASSURANCE, 0.0)
+    mensualite = (montant_finance / duree) * (1 + (TAUX_INTERET + taux_assurance) / 12 * duree)
+
+    total_charges = charges + autres_credits + mensualite
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taux_endettement = np.where(revenus > 0, (total_charges / revenus) * 100, 100.0)
+    reste_a_vivre = revenus - total_charges
+
+    risk = np.select([taux_endettement <= 33, taux_endettement <= 45], [0.0, 0.5], 1.0) \
+        + np.select([reste_a_vivre < 600, reste_a_vivre < 1200], [1.0, 0.5], 0.0)
+    risk = np.clip(risk / 2.0, 0.0, 1.0)
+
+    return {
+        'montant': montant, 'apport': apport, 'duree': duree, 'revenus': revenus,
+        'charges': charges, 'autres_credits': autres_credits, 'assurance': assurance.astype(bool),
+        'montant_finance': montant_finance, 'mensualite': mensualite,
+        'taux_endettement': taux_endettement, 'reste_a_vivre': reste_a_vivre, 'risk': risk,
+    }
+
+
+def scenario_seeds(m):
+    """Graine RNG de chaque scénario (même formule que la version unitaire)."""
+    return (
+        m['montant'].astype(np.int64) * 31
+        + m['apport'].astype(np.int64) * 17
+        + m['duree'].astype(np.int64) * 13
+        + m['revenus'].astype(np.int64) * 7
+        + m['charges'].astype(np.int64) * 5
+        + m['autres_credits'].astype(np.int64) * 3
+        + m['assurance'].astype(np.int64) * 11
+    )
+
+
+def generate_features_grid(montant, apport, duree, revenus, charges, autres_credits, assurance,
+                           direction_map, top_idx):
+    """Matrice (N x 200) des features + métriques métier pour N scénarios."""
+    m = offer_metrics(montant, apport, duree, revenus, charges, autres_credits, assurance)
+    seeds = scenario_seeds(m).ravel()
+
+    # Bruit de base : une graine par scénario (seule partie non vectorisable, ~µs par ligne)
+    features = np.empty((len(seeds), N_FEATURES))
+    for i, seed in enumerate(seeds):
+        features[i] = np.random.default_rng(int(seed)).normal(0, 1, N_FEATURES)
+
+    risk = m['risk'].ravel()
+    amplitude = 2.0 + 4.0 * risk
+    # bon profil -> baisse la proba ; profil risqué -> l'augmente ; zone intermédiaire -> 35 %
+    factor = np.select([risk <= 0.25, risk >= 0.75], [-1.0, 1.0], 0.35)
+    signs = np.array([direction_map.get(idx, 1) for idx in top_idx], dtype=np.float64)
+    top_idx = np.asarray(top_idx)
+    features[:, top_idx] += (factor * amplitude)[:, None] * signs[None, :]
+
+    return features, {k: v.ravel() for k, v in m.items()}
+
+
+def apply_business_rules(proba_modele, taux_endettement):
+    """Couche de cohérence métier (identique à l'étape 3) appliquée à un tableau de probabilités."""
+    proba_modele = np.asarray(proba_modele, dtype=np.float64)
+    return np.select(
+        [taux_endettement < 33, taux_endettement > 45],
+        [np.minimum(proba_modele, 0.30), np.maximum(proba_modele, 0.70)],
+        np.maximum(proba_modele, 0.45),
+    )
+
+
+def offer_grid(montant, apport, revenus, charges, autres_credits, assurance,
+               durees=(12, 24, 36, 48, 60, 72, 84), montant_ratios=(1.0, 0.9, 0.8, 0.7, 0.6, 0.5),
+               apport_steps=(0.0, 0.1, 0.2, 0.3)):
+    """Grille (durée x montant x apport supplémentaire) autour de la demande de l'utilisateur.
+
+    apport_steps : apport supplémentaire en fraction du montant demandé. 'apport_step' donne
+    le pas de chaque scénario (l'apport lui-même est plafonné au montant, cf. apports).
+    """
+    d, r, a = np.meshgrid(np.asarray(durees), np.asarray(montant_ratios),
+                          np.asarray(apport_steps), indexing='ij')
+    montants = np.round(montant * r / 500.0) * 500.0
+    apports = np.minimum(apport + np.round(montant * a / 500.0) * 500.0, montants)
+    return {
+        'montant': montants.ravel(), 'apport': apports.ravel(), 'duree': d.ravel(),
+        'revenus': revenus, 'charges': charges, 'autres_credits': autres_credits,
+        'assurance': assurance, 'apport_step': a.ravel(),
+    }
+
+
+def best_offer(metrics, final_proba, threshold=0.5):
+    """Index de la meilleure offre acceptée : plus gros montant financé, puis plus petite mensualité."""
+    accepted = np.flatnonzero(final_proba < threshold)
+    if not len(accepted):
+        return None
+    order = np.lexsort((metrics['mensualite'][accepted], -metrics['montant_finance'][accepted]))
+    return int(accepted[order[0]])
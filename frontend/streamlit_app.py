@@ -1,6 +1,8 @@
 import streamlit as st
 import requests
 import numpy as np
+import api_client
+from scenarios import apply_business_rules, best_offer, generate_features_grid, offer_grid
 import time
 import plotly.graph_objects as go
 import json
@@ -21,8 +23,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-API_URL = "http://127.0.0.1:5000/predict"
-
 # --- 2. STYLE CSS ---
 st.markdown("""
     <style>
@@ -103,70 +103,51 @@ for key, val in defaults.items():
 
 # --- 4. FONCTIONS MÉTIER ---
 def generate_smart_features(montant, apport, duree, revenus, charges, autres_credits, assurance):
-    """Features déterministes + ajustement sur TOP features (SHAP)"""
-
-    duree = max(int(duree), 1)
-
-    montant_finance = max(montant - apport, 1000)
-
-    taux_interet = 0.039
-    taux_assurance = 0.005 if assurance else 0.0
-
-    mensualite = (montant_finance / duree) * (1 + (taux_interet + taux_assurance) / 12 * duree)
-
-    total_charges = charges + autres_credits + mensualite
-    taux_endettement = (total_charges / revenus) * 100 if revenus > 0 else 100.0
-    reste_a_vivre = revenus - total_charges
-
-    seed = (
-        int(montant) * 31
-        + int(apport) * 17
-        + int(duree) * 13
-        + int(revenus) * 7
-        + int(charges) * 5
-        + int(autres_credits) * 3
-        + (1 if assurance else 0) * 11
-    )
-    rng = np.random.default_rng(seed)
-    features = rng.normal(0, 1, 200)
+    """Features déterministes + ajustement sur TOP features (SHAP)
 
+    Cas particulier (1 scénario) de generate_features_grid (scenarios.py).
+    """
     # IMPORTANT : directions apprises sur une base fixe
     direction_map = get_or_build_direction_map()
 
-    # Risk métier [0..1]
-    risk = 0.0
-    if taux_endettement <= 33:
-        risk += 0.0
-    elif taux_endettement <= 45:
-        risk += 0.5
-    else:
-        risk += 1.0
-
-    if reste_a_vivre < 600:
-        risk += 1.0
-    elif reste_a_vivre < 1200:
-        risk += 0.5
-    else:
-        risk += 0.0
-
-    risk = min(max(risk / 2.0, 0.0), 1.0)
-
-    amplitude = 2.0 + 4.0 * risk
-
-    for idx in TOP_IDX:
-        sign = direction_map.get(idx, 1)  # +1 => +delta augmente proba ; -1 => +delta diminue proba
-
-        if risk <= 0.25:
-            # bon profil -> on cherche à baisser la proba
-            features[idx] -= sign * amplitude
-        elif risk >= 0.75:
-            # profil risqué -> on cherche à augmenter la proba
-            features[idx] += sign * amplitude
-        else:
-            # zone intermédiaire
-            features[idx] += sign * (amplitude * 0.35)
+    features, m = generate_features_grid(
+        montant, apport, duree, revenus, charges, autres_credits, assurance, direction_map, TOP_IDX
+    )
+    return (features[0].tolist(), float(m['taux_endettement'][0]),
+            float(m['mensualite'][0]), float(m['reste_a_vivre'][0]))
 
-    return features.tolist(), taux_endettement, mensualite, reste_a_vivre
+
+def score_offer_grid():
+    """Score en un seul appel batch toute la grille d'offres autour de la demande courante."""
+    grid = offer_grid(
+        st.session_state.montant, st.session_state.apport, st.session_state.revenus,
+        st.session_state.charges, st.session_state.autres_credits, st.session_state.assurance
+    )
+    apport_step = grid.pop('apport_step')
+    features, metrics = generate_features_grid(
+        **grid, direction_map=get_or_build_direction_map(), top_idx=TOP_IDX
+    )
+    metrics['apport_step'] = apport_step
+    proba = api_client.predict_batch(features)
+    return metrics, apply_business_rules(proba, metrics['taux_endettement'])
+
+
+def get_offer_heatmap(metrics, final_proba):
+    """Surface d'acceptation : score de solvabilité par durée et montant (apport actuel)."""
+    base = metrics['apport_step'] == 0
+    durees = np.unique(metrics['duree'][base])
+    montants = np.unique(metrics['montant'][base])
+    z = np.full((len(montants), len(durees)), np.nan)
+    for d, mt, p in zip(metrics['duree'][base], metrics['montant'][base], final_proba[base]):
+        z[np.searchsorted(montants, mt), np.searchsorted(durees, d)] = (1 - p) * 100
+
+    fig = go.Figure(go.Heatmap(
+        z=z, x=[f"{d} mois" for d in durees], y=[f"{m:,.0f} €" for m in montants],
+        colorscale=[[0, "#ef4444"], [0.5, "#fff7ed"], [1, "#22c55e"]], zmin=0, zmax=100,
+        colorbar={'title': "Score"}
+    ))
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=30, b=20), title="Score selon montant et durée")
+    return fig
 
 def next_step(): st.session_state.step += 1; st.rerun()
 def prev_step(): st.session_state.step -= 1; st.rerun()
@@ -198,14 +179,6 @@ def get_gauge_chart(probability):
     fig.update_layout(height=250, margin=dict(l=20, r=20, t=50, b=20))
     return fig
 
-def api_predict_proba(features: list) -> float:
-    """Appelle l'API et renvoie probability (float)."""
-    r = requests.post(API_URL, json={"features": features}, timeout=8)
-    r.raise_for_status()
-    data = r.json()
-    return float(data["probability"])
-
-
 def load_direction_cache():
     """Charge DIRECTION depuis un JSON si dispo."""
     if DIRECTION_CACHE_PATH.exists():
@@ -229,23 +202,12 @@ def save_direction_cache(direction: dict):
 def learn_directions_via_api(base_features: list, indices: list, delta: float = 0.35) -> dict:
     """
     Apprend direction[idx] = +1 si augmenter idx augmente la proba (plus risqué),
-    sinon -1.
+    sinon -1. Un seul appel à /sensitivity : l'API score toutes les perturbations d'un coup.
     """
-    base = np.array(base_features, dtype=float)
-
-    # proba de référence
-    p0 = api_predict_proba(base.tolist())
-
-    direction = {}
-    for idx in indices:
-        test = base.copy()
-        test[idx] += delta
-        p1 = api_predict_proba(test.tolist())
-
-        # +delta augmente la proba => direction +1 ; sinon -1
-        direction[idx] = 1 if (p1 > p0) else -1
+    data = api_client.sensitivity(tuple(base_features), tuple(indices), float(delta))
 
-    return direction
+    # +delta augmente la proba => direction +1 ; sinon -1
+    return {idx: (1 if d > 0 else -1) for idx, d in zip(data["indices"], data["deltas"])}
 
 
 def get_or_build_direction_map(_features_seeded_unused=None) -> dict:
@@ -413,13 +375,7 @@ with st.container(border=True):
             if st.button("← Retour"): prev_step()
         with c2:
             if st.button("Analyser ma demande"):
-                # 1. Simulation d'attente "Traitement"
-                progress = st.progress(0)
-                for i in range(100):
-                    time.sleep(0.015)
-                    progress.progress(i + 1)
-                
-                # 2. Génération des features intelligentes + Calcul du taux réel
+                # 1. Génération des features intelligentes + Calcul du taux réel
                 # On passe tous les nouveaux champs à la fonction
                 smart_features, taux_endettement, mensualite_finale, reste_a_vivre = generate_smart_features(
                     st.session_state.montant, st.session_state.apport, st.session_state.duree,
@@ -432,29 +388,30 @@ with st.container(border=True):
                 st.session_state.mensualite_finale = mensualite_finale
                 st.session_state.reste_a_vivre = reste_a_vivre
                 
-                # 3. Appel API
+                # 2. Appel API lancé tout de suite ; la barre "Traitement" s'anime pendant l'attente
+                future = api_client.predict_proba_async(smart_features)
+                progress = st.progress(0)
+                i = 0
+                while not future.done() and i < 99:
+                    time.sleep(0.015)
+                    i += 1
+                    progress.progress(i)
+                
+                # 3. Résultat API
                 try:
-                    response = requests.post(API_URL, json={'features': smart_features})
-                    
-                    if response.status_code == 200:
-                        proba_modele = response.json()['probability']
+                    proba_modele = future.result()
                         
-                        # --- 4. COUCHE DE COHÉRENCE MÉTIER ---
-                        final_proba = proba_modele
-
-                        if taux_endettement < 33:
-                            final_proba = min(proba_modele, 0.30) # Vert foncé
-                        elif taux_endettement > 45:
-                            final_proba = max(proba_modele, 0.70) # Rouge
-                        else:
-                            # Entre 33% et 45%, on laisse une zone orange/grise selon le modèle
-                            # mais on s'assure de ne pas être trop optimiste
-                            final_proba = max(proba_modele, 0.45) 
-
-                        st.session_state.result_proba = final_proba
-                        next_step() # Go to step 4
-                    else:
-                        st.error("Erreur technique API")
+                    # --- 4. COUCHE DE COHÉRENCE MÉTIER ---
+                    # < 33 % : vert foncé ; > 45 % : rouge ; entre les deux, zone orange/grise
+                    # selon le modèle sans être trop optimiste (scenarios.apply_business_rules)
+                    final_proba = float(apply_business_rules(proba_modele, taux_endettement))
+
+                    progress.progress(100)
+                    st.session_state.result_proba = final_proba
+                    next_step() # Go to step 4
+
+                except requests.HTTPError:
+                    st.error("Erreur technique API")
                         
                 except Exception as e:
                     # Fallback si l'API est éteinte
@@ -490,5 +447,31 @@ with st.container(border=True):
             st.metric("Taux d'endettement après projet", f"{taux:.1f} %", delta="- Trop élevé", delta_color="inverse")
             st.metric("Reste à vivre", f"{rav:.0f} €")
             
+            # Offres alternatives : toute la grille (durée x montant x apport) en un seul appel
+            with st.expander("💡 Voir les offres alternatives", expanded=True):
+                try:
+                    metrics, final_grid = score_offer_grid()
+                    best = best_offer(metrics, final_grid)
+                    if best is None:
+                        st.write("Aucune offre alternative ne peut être proposée avec ces revenus.")
+                    else:
+                        st.success(
+                            f"Offre possible : **{metrics['montant_finance'][best]:.0f} €** sur "
+                            f"**{metrics['duree'][best]} mois** (apport {metrics['apport'][best]:.0f} €), "
+                            f"soit **{metrics['mensualite'][best]:.2f} € / mois**."
+                        )
+                        if st.button("Choisir cette offre"):
+                            st.session_state.montant = int(metrics['montant'][best])
+                            st.session_state.apport = int(metrics['apport'][best])
+                            st.session_state.duree = int(metrics['duree'][best])
+                            st.session_state.result_proba = float(final_grid[best])
+                            st.session_state.taux_endettement = float(metrics['taux_endettement'][best])
+                            st.session_state.mensualite_finale = float(metrics['mensualite'][best])
+                            st.session_state.reste_a_vivre = float(metrics['reste_a_vivre'][best])
+                            st.rerun()
+                    st.plotly_chart(get_offer_heatmap(metrics, final_grid), width="stretch")
+                except Exception:
+                    st.info("Offres alternatives indisponibles pour le moment.")
+            
         if st.button("Nouvelle simulation"):
             restart()
\ No newline at end of file
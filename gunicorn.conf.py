@@ -0,0 +1,36 @@
+# Configuration gunicorn de l'API (utilisée par start.sh : gunicorn -c gunicorn.conf.py api.app:app)
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.topology import pin_threads, resolve_topology
+
+bind = os.environ.get("API_BIND", "127.0.0.1:5000")
+
+# Workers x threads x threads LightGBM réglés ensemble (api/topology.py) : variables
+# API_WORKERS / API_THREADS / MODEL_NUM_THREADS, sinon serving.json calibré par
+# scripts/calibrate_serving.py, sinon un worker mono-thread par cœur.
+topology = resolve_topology()
+workers = topology.workers
+threads = topology.threads
+worker_class = topology.worker_class
+# Avant l'import de l'application (preload) : OpenMP / BLAS créent leurs pools à la première utilisation
+pin_threads(topology.num_threads)
+
+# Le modèle est chargé une seule fois dans le master, puis partagé en copy-on-write
+# par les workers forkés : ajouter un worker ne recharge ni ne réimporte rien.
+# ⚠️ Le master ne doit pas lancer de prédiction LightGBM multi-thread (OpenMP n'est
+# pas fork-safe) : le modèle est entraîné avec n_jobs=1.
+preload_app = True
+
+
+def when_ready(server):
+    server.log.info(f"Topologie : {topology!r}, {topology.oversubscription():.2f} thread(s) de calcul par cœur")
+
+
+def pre_fork(server, worker):
+    # Gèle les objets déjà chargés : le GC des workers ne touche plus leurs pages,
+    # qui restent partagées avec le master au lieu d'être copiées.
+    gc.freeze()
@@ -0,0 +1,319 @@
+"""Banc de charge et de latence de l'API de scoring.
+
+Rejoue un journal de requêtes JSONL (une requête par ligne : {"endpoint": "/predict",
+"features": [...]} ou {"features": [[...], ...]} pour un lot) ou, à défaut, des
+payloads synthétiques de 200 features tirés autour de la moyenne / de l'écart-type
+du jeu d'entraînement (models/scaler_params.npy ou scaler.pkl), contre :
+  - l'application Flask en process (test client, sans réseau) : --target inprocess
+  - une API déjà lancée (gunicorn) : --target http://127.0.0.1:5000
+
+Rapport : débit, latences p50/p90/p99 par type de requête, mémoire (RSS) des
+workers ; sauvegardé en JSON (-o) et comparable à une référence (--baseline).
+
+Usage :
+    python scripts/benchmark.py --requests 2000 --concurrency 8 --mix single=0.9,batch=0.1 -o bench.json
+    python scripts/benchmark.py --target http://127.0.0.1:5000 --baseline bench.json
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+MODELS_DIR = os.path.join(ROOT, 'models')
+N_FEATURES = 200
+ENDPOINTS = {'single': '/predict', 'batch': '/predict_batch'}
+PERCENTILES = (50, 90, 99)
+
+
+# --- PAYLOADS ---
+def load_payloads(path):
+    """Requêtes (kind, body) d'un fichier JSONL (ou .jsonl.gz, ex : journal d'audit de l'API).
+
+    Les lignes sans features valides sont ignorées.
+    """
+    payloads = []
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                X = np.asarray(record['features'], dtype=np.float64)
+            except (ValueError, KeyError, TypeError):
+                continue
+            if X.shape[-1:] != (N_FEATURES,) or X.ndim > 2:
+                continue
+            kind = 'batch' if X.ndim == 2 or record.get('endpoint') == ENDPOINTS['batch'] else 'single'
+            payloads.append((kind, {'features': X.tolist()}))
+    return payloads
+
+
+def feature_distribution(models_dir=MODELS_DIR):
+    """(moyenne, écart-type) par feature du jeu d'entraînement, lus dans les paramètres du scaler.
+
+    Sans eux (ni scaler_params.npy ni scaler.pkl), N(0, 1) : les arbres ne voient alors
+    que des valeurs centrées, loin des seuils réels, et la latence mesurée n'est pas représentative.
+    """
+    from api.inference import NATIVE_SCALER_NAME
+
+    params_file = os.path.join(models_dir, NATIVE_SCALER_NAME)
+    if os.path.exists(params_file):
+        mean, scale = np.load(params_file, allow_pickle=False)
+        return mean, scale
+    scaler_file = os.path.join(models_dir, 'scaler.pkl')
+    if os.path.exists(scaler_file):
+        import joblib
+
+        scaler = joblib.load(scaler_file)
+        return np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64)
+    print(f"⚠️ Paramètres du scaler introuvables dans {models_dir} : features synthétiques ~ N(0, 1)")
+    return np.zeros(N_FEATURES), np.ones(N_FEATURES)
+
+
+def synthetic_payloads(n, mix, batch_size, seed=0, distribution=None):
+    """n requêtes tirées selon le mélange {kind: poids}, features ~ N(moyenne, écart-type) par colonne.
+
+    distribution : (moyenne, écart-type) de feature_distribution() ; défaut N(0, 1).
+    """
+    mean, scale = distribution if distribution is not None else (0.0, 1.0)
+    rng = np.random.default_rng(seed)
+    kinds = list(mix)
+    weights = np.array([mix[k] for k in kinds], dtype=np.float64)
+    drawn = rng.choice(len(kinds), size=n, p=weights / weights.sum())
+    payloads = []
+    for i in drawn:
+        kind = kinds[i]
+        rows = 1 if kind == 'single' else batch_size
+        X = rng.normal(mean, scale, size=(rows, N_FEATURES))
+        payloads.append((kind, {'features': X[0].tolist() if kind == 'single' else X.tolist()}))
+    return payloads
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Type inconnu : {kind} (attendu : {', '.join(ENDPOINTS)})")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+# --- CIBLES ---
+class InProcessTarget:
+    """Application Flask importée dans ce process ; un test client par thread."""
+
+    name = 'inprocess'
+
+    def __init__(self):
+        from api.app import app
+
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.post(path, json=body).status_code
+
+    def memory(self):
+        return {str(os.getpid()): process_memory(os.getpid())}
+
+
+class HttpTarget:
+    """API distante (gunicorn) ; une requests.Session (keep-alive) par thread."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.name = base_url
+        self.base_url = base_url.rstrip('/')
+        self._requests = requests
+        self._local = threading.local()
+
+    def post(self, path, body):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session.post(self.base_url + path, json=body, timeout=30).status_code
+
+    def memory(self):
+        # Mémoire lisible seulement si l'API tourne sur la même machine
+        return {str(pid): process_memory(pid) for pid in gunicorn_pids()}
+
+
+def process_memory(pid):
+    """RSS courant et pic (Mo) d'un process, lus dans /proc (Linux)."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = int(rest.split()[0]) / 1024.0
+    except OSError:
+        return None
+    return {'rss_mb': values.get('VmRSS'), 'peak_rss_mb': values.get('VmHWM')}
+
+
+def gunicorn_pids():
+    pids = []
+    for entry in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                args = f.read().split(b'\0')
+        except OSError:
+            continue
+        if any(a.endswith(b'gunicorn') for a in args) and b'api.app:app' in args:
+            pids.append(int(entry))
+    return pids
+
+
+# --- EXÉCUTION ---
+def run(target, payloads, concurrency, warmup=20):
+    """Rejoue les payloads avec `concurrency` threads ; renvoie le rapport (dict)."""
+    for kind, body in payloads[:warmup]:
+        target.post(ENDPOINTS[kind], body)
+
+    latencies = {kind: [] for kind in ENDPOINTS}
+    errors = {kind: 0 for kind in ENDPOINTS}
+    rows = {kind: 0 for kind in ENDPOINTS}
+    lock = threading.Lock()
+
+    def send(payload):
+        kind, body = payload
+        started = time.perf_counter()
+        try:
+            ok = target.post(ENDPOINTS[kind], body) == 200
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies[kind].append(elapsed)
+            if ok:
+                rows[kind] += np.atleast_2d(body['features']).shape[0]
+            else:
+                errors[kind] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, payloads))
+    wall = time.perf_counter() - started
+
+    report = {
+        'target': target.name,
+        'concurrency': concurrency,
+        'requests': len(payloads),
+        'wall_s': wall,
+        'throughput_rps': len(payloads) / wall,
+        'rows_per_s': sum(rows.values()) / wall,
+        'errors': sum(errors.values()),
+        'endpoints': {},
+        'memory': target.memory(),
+        'env': {
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'inference_backend': os.environ.get('INFERENCE_BACKEND', 'lightgbm'),
+        },
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    for kind, values in latencies.items():
+        if not values:
+            continue
+        ms = np.asarray(values) * 1000.0
+        stats = {'count': len(values), 'errors': errors[kind], 'mean_ms': float(ms.mean())}
+        stats.update({f'p{q}_ms': float(np.percentile(ms, q)) for q in PERCENTILES})
+        report['endpoints'][kind] = stats
+    return report
+
+
+def compare(report, baseline):
+    """Écarts relatifs (%) avec la référence : débit et latences par type de requête."""
+    def delta(new, old):
+        return (new - old) / old * 100.0 if old else None
+
+    diff = {'throughput_rps': delta(report['throughput_rps'], baseline['throughput_rps']), 'endpoints': {}}
+    for kind, stats in report['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(kind)
+        if old:
+            diff['endpoints'][kind] = {key: delta(stats[key], old[key])
+                                       for key in ('p50_ms', 'p99_ms', 'mean_ms')}
+    return diff
+
+
+def print_report(report, diff=None):
+    def fmt(value):
+        return '' if value is None else f" ({value:+.1f} %)"
+
+    print(f"\n📊 {report['requests']} requêtes, {report['concurrency']} threads, cible : {report['target']}")
+    print(f"   Débit  : {report['throughput_rps']:,.0f} req/s, {report['rows_per_s']:,.0f} lignes/s"
+          f"{fmt(diff and diff['throughput_rps'])}")
+    print(f"   Erreurs: {report['errors']}")
+    for kind, stats in report['endpoints'].items():
+        d = (diff or {}).get('endpoints', {}).get(kind, {})
+        print(f"   {ENDPOINTS[kind]:<15} n={stats['count']:<6} "
+              f"p50={stats['p50_ms']:.2f} ms{fmt(d.get('p50_ms'))}  "
+              f"p99={stats['p99_ms']:.2f} ms{fmt(d.get('p99_ms'))}")
+    for pid, mem in report['memory'].items():
+        if mem:
+            print(f"   Mémoire pid {pid} : RSS {mem['rss_mb']:.0f} Mo (pic {mem['peak_rss_mb']:.0f} Mo)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='inprocess', help="'inprocess' ou URL de l'API")
+    parser.add_argument('--payloads', help="Journal JSONL à rejouer (défaut : payloads synthétiques)")
+    parser.add_argument('--requests', type=int, default=1000, help="Nombre de requêtes synthétiques")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', type=parse_mix, default={'single': 0.9, 'batch': 0.1},
+                        help="Mélange de requêtes, ex : single=0.9,batch=0.1")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--models-dir', default=MODELS_DIR,
+                        help="Dossier des paramètres du scaler (distribution des payloads synthétiques)")
+    parser.add_argument('-o', '--output', help="Fichier JSON du rapport")
+    parser.add_argument('--baseline', help="Rapport JSON de référence à comparer")
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help="Code de sortie 1 si le p99 se dégrade de plus de N %% par rapport à la référence")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads) if args.payloads else []
+    if args.payloads and not payloads:
+        print(f"⚠️ Aucune requête exploitable dans {args.payloads} : payloads synthétiques")
+    if not payloads:
+        payloads = synthetic_payloads(args.requests, args.mix, args.batch_size, args.seed,
+                                      feature_distribution(args.models_dir))
+
+    target = InProcessTarget() if args.target == 'inprocess' else HttpTarget(args.target)
+    report = run(target, payloads, args.concurrency)
+
+    diff = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            diff = compare(report, json.load(f))
+        report['baseline'] = {'path': args.baseline, 'delta_pct': diff}
+    print_report(report, diff)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Rapport enregistré : {args.output}")
+
+    if diff and args.max_regression is not None:
+        worst = max((d['p99_ms'] for d in diff['endpoints'].values() if d.get('p99_ms') is not None),
+                    default=0.0)
+        if worst > args.max_regression:
+            print(f"❌ Régression du p99 : {worst:+.1f} % (seuil {args.max_regression} %)")
+            sys.exit(1)
@@ -0,0 +1,196 @@
+"""Construit la variante compacte d'une version du modèle (tier "fast" de l'API).
+
+Étapes :
+  1. classement des features par |contribution SHAP| moyenne du modèle complet
+     (pred_contrib LightGBM, comme l'analyse du notebook 03) sur un échantillon ;
+  2. petit ensemble LightGBM ré-entraîné sur les top-k features, dans l'espace du
+     scaler de la version (mêmes split et graine que scripts/train.py), avec des
+     arbres moins profonds et un nombre d'arbres plafonné (early stopping) ;
+  3. compilation en tableaux plats (api/tree_engine.py), scaler replié dans les
+     seuils, seuils et feuilles quantifiés en float32 ;
+  4. rapport : AUC du modèle complet et du compact sur la validation, latence
+     (1 ligne et lot) et empreinte mémoire / taille de requête des deux modèles.
+
+Sorties dans le dossier de la version : compact_model.npz et compact_report.json,
+chargés par l'API avec la version (api/registry.py).
+
+Usage : python scripts/build_compact_model.py [data/train.csv] [--version v2] [--top-k 30]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.compact import COMPACT_MODEL_NAME, COMPACT_REPORT_NAME, CompactScorer
+from api.inference import FEATURE_NAMES
+from api.registry import DEFAULT_VERSION, bundle_dir, load_bundle
+from api.tree_engine import compile_booster
+from scripts.data_store import load_arrays
+from scripts.train import BASE_PARAMS, CHUNK_ROWS, stratified_split
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODELS_DIR = os.path.join(ROOT, 'models')
+
+COMPACT_PARAMS = {'num_leaves': 15, 'learning_rate': 0.05, 'min_child_samples': 50}
+
+
+def shap_ranking(scorer, X, rows, sample_rows, seed):
+    """Indices des features triés par |contribution SHAP| moyenne décroissante."""
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(rows, size=min(sample_rows, len(rows)), replace=False))
+    importance = np.zeros(scorer.n_features)
+    for start in range(0, len(sample), CHUNK_ROWS):
+        contrib = scorer.contributions(np.asarray(X[sample[start:start + CHUNK_ROWS]], dtype=np.float64))
+        importance += np.abs(contrib[:, :-1]).sum(axis=0)
+    importance /= len(sample)
+    return np.argsort(-importance, kind='stable'), importance
+
+
+def scaled_columns(X, rows, columns, mean, scale):
+    """Lignes `rows`, colonnes `columns` de X dans l'espace du scaler (lecture par blocs)."""
+    out = np.empty((len(rows), len(columns)), dtype=np.float32)
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = np.asarray(X[rows[start:start + CHUNK_ROWS]], dtype=np.float64)[:, columns]
+        out[start:start + len(chunk)] = (chunk - mean[columns]) / scale[columns]
+    return out
+
+
+def raw_rows(X, rows):
+    return np.asarray(X[rows], dtype=np.float64)
+
+
+def time_predict(predict, X, repeat):
+    """Latence médiane (ms) de predict(X) sur `repeat` appels."""
+    predict(X)
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predict(X)
+        durations.append(time.perf_counter() - started)
+    return float(np.median(durations) * 1000)
+
+
+def payload_bytes(row):
+    """Taille du corps JSON /predict pour une ligne."""
+    return len(json.dumps({'features': row.tolist()}).encode())
+
+
+def build_compact_model(csv_path, version=DEFAULT_VERSION, models_dir=MODELS_DIR, top_k=30,
+                        max_trees=200, early_stopping=50, params=None, shap_rows=20000,
+                        val_size=0.2, seed=42):
+    import lightgbm as lgb
+    from sklearn.metrics import roc_auc_score
+
+    started = time.perf_counter()
+    directory = bundle_dir(models_dir, version)
+    scorer, _, _ = load_bundle(directory, backend='flat')
+    params = {**COMPACT_PARAMS, **(params or {})}
+
+    X, y, _ = load_arrays(csv_path)
+    if y is None:
+        raise SystemExit(f"❌ {csv_path} n'a pas de colonne target")
+    train_idx, val_idx = stratified_split(y, val_size, seed)
+
+    # 1. Classement SHAP (sur le train uniquement)
+    print(f"🔎 Contributions SHAP du modèle complet sur {min(shap_rows, len(train_idx))} lignes...")
+    order, importance = shap_ranking(scorer, X, train_idx, shap_rows, seed)
+    columns = np.sort(order[:top_k])
+    coverage = float(importance[columns].sum() / importance.sum())
+    print(f"📌 Top {top_k} features : {coverage:.1%} de la contribution SHAP totale")
+
+    # 2. Ré-entraînement sur les colonnes retenues
+    X_train = scaled_columns(X, train_idx, columns, scorer.mean, scorer.scale)
+    X_valid = scaled_columns(X, val_idx, columns, scorer.mean, scorer.scale)
+    names = [FEATURE_NAMES[i] for i in columns]
+    train_set = lgb.Dataset(X_train, label=y[train_idx], feature_name=names, free_raw_data=True)
+    valid_set = lgb.Dataset(X_valid, label=y[val_idx], reference=train_set)
+    booster = lgb.train({**BASE_PARAMS, **params, 'num_threads': os.cpu_count() or 1}, train_set,
+                        num_boost_round=max_trees, valid_sets=[valid_set], valid_names=['valid'],
+                        callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+    n_trees = booster.best_iteration or max_trees
+    print(f"🌲 Modèle compact : {n_trees} arbres de {params['num_leaves']} feuilles max")
+
+    # 3. Tableaux plats, scaler replié, quantification float32
+    exact = compile_booster(booster, num_iteration=n_trees).fold_scaler(scorer.mean[columns],
+                                                                        scorer.scale[columns])
+    compact = CompactScorer(exact.to_float32(), columns, scorer.n_features)
+
+    # 4. Évaluation sur la validation (features brutes, comme l'API)
+    X_val = raw_rows(X, val_idx)
+    y_val = y[val_idx]
+    full_proba = scorer.predict_proba(X_val)
+    compact_proba = compact.predict_proba(X_val)
+    quantization_diff = float(np.max(np.abs(compact_proba - exact.predict_proba(X_val[:, columns]))))
+    one, batch = X_val[:1], X_val[:1000]
+    booster_full = scorer.booster
+
+    def lightgbm_full(rows):
+        return booster_full.predict(scorer.transform(rows))
+
+    report = {
+        'version': version,
+        'source': os.path.abspath(csv_path),
+        'features': names,
+        'columns': columns.tolist(),
+        'shap_coverage': coverage,
+        'params': params,
+        'trees': {'full': scorer.flat.n_trees, 'compact': compact.flat.n_trees},
+        'nodes': {'full': scorer.flat.n_nodes, 'compact': compact.flat.n_nodes},
+        'auc': {'full': float(roc_auc_score(y_val, full_proba)),
+                'compact': float(roc_auc_score(y_val, compact_proba))},
+        'agreement': float(np.mean((full_proba > 0.5) == (compact_proba > 0.5))),
+        'quantization_max_abs_diff': quantization_diff,
+        'latency_ms': {
+            'full_lightgbm': {'1': time_predict(lightgbm_full, one, 200),
+                              str(len(batch)): time_predict(lightgbm_full, batch, 20)},
+            'full_flat': {'1': time_predict(scorer.predict_proba, one, 200),
+                          str(len(batch)): time_predict(scorer.predict_proba, batch, 20)},
+            'compact': {'1': time_predict(compact.predict_proba, one, 200),
+                        str(len(batch)): time_predict(compact.predict_proba, batch, 20)},
+        },
+        'memory_bytes': {'full_flat': scorer.flat.nbytes, 'compact': compact.flat.nbytes},
+        'request_bytes': {'full': payload_bytes(X_val[0]), 'compact': payload_bytes(X_val[0, columns])},
+        'rows': {'train': int(len(train_idx)), 'validation': int(len(val_idx))},
+        'seed': seed,
+    }
+    report['auc']['delta'] = report['auc']['compact'] - report['auc']['full']
+
+    compact.save(os.path.join(directory, COMPACT_MODEL_NAME))
+    with open(os.path.join(directory, COMPACT_REPORT_NAME), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    latency = report['latency_ms']
+    print(f"✅ AUC validation : complet {report['auc']['full']:.4f}, compact {report['auc']['compact']:.4f} "
+          f"({report['auc']['delta']:+.4f})")
+    print(f"⏱️ 1 ligne : {latency['full_flat']['1']:.3f} -> {latency['compact']['1']:.3f} ms, "
+          f"{len(batch)} lignes : {latency['full_flat'][str(len(batch))]:.2f} -> "
+          f"{latency['compact'][str(len(batch))]:.2f} ms (moteur plat)")
+    print(f"💾 Mémoire : {report['memory_bytes']['full_flat'] / 1e6:.1f} -> "
+          f"{report['memory_bytes']['compact'] / 1e6:.2f} Mo ; requête : {report['request_bytes']['full']} -> "
+          f"{report['request_bytes']['compact']} octets")
+    print(f"📦 {COMPACT_MODEL_NAME}, {COMPACT_REPORT_NAME} -> {os.path.normpath(directory)} "
+          f"({time.perf_counter() - started:.0f} s)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default=os.path.join(ROOT, 'data', 'train.csv'))
+    parser.add_argument('--version', default=DEFAULT_VERSION, help="Version du registre (défaut : models/)")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--top-k', type=int, default=30, help="Nombre de features conservées")
+    parser.add_argument('--max-trees', type=int, default=200)
+    parser.add_argument('--num-leaves', type=int, default=COMPACT_PARAMS['num_leaves'])
+    parser.add_argument('--early-stopping', type=int, default=50)
+    parser.add_argument('--shap-rows', type=int, default=20000, help="Lignes utilisées pour le classement SHAP")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    build_compact_model(args.input, args.version, args.models_dir, top_k=args.top_k, max_trees=args.max_trees,
+                        early_stopping=args.early_stopping, params={'num_leaves': args.num_leaves},
+                        shap_rows=args.shap_rows, seed=args.seed)
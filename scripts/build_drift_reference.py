@@ -0,0 +1,41 @@
+"""Exporte l'histogramme de référence du suivi de dérive (api/drift.py) à partir du jeu d'entraînement.
+
+Sans ce fichier, le PSI de /drift est calculé face à une loi normale ; avec lui,
+face à la distribution réelle de chaque feature à l'entraînement (dans l'espace
+du scaler). Lecture via le cache float32 de scripts/data_store.py.
+
+Usage : python scripts/build_drift_reference.py [data/train.csv] [--models-dir models]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.drift import DRIFT_REFERENCE_NAME, reference_histogram
+from scripts.data_store import load_arrays
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def build_drift_reference(csv_path, models_dir):
+    import joblib
+
+    scaler = joblib.load(os.path.join(models_dir, 'scaler.pkl'))
+    X, _, _ = load_arrays(csv_path)
+    print(f"📊 Histogrammes de référence sur {len(X)} lignes...")
+    reference = reference_histogram(X, scaler.mean_, scaler.scale_)
+    output = os.path.join(models_dir, DRIFT_REFERENCE_NAME)
+    np.save(output, reference)
+    print(f"✅ Référence enregistrée : {os.path.normpath(output)}")
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default=os.path.join(ROOT, 'data', 'train.csv'))
+    parser.add_argument('--models-dir', default=os.path.join(ROOT, 'models'))
+    args = parser.parse_args()
+    build_drift_reference(args.input, args.models_dir)
@@ -0,0 +1,158 @@
+"""Calibre la topologie de service (workers x threads x threads LightGBM) pour cet hôte.
+
+Pour chaque combinaison candidate, l'API est lancée sous gunicorn (gunicorn.conf.py,
+port dédié), chauffée puis chargée par scripts/benchmark.py avec des payloads
+synthétiques ; on retient le meilleur débit (lignes/s) dont le p99 des requêtes
+unitaires respecte --max-p99-ms. Le résultat est écrit dans serving.json, relu par
+gunicorn.conf.py au démarrage tant que le nombre de cœurs de l'hôte est le même.
+
+Candidats : toutes les combinaisons sans oversubscription (workers x threads x
+threads LightGBM <= cœurs x --max-oversubscription), plus la configuration par
+défaut, pour mesurer le gain.
+
+Usage : python scripts/calibrate_serving.py [--requests 2000] [--concurrency 16] [--max-p99-ms 50]
+"""
+import argparse
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.topology import DEFAULT_SERVING_CONFIG, Topology, available_cpus, default_topology
+from scripts.benchmark import HttpTarget, run, synthetic_payloads
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+THREAD_CHOICES = (1, 2, 4, 8)
+
+
+def candidate_topologies(cpus, max_oversubscription=1.0, max_workers=None):
+    """Combinaisons (workers, threads, num_threads) dont le total de threads tient sur les cœurs."""
+    max_workers = max_workers or cpus
+    budget = cpus * max_oversubscription
+    worker_choices = sorted({w for w in (1, 2, 4, 8, 16, 32, cpus // 2, cpus) if 1 <= w <= max_workers})
+    candidates = [Topology(w, t, n, source='calibration')
+                  for w, t, n in itertools.product(worker_choices, THREAD_CHOICES, THREAD_CHOICES)
+                  if w * t * n <= budget]
+    default = default_topology(cpus)
+    if all(c.as_dict() != default.as_dict() for c in candidates):
+        candidates.append(default)
+    return candidates
+
+
+def wait_ready(base_url, timeout_s=60.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/ready', timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def measure(topology, port, payloads, concurrency):
+    """Lance gunicorn avec la topologie, rejoue les payloads ; renvoie le rapport de benchmark."""
+    env = {**os.environ, 'API_BIND': f'127.0.0.1:{port}', 'API_WORKERS': str(topology.workers),
+           'API_THREADS': str(topology.threads), 'MODEL_NUM_THREADS': str(topology.num_threads)}
+    # Pas de cache ni d'audit pendant la mesure : chaque requête passe par le modèle
+    env.update({'PREDICTION_CACHE_SIZE': '0', 'AUDIT_LOG_DIR': ''})
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api.app:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        if not wait_ready(base_url):
+            raise RuntimeError("l'API n'a pas répondu sur /ready")
+        return run(HttpTarget(base_url), payloads, concurrency)
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+
+
+def calibrate(requests=2000, concurrency=None, mix=None, batch_size=100, max_p99_ms=None,
+              max_oversubscription=1.0, max_workers=None, port=5099, output=DEFAULT_SERVING_CONFIG, seed=0):
+    cpus = available_cpus()
+    concurrency = concurrency or max(4, 2 * cpus)
+    mix = mix or {'single': 0.9, 'batch': 0.1}
+    payloads = synthetic_payloads(requests, mix, batch_size, seed)
+    candidates = candidate_topologies(cpus, max_oversubscription, max_workers)
+    print(f"🧪 {len(candidates)} topologies sur {cpus} cœur(s), {requests} requêtes x {concurrency} clients")
+
+    sweep = []
+    for topology in candidates:
+        try:
+            report = measure(topology, port, payloads, concurrency)
+        except Exception as e:
+            print(f"   ⚠️ {topology!r} : {e}")
+            sweep.append({**topology.as_dict(), 'error': str(e)})
+            continue
+        single = report['endpoints'].get('single', {})
+        result = {
+            **topology.as_dict(),
+            'oversubscription': topology.oversubscription(cpus),
+            'throughput_rps': report['throughput_rps'],
+            'rows_per_s': report['rows_per_s'],
+            'p50_ms': single.get('p50_ms'),
+            'p99_ms': single.get('p99_ms'),
+            'errors': report['errors'],
+        }
+        sweep.append(result)
+        print(f"   {topology.workers:>2} w x {topology.threads} t x {topology.num_threads} omp : "
+              f"{result['rows_per_s']:>9,.0f} lignes/s, p99 {result['p99_ms'] or 0:.2f} ms, "
+              f"{result['errors']} erreur(s)")
+
+    valid = [r for r in sweep if 'error' not in r and not r['errors']
+             and (max_p99_ms is None or (r['p99_ms'] or 0) <= max_p99_ms)]
+    if not valid:
+        raise SystemExit("❌ Aucune topologie ne respecte les contraintes : serving.json non écrit")
+    best = max(valid, key=lambda r: r['rows_per_s'])
+    default = next((r for r in valid if r['workers'] == cpus and r['threads'] == 1 and r['num_threads'] == 1), None)
+
+    config = {
+        'cpus': cpus,
+        'best': {k: best[k] for k in ('workers', 'threads', 'num_threads')},
+        'measured': best,
+        'gain_vs_default': best['rows_per_s'] / default['rows_per_s'] - 1.0 if default else None,
+        'load': {'requests': requests, 'concurrency': concurrency, 'mix': mix, 'batch_size': batch_size,
+                 'max_p99_ms': max_p99_ms},
+        'sweep': sweep,
+        'calibrated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    print(f"🏆 {best['workers']} worker(s) x {best['threads']} thread(s) x {best['num_threads']} thread(s) "
+          f"LightGBM : {best['rows_per_s']:,.0f} lignes/s, p99 {best['p99_ms'] or 0:.2f} ms")
+    print(f"💾 Configuration écrite : {os.path.normpath(output)}")
+    return config
+
+
+if __name__ == "__main__":
+    from scripts.benchmark import parse_mix
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help="Requêtes par topologie")
+    parser.add_argument('--concurrency', type=int, default=None, help="Clients simultanés (défaut : 2 x cœurs)")
+    parser.add_argument('--mix', type=parse_mix, default=None, help="Ex : single=0.9,batch=0.1")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--max-p99-ms', type=float, default=None, help="p99 max des requêtes unitaires")
+    parser.add_argument('--max-oversubscription', type=float, default=1.0,
+                        help="Threads de calcul par cœur autorisés dans le balayage")
+    parser.add_argument('--max-workers', type=int, default=None)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('-o', '--output', default=DEFAULT_SERVING_CONFIG)
+    args = parser.parse_args()
+
+    calibrate(args.requests, args.concurrency, args.mix, args.batch_size, args.max_p99_ms,
+              args.max_oversubscription, args.max_workers, args.port, args.output)
@@ -0,0 +1,276 @@
+"""Cache float32 mémoire-mappé des CSV Santander (train.csv / test.csv).
+
+Le CSV est converti une seule fois en fichiers .npy dans data/cache/<nom>/ :
+  - features.npy : matrice float32 (N x 200), ouverte en mmap (zéro copie)
+  - target.npy   : int8 (train uniquement)
+  - ids.npy      : ID_code (chaînes à largeur fixe)
+  - meta.json    : empreinte de la source (taille, mtime, hash blake2b)
+Le cache n'est régénéré que si le contenu de la source change. Il peut aussi être
+rempli directement depuis l'archive zip de la compétition, sans CSV sur disque
+(scripts/download_data.py) ; sans CSV (jamais extrait ou supprimé depuis), le cache
+fait foi. Chaque construction se fait dans un dossier temporaire mis en place d'un
+renommage : deux constructions simultanées ne mélangent pas leurs fichiers.
+
+Depuis un notebook :
+    import sys; sys.path.append('..')
+    from scripts.data_store import load_frame
+    df = load_frame('../data/train.csv')
+
+En ligne de commande : python scripts/data_store.py data/train.csv data/test.csv
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURE_NAMES = [f"var_{i}" for i in range(200)]
+CACHE_VERSION = 1
+CHUNK_ROWS = 20000
+HASH_BLOCK = 1 << 20
+
+
+def cache_dir_for(csv_path, cache_root=None):
+    csv_path = os.path.abspath(csv_path)
+    cache_root = cache_root or os.path.join(os.path.dirname(csv_path), 'cache')
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_root, name)
+
+
+def file_hash(path):
+    """Hash blake2b du fichier (lecture par blocs de 1 Mo)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan_stream(f):
+    """Une seule lecture d'un flux binaire : (nombre de lignes de données, hash blake2b)."""
+    h = hashlib.blake2b(digest_size=20)
+    lines = 0
+    last = b'\n'
+    for block in iter(lambda: f.read(HASH_BLOCK), b''):
+        h.update(block)
+        lines += block.count(b'\n')
+        last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return lines - 1, h.hexdigest()  # -1 : en-tête
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    tmp = os.path.join(cache_dir, 'meta.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(cache_dir, 'meta.json'))
+
+
+def is_fresh(csv_path, cache_dir):
+    """Le cache correspond-il au contenu actuel de la source ?
+
+    Taille + mtime identiques : pas de relecture. Sinon on compare le hash
+    (un simple `touch` ou une copie ne déclenche donc pas de reconstruction).
+    """
+    meta = _read_meta(cache_dir)
+    if not meta or meta.get('version') != CACHE_VERSION:
+        return False
+    if not os.path.exists(csv_path):
+        # Ingéré depuis l'archive sans CSV intermédiaire (rafraîchi par scripts/download_data.py),
+        # ou CSV supprimé après conversion : rien à comparer, le cache fait foi
+        return True
+    st = os.stat(csv_path)
+    if meta['source_size'] == st.st_size and meta['source_mtime_ns'] == st.st_mtime_ns:
+        return True
+    if meta['source_size'] != st.st_size or meta['source_hash'] != file_hash(csv_path):
+        return False
+    meta['source_mtime_ns'] = st.st_mtime_ns
+    _write_meta(cache_dir, meta)
+    return True
+
+
+class HashingReader(io.RawIOBase):
+    """Flux binaire en lecture qui calcule au passage le hash blake2b et la taille lus."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.hash = hashlib.blake2b(digest_size=20)
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        buffer[:len(data)] = data
+        self.hash.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def drain(self):
+        """Lit la fin du flux (hash complet même si le lecteur s'est arrêté avant)."""
+        for _ in iter(lambda: self.read(HASH_BLOCK), b''):
+            pass
+        return self.hash.hexdigest()
+
+
+def _write_header(f, n_rows, n_features):
+    # En-tête .npy de taille fixe (numpy réserve de la place pour la croissance de la 1re dimension) :
+    # écrit avec 0 ligne puis réécrit en place une fois le nombre de lignes connu
+    np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                                             'fortran_order': False, 'shape': (n_rows, n_features)})
+
+
+def build_cache(csv_path, cache_dir):
+    """Convertit le CSV en .npy float32 par blocs (mémoire bornée à CHUNK_ROWS lignes)."""
+    st = os.stat(csv_path)
+    with open(csv_path, 'rb') as f:
+        write_columns(f, cache_dir, {
+            'source': os.path.abspath(csv_path),
+            'source_size': st.st_size,
+            'source_mtime_ns': st.st_mtime_ns,
+        })
+
+
+def write_columns(stream, cache_dir, source_meta, feature_names=FEATURE_NAMES, validate=False):
+    """Écrit le cache en une seule lecture d'un flux CSV (fichier ou membre d'archive).
+
+    Blocs de CHUNK_ROWS lignes ajoutés à features.npy au fil de la lecture ; le hash
+    blake2b de la source (source_hash de meta.json) est calculé pendant la même passe.
+    validate : en-tête exactement ID_code, [target], feature_names ; cibles 0/1 et
+    features finies, sinon ValueError (le cache existant n'est pas touché).
+    Écrit dans un dossier temporaire voisin, mis en place à la fin (cf. _publish).
+    """
+    os.makedirs(os.path.dirname(cache_dir), exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(cache_dir)}.', dir=os.path.dirname(cache_dir))
+    try:
+        result = _write_columns(stream, build_dir, source_meta, feature_names, validate)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    os.chmod(build_dir, 0o755)
+    _publish(build_dir, cache_dir)
+    return result
+
+
+def _publish(build_dir, cache_dir):
+    """Remplace cache_dir par build_dir (renommages ; un mmap ouvert sur l'ancien cache reste valide)."""
+    old = None
+    if os.path.isdir(cache_dir):
+        old = build_dir + '.old'
+        try:
+            os.rename(cache_dir, old)
+        except FileNotFoundError:
+            old = None  # déplacé entre-temps par une construction concurrente
+    try:
+        os.rename(build_dir, cache_dir)
+    except OSError:
+        # Une construction concurrente (même source) vient de publier la sienne : on la garde
+        shutil.rmtree(build_dir, ignore_errors=True)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _write_columns(stream, cache_dir, source_meta, feature_names, validate):
+    name = source_meta['source']
+    source = HashingReader(stream)
+    reader = pd.read_csv(io.BufferedReader(source, HASH_BLOCK), dtype={f: np.float32 for f in feature_names},
+                         chunksize=CHUNK_ROWS)
+    features_path = os.path.join(cache_dir, 'features.npy')
+    has_target = None
+    targets, ids = [], []
+    n_rows = 0
+    with open(features_path, 'wb') as out:
+        _write_header(out, 0, len(feature_names))
+        header_size = out.tell()
+        for chunk in reader:
+            if has_target is None:
+                has_target = 'target' in chunk.columns
+                expected = ['ID_code'] + (['target'] if has_target else []) + list(feature_names)
+                if validate and chunk.columns.tolist() != expected:
+                    raise ValueError(f"{name} : colonnes inattendues (attendu ID_code, [target], "
+                                     f"{len(feature_names)} features de features.json)")
+            X = np.ascontiguousarray(chunk[feature_names].to_numpy(dtype=np.float32))
+            rows = f"lignes {n_rows}-{n_rows + len(chunk)}"
+            if validate and not np.isfinite(X).all():
+                raise ValueError(f"{name} : valeurs manquantes ou infinies ({rows})")
+            if has_target:
+                target = chunk['target'].to_numpy()
+                if validate and not np.isin(target, (0, 1)).all():
+                    raise ValueError(f"{name} : target hors de {{0, 1}} ({rows})")
+                targets.append(target.astype(np.int8))
+            out.write(X.data)
+            ids.append(chunk['ID_code'].to_numpy(dtype=str))
+            n_rows += len(chunk)
+        out.seek(0)
+        _write_header(out, n_rows, len(feature_names))
+        if out.tell() != header_size:
+            raise ValueError("En-tête .npy de taille variable : réécriture impossible")
+    source_hash = source.drain()
+
+    np.save(os.path.join(cache_dir, 'ids.npy'), np.concatenate(ids) if ids else np.array([], dtype=str))
+    if has_target:
+        np.save(os.path.join(cache_dir, 'target.npy'), np.concatenate(targets))
+    _write_meta(cache_dir, {
+        'version': CACHE_VERSION,
+        **source_meta,
+        'source_hash': source_hash,
+        'rows': n_rows,
+        'features': list(feature_names),
+        'dtype': 'float32',
+        'has_target': bool(has_target),
+    })
+    return n_rows, source_hash
+
+
+def ensure_cache(csv_path, cache_root=None):
+    """Renvoie le dossier de cache de csv_path, (re)construit seulement si nécessaire."""
+    cache_dir = cache_dir_for(csv_path, cache_root)
+    if not is_fresh(csv_path, cache_dir):
+        print(f"🔄 Construction du cache float32 pour {csv_path}...")
+        started = time.perf_counter()
+        build_cache(csv_path, cache_dir)
+        print(f"✅ Cache prêt en {time.perf_counter() - started:.1f} s : {cache_dir}")
+    return cache_dir
+
+
+def load_arrays(csv_path, cache_root=None):
+    """(X, y, ids) : X float32 (N x 200) en mmap lecture seule, y int8 ou None, ids."""
+    cache_dir = ensure_cache(csv_path, cache_root)
+    X = np.load(os.path.join(cache_dir, 'features.npy'), mmap_mode='r')
+    target_path = os.path.join(cache_dir, 'target.npy')
+    y = np.load(target_path) if os.path.exists(target_path) else None
+    ids = np.load(os.path.join(cache_dir, 'ids.npy'))
+    return X, y, ids
+
+
+def load_frame(csv_path, cache_root=None):
+    """DataFrame (ID_code, [target], var_0..var_199) adossé au cache, sans copie des features."""
+    X, y, ids = load_arrays(csv_path, cache_root)
+    df = pd.DataFrame(X, columns=FEATURE_NAMES, copy=False)
+    if y is not None:
+        df.insert(0, 'target', y)
+    df.insert(0, 'ID_code', ids)
+    return df
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or [os.path.join(os.path.dirname(__file__), '..', 'data', name)
+                             for name in ('train.csv', 'test.csv')]
+    for path in paths:
+        ensure_cache(path)
@@ -1,41 +1,135 @@
+"""Téléchargement et ingestion des données Santander (train.csv / test.csv).
+
+L'archive zip de la compétition (téléchargée depuis Kaggle, ou fichier local avec
+--archive, hors ligne) est lue en flux : chaque CSV est converti en une seule passe,
+sans CSV intermédiaire sur disque, dans le cache float32 de scripts/data_store.py
+(data/cache/<nom>/ : features.npy, target.npy, ids.npy, meta.json), en vérifiant
+colonnes et valeurs contre notebooks/features.json.
+
+meta.json garde le CRC du membre de l'archive et le hash blake2b du CSV : une donnée
+inchangée n'est ni relue ni reconvertie (relancer le script ne coûte rien). Le zip
+est conservé dans data/ pour que Kaggle ne le retélécharge pas s'il est à jour
+(--delete-archive pour le supprimer après ingestion).
+
+Usage :
+    python scripts/download_data.py
+    python scripts/download_data.py --archive ~/santander-customer-transaction-prediction.zip
+"""
+import argparse
+import json
 import os
-from kaggle.api.kaggle_api_extended import KaggleApi
+import sys
+import time
 import zipfile
 
-def download_santander_data():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.data_store import CACHE_VERSION, _read_meta, _write_meta, cache_dir_for, scan_stream, write_columns
+
+COMPETITION_NAME = 'santander-customer-transaction-prediction'
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_DIR = os.path.join(ROOT, 'data')
+FEATURES_FILE = os.path.join(ROOT, 'notebooks', 'features.json')
+MEMBERS = ('train.csv', 'test.csv')
+
+
+def download_archive(data_path=DATA_DIR):
+    """Télécharge le zip de la compétition (Kaggle ne le retélécharge pas s'il est à jour)."""
+    from kaggle.api.kaggle_api_extended import KaggleApi
+
     # 1. Authentification
     api = KaggleApi()
     api.authenticate()
-    
     print("✅ Authentification Kaggle réussie.")
 
-    # 2. Définition des chemins
-    competition_name = 'santander-customer-transaction-prediction'
-    # On remonte d'un niveau (..) pour aller dans data depuis scripts/
-    data_path = os.path.join(os.path.dirname(__file__), '..', 'data')
-    
-    # Création du dossier data s'il n'existe pas
-    if not os.path.exists(data_path):
-        os.makedirs(data_path)
-
-    # 3. Téléchargement
+    # 2. Téléchargement
+    os.makedirs(data_path, exist_ok=True)
     print(f"⬇️ Téléchargement des données dans {data_path}...")
+    api.competition_download_files(COMPETITION_NAME, path=data_path, quiet=False)
+    return os.path.join(data_path, f"{COMPETITION_NAME}.zip")
+
+
+def load_feature_names(path=FEATURES_FILE):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _archive_meta(archive, info):
+    return {
+        'source': f"{os.path.abspath(archive)}!{info.filename}",
+        'archive': os.path.abspath(archive),
+        'member': info.filename,
+        'archive_crc': info.CRC,
+        'source_size': info.file_size,
+        'source_mtime_ns': None,
+    }
+
+
+def ingest_member(zf, archive, member, feature_names, data_path=DATA_DIR):
+    """Convertit un CSV de l'archive dans le cache s'il a changé ; renvoie 'inchangé' ou 'converti'."""
+    info = zf.getinfo(member)
+    cache_dir = cache_dir_for(os.path.join(data_path, member))
+    meta = _read_meta(cache_dir)
+    current = bool(meta) and meta.get('version') == CACHE_VERSION and meta.get('features') == feature_names \
+        and os.path.exists(os.path.join(cache_dir, 'features.npy'))
+
+    # CRC et taille du membre (lus dans l'index du zip) identiques : rien à relire
+    if current and meta.get('archive_crc') == info.CRC and meta['source_size'] == info.file_size:
+        return 'inchangé'
+    # Même taille, CRC inconnu (cache construit depuis un CSV extrait) : on compare le hash
+    if current and meta['source_size'] == info.file_size:
+        with zf.open(info) as stream:
+            _, source_hash = scan_stream(stream)
+        if source_hash == meta['source_hash']:
+            _write_meta(cache_dir, {**meta, **_archive_meta(archive, info)})
+            return 'inchangé'
+
+    with zf.open(info) as stream:
+        write_columns(stream, cache_dir, _archive_meta(archive, info), feature_names, validate=True)
+    return 'converti'
+
+
+def ingest_archive(archive, data_path=DATA_DIR, features_file=FEATURES_FILE, members=MEMBERS):
+    """Ingestion idempotente des CSV de l'archive ; renvoie {membre: résumé}."""
+    feature_names = load_feature_names(features_file)
+    results = {}
+    with zipfile.ZipFile(archive) as zf:
+        for member in members:
+            started = time.perf_counter()
+            status = ingest_member(zf, archive, member, feature_names, data_path)
+            meta = _read_meta(cache_dir_for(os.path.join(data_path, member)))
+            results[member] = {'status': status, 'rows': meta['rows'], 'hash': meta['source_hash'],
+                               'seconds': time.perf_counter() - started}
+            icon = '⏭️' if status == 'inchangé' else '✅'
+            print(f"{icon} {member} : {status} ({meta['rows']} lignes, blake2b {meta['source_hash'][:12]}…, "
+                  f"{results[member]['seconds']:.1f} s)")
+    return results
+
+
+def download_santander_data(archive=None, data_path=DATA_DIR, delete_archive=False):
     try:
-        api.competition_download_files(competition_name, path=data_path)
-        
-        # 4. Décompression
-        zip_path = os.path.join(data_path, f"{competition_name}.zip")
-        print("📦 Décompression des fichiers...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(data_path)
-            
-        # Nettoyage du zip (optionnel)
-        os.remove(zip_path)
-        print("🎉 Terminé ! Les fichiers train.csv et test.csv sont prêts.")
-        
+        if archive is None:
+            archive = download_archive(data_path)
+        print(f"📦 Ingestion en flux de {archive}...")
+        results = ingest_archive(archive, data_path)
+        if delete_archive:
+            os.remove(archive)
+        print("🎉 Terminé ! Données prêtes dans le cache float32 (scripts/data_store.load_arrays).")
+        return results
+
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        print(f"❌ Erreur : {e}")
+        raise SystemExit(1)
     except Exception as e:
         print(f"❌ Erreur : {e}")
         print("💡 Astuce : As-tu accepté les règles de la compétition sur le site Kaggle ?")
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
-    download_santander_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--archive', help="Zip de la compétition déjà présent (pas d'accès réseau)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--delete-archive', action='store_true', help="Supprime le zip après ingestion")
+    args = parser.parse_args()
+    download_santander_data(args.archive, args.data_dir, args.delete_archive)
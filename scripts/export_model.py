@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.inference import export_native
+
+
+def export_model():
+    """Exporte best_model.pkl / scaler.pkl au format natif pour un démarrage rapide de l'API."""
+    models_dir = os.path.join(os.path.dirname(__file__), '..', 'models')
+    print("📦 Export des artefacts au format natif...")
+    model_file, scaler_params_file, flat_file = export_native(
+        os.path.join(models_dir, 'best_model.pkl'),
+        os.path.join(models_dir, 'scaler.pkl'),
+        models_dir,
+    )
+    print(f"✅ Modèle : {os.path.normpath(model_file)}")
+    print(f"✅ Scaler : {os.path.normpath(scaler_params_file)}")
+    print(f"✅ Ensemble compilé : {os.path.normpath(flat_file)}")
+
+
+if __name__ == "__main__":
+    export_model()
@@ -0,0 +1,65 @@
+"""Publie best_model.pkl + scaler.pkl comme nouvelle version du registre de modèles.
+
+Les deux fichiers sont copiés dans models/versions/<version>/ avec leurs artefacts
+natifs (api/inference.export_native), la référence de dérive et la variante compacte
+s'ils existent à côté du scaler. Avec --activate, models/registry.json est mis
+à jour : chaque worker de l'API charge la version en arrière-plan puis bascule,
+sans redémarrage (cf. api/registry.py). --shadow la place en scoring fantôme.
+
+Usage : python scripts/publish_model.py [--version v2] [--activate | --shadow 0.05]
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.compact import COMPACT_MODEL_NAME, COMPACT_REPORT_NAME
+from api.drift import DRIFT_REFERENCE_NAME
+from api.inference import export_native
+from api.registry import MODEL_NAME, SCALER_NAME, ModelRegistry, bundle_dir
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+
+def publish_model(model_path, scaler_path, version=None, models_dir=MODELS_DIR):
+    """Copie le couple modèle + scaler dans un dossier de version ; renvoie le nom de la version."""
+    version = version or time.strftime('v%Y%m%d-%H%M%S')
+    directory = bundle_dir(models_dir, version)
+    if os.path.exists(os.path.join(directory, MODEL_NAME)):
+        raise SystemExit(f"❌ La version {version} existe déjà : {os.path.normpath(directory)}")
+    os.makedirs(directory, exist_ok=True)
+    shutil.copy2(scaler_path, os.path.join(directory, SCALER_NAME))
+    shutil.copy2(model_path, os.path.join(directory, MODEL_NAME))
+    export_native(os.path.join(directory, MODEL_NAME), os.path.join(directory, SCALER_NAME), directory)
+    # Artefacts construits pour ce couple modèle + scaler (référence de dérive, variante compacte)
+    for name in (DRIFT_REFERENCE_NAME, COMPACT_MODEL_NAME, COMPACT_REPORT_NAME):
+        source = os.path.join(os.path.dirname(scaler_path), name)
+        if os.path.exists(source):
+            shutil.copy2(source, os.path.join(directory, name))
+    print(f"📦 Version {version} publiée : {os.path.normpath(directory)}")
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(MODELS_DIR, MODEL_NAME))
+    parser.add_argument('--scaler', default=os.path.join(MODELS_DIR, SCALER_NAME))
+    parser.add_argument('--version', help="Nom de la version (défaut : horodatage)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--activate', action='store_true', help="Servir cette version (rechargement à chaud)")
+    group.add_argument('--shadow', type=float, metavar='FRACTION',
+                       help="Scorer cette fraction du trafic sur la version, en fantôme")
+    args = parser.parse_args()
+
+    name = publish_model(args.model, args.scaler, args.version)
+    registry = ModelRegistry(MODELS_DIR)
+    if args.activate:
+        pointer = registry.read_pointer()
+        registry.write_pointer(version=name, model_revision=pointer.get('model_revision', 0) + 1)
+        print(f"🔁 {name} sera servie par les workers d'ici quelques secondes")
+    elif args.shadow is not None:
+        registry.write_pointer(shadow=name, shadow_fraction=args.shadow)
+        print(f"👥 {name} en scoring fantôme sur {args.shadow:.0%} des lignes")
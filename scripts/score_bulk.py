@@ -0,0 +1,137 @@
+"""Scoring hors-ligne d'un jeu complet (ex : data/test.csv) sans passer par l'API HTTP.
+
+Les features sont lues dans le cache float32 de scripts/data_store.py (rempli par
+scripts/download_data.py, ou construit depuis le CSV s'il est présent) : chaque
+processus du pool ouvre features.npy en mmap et score ses blocs de lignes avec les
+mêmes artefacts que l'API (models/scaler.pkl + models/best_model.pkl) ; seules les
+bornes des blocs et les probabilités transitent entre processus. Les résultats
+ID_code,probability,prediction sont écrits au fil de l'eau (CSV ou Parquet).
+La mémoire reste bornée : au plus 2 blocs en vol par processus.
+
+Usage : python scripts/score_bulk.py [data/test.csv] [-o data/predictions.csv] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.inference import load_scorer
+from scripts.data_store import load_arrays
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+_scorer = None
+_features = None
+
+
+def _init_worker(model_path, scaler_path, backend, features_path):
+    """Chargé une fois par processus du pool."""
+    global _scorer, _features
+    _scorer = load_scorer(model_path, scaler_path, backend=backend)
+    _features = np.load(features_path, mmap_mode='r')
+
+
+def _score_chunk(start, stop):
+    return _scorer.predict_proba(np.asarray(_features[start:stop], dtype=np.float64))
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ La sortie Parquet nécessite pyarrow (pip install pyarrow)")
+        self.path = path
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def score_csv(input_path, output_path, chunksize=20000, workers=None, backend='lightgbm', cache_root=None):
+    """Score input_path (via son cache float32) par blocs dans un pool de processus ; renvoie le nombre de lignes."""
+    workers = workers or os.cpu_count() or 1
+    X, _, ids = load_arrays(input_path, cache_root)
+    writer = _ParquetWriter(output_path) if output_path.endswith('.parquet') else _CsvWriter(output_path)
+
+    print(f"🚀 Scoring de {input_path} ({workers} processus, blocs de {chunksize} lignes)...")
+    started = time.perf_counter()
+    rows = 0
+    in_flight = deque()
+
+    def flush_oldest():
+        nonlocal rows
+        ids, future = in_flight.popleft()
+        probabilities = future.result()
+        writer.write(pd.DataFrame({
+            'ID_code': ids,
+            'probability': probabilities,
+            'prediction': (probabilities > 0.5).astype(np.int8),
+        }))
+        rows += len(ids)
+        elapsed = time.perf_counter() - started
+        print(f"   {rows:>9} lignes | {rows / elapsed:,.0f} lignes/s")
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(os.path.join(MODELS_DIR, 'best_model.pkl'),
+                                       os.path.join(MODELS_DIR, 'scaler.pkl'), backend, X.filename)) as pool:
+        for start in range(0, len(ids), chunksize):
+            stop = min(start + chunksize, len(ids))
+            in_flight.append((ids[start:stop], pool.submit(_score_chunk, start, stop)))
+            # Écriture dans l'ordre du fichier, au plus 2 blocs en attente par processus
+            while len(in_flight) >= 2 * workers:
+                flush_oldest()
+        while in_flight:
+            flush_oldest()
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"🎉 Terminé : {rows} lignes en {elapsed:.1f} s ({rows / max(elapsed, 1e-9):,.0f} lignes/s) "
+          f"-> {output_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default=os.path.join(DATA_DIR, 'test.csv'))
+    parser.add_argument('-o', '--output', default=os.path.join(DATA_DIR, 'predictions.csv'),
+                        help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument('--chunksize', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : nb de cœurs)")
+    parser.add_argument('--backend', choices=['lightgbm', 'flat'], default='lightgbm')
+    args = parser.parse_args()
+    try:
+        score_csv(args.input, args.output, args.chunksize, args.workers, args.backend)
+    except FileNotFoundError:
+        raise SystemExit(f"❌ Ni cache ni CSV pour {args.input} : lancer d'abord scripts/download_data.py")
@@ -0,0 +1,308 @@
+"""Pipeline d'entraînement scripté (remplace l'exécution manuelle des notebooks 02 et 03).
+
+Étapes :
+  1. données : cache float32 mémoire-mappé de scripts/data_store.py (CSV lu par blocs) ;
+  2. split train / validation stratifié (mêmes paramètres que les notebooks) ;
+  3. StandardScaler ajusté par blocs (partial_fit), matrice standardisée écrite en
+     float32 sur disque, puis Dataset LightGBM binaire mis en cache (réutilisé tant
+     que données, split et scaler sont identiques) ;
+  4. candidats LightGBM x plis de validation croisée évalués en parallèle (un
+     processus "spawn" par tâche, threads LightGBM répartis entre eux) avec early stopping ;
+  5. modèle final ré-entraîné sur tout le train depuis le même Dataset binaire avec le
+     meilleur candidat et le nombre d'arbres retenu par la CV, évalué sur la validation.
+
+Sorties (dans --output-dir, models/ par défaut) : scaler.pkl, best_model.pkl et
+training_report.json ; la liste des features va dans notebooks/features.json, là où
+le notebook 02 l'écrivait (lue par le notebook 03 et scripts/download_data.py).
+Tout est déterministe pour une même graine.
+
+Usage : python scripts/train.py [data/train.csv] [--jobs 4] [--folds 3] [--publish v3]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.data_store import FEATURE_NAMES, _read_meta, ensure_cache, load_arrays
+from scripts.download_data import FEATURES_FILE
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CHUNK_ROWS = 50000
+
+# Paramètres communs : binaire, déterministe (mêmes arbres quel que soit le nombre de threads)
+BASE_PARAMS = {
+    'objective': 'binary',
+    'metric': 'auc',
+    'verbosity': -1,
+    'deterministic': True,
+    'force_row_wise': True,
+    'seed': 42,
+}
+DATASET_PARAMS = {'max_bin': 255, 'verbosity': -1}
+
+# Candidats comparés en validation croisée (le premier reproduit le GridSearch du notebook 03)
+CANDIDATES = [
+    {'num_leaves': 31, 'learning_rate': 0.03},
+    {'num_leaves': 15, 'learning_rate': 0.03, 'min_child_samples': 50},
+    {'num_leaves': 31, 'learning_rate': 0.05, 'feature_fraction': 0.5},
+    {'num_leaves': 63, 'learning_rate': 0.03, 'feature_fraction': 0.5, 'lambda_l2': 1.0},
+]
+
+
+def stratified_split(y, val_size, seed):
+    from sklearn.model_selection import train_test_split
+
+    train_idx, val_idx = train_test_split(np.arange(len(y)), test_size=val_size, stratify=y, random_state=seed)
+    return np.sort(train_idx), np.sort(val_idx)
+
+
+def fit_scaler(X, rows):
+    """StandardScaler ajusté bloc par bloc sur les lignes `rows` de X (mémoire bornée)."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    for start in range(0, len(rows), CHUNK_ROWS):
+        scaler.partial_fit(np.asarray(X[rows[start:start + CHUNK_ROWS]], dtype=np.float64))
+    return scaler
+
+
+def write_scaled(X, rows, scaler, path):
+    """Lignes `rows` de X standardisées, écrites en float32 dans un .npy (renvoyé en mmap)."""
+    out = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=np.float32, shape=(len(rows), X.shape[1]))
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = np.asarray(X[rows[start:start + CHUNK_ROWS]], dtype=np.float64)
+        out[start:start + len(chunk)] = (chunk - scaler.mean_) / scaler.scale_
+    out.flush()
+    del out
+    os.replace(path + '.tmp', path)
+    return np.load(path, mmap_mode='r')
+
+
+def dataset_key(source_hash, train_idx, scaler, seed):
+    """Empreinte des entrées du Dataset binaire : il est réutilisé tant qu'elle ne change pas."""
+    h = hashlib.blake2b(digest_size=10)
+    h.update(source_hash.encode())
+    h.update(np.ascontiguousarray(train_idx).tobytes())
+    h.update(scaler.mean_.tobytes())
+    h.update(scaler.scale_.tobytes())
+    h.update(json.dumps([DATASET_PARAMS, seed], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def build_dataset(X_scaled, y, path):
+    """Dataset LightGBM (binning fait une fois) enregistré au format binaire."""
+    import lightgbm as lgb
+
+    dataset = lgb.Dataset(X_scaled, label=y, feature_name=FEATURE_NAMES, params=DATASET_PARAMS,
+                          free_raw_data=True)
+    dataset.save_binary(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def cv_folds(y, n_folds, seed):
+    from sklearn.model_selection import StratifiedKFold
+
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    return [(np.sort(a), np.sort(b)) for a, b in skf.split(np.zeros(len(y)), y)]
+
+
+def _run_fold(dataset_path, params, train_rows, valid_rows, max_rounds, early_stopping, threads):
+    """Une tâche (candidat, pli) : entraînement avec early stopping sur le pli de validation."""
+    import lightgbm as lgb
+
+    started = time.perf_counter()
+    full = lgb.Dataset(dataset_path, params=DATASET_PARAMS).construct()
+    train_set = full.subset(train_rows.tolist()).construct()
+    valid_set = full.subset(valid_rows.tolist()).construct()
+    booster = lgb.train({**BASE_PARAMS, **params, 'num_threads': threads}, train_set,
+                        num_boost_round=max_rounds, valid_sets=[valid_set], valid_names=['valid'],
+                        callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+    return {
+        'best_iteration': booster.best_iteration or max_rounds,
+        'auc': booster.best_score['valid']['auc'],
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def cross_validate(dataset_path, y, candidates, n_folds, jobs, max_rounds, early_stopping, seed):
+    """Évalue tous les (candidat, pli) en parallèle ; renvoie les résultats par candidat."""
+    folds = cv_folds(y, n_folds, seed)
+    tasks = [(c, f) for c in range(len(candidates)) for f in range(n_folds)]
+    jobs = max(1, min(jobs, len(tasks)))
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    print(f"🔁 {len(candidates)} candidats x {n_folds} plis : {len(tasks)} tâches, "
+          f"{jobs} processus x {threads} threads")
+
+    # spawn : le parent a déjà chargé LightGBM (pool OpenMP), un fork en hériterait dans un état incohérent
+    with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(_run_fold, dataset_path, candidates[c], *folds[f], max_rounds,
+                               early_stopping, threads): (c, f) for c, f in tasks}
+        results = [[None] * n_folds for _ in candidates]
+        for future, (c, f) in futures.items():
+            results[c][f] = future.result()
+            print(f"   candidat {c} pli {f} : AUC {results[c][f]['auc']:.4f} "
+                  f"({results[c][f]['best_iteration']} arbres, {results[c][f]['seconds']:.1f} s)")
+
+    summary = []
+    for params, folds_result in zip(candidates, results):
+        aucs = [r['auc'] for r in folds_result]
+        summary.append({
+            'params': params,
+            'cv_auc_mean': float(np.mean(aucs)),
+            'cv_auc_std': float(np.std(aucs)),
+            'n_estimators': int(round(np.mean([r['best_iteration'] for r in folds_result]))),
+            'folds': folds_result,
+        })
+    return summary
+
+
+def as_classifier(booster, params, X_train, y_train):
+    """Enveloppe un Booster dans un LGBMClassifier (format de best_model.pkl, cf. notebook 03).
+
+    Le classifieur est initialisé (classes, nombre de features) par un ajustement d'un
+    arbre sur une ligne de chaque classe, puis reçoit le Booster déjà entraîné.
+    """
+    from lightgbm import LGBMClassifier
+
+    rows = [int(np.argmax(y_train == c)) for c in (0, 1)]
+    model = LGBMClassifier(n_estimators=booster.current_iteration(), n_jobs=1, verbose=-1, **params)
+    model.fit(np.asarray(X_train[rows]), y_train[rows])
+    model._Booster = booster
+    model._best_iteration = booster.best_iteration
+    model._best_score = booster.best_score
+    return model
+
+
+def evaluate(model, X_val, y_val):
+    from sklearn.metrics import classification_report, confusion_matrix, log_loss, roc_auc_score
+
+    proba = model.predict_proba(X_val)[:, 1]
+    pred = (proba > 0.5).astype(int)
+    return {
+        'auc': float(roc_auc_score(y_val, proba)),
+        'logloss': float(log_loss(y_val, proba)),
+        'accuracy': float((pred == y_val).mean()),
+        'confusion_matrix': confusion_matrix(y_val, pred).tolist(),
+        'classification_report': classification_report(y_val, pred, output_dict=True, zero_division=0),
+    }
+
+
+def train(csv_path, output_dir, n_folds=3, jobs=None, max_rounds=2000, early_stopping=100,
+          val_size=0.2, seed=42, n_candidates=None):
+    import joblib
+    import lightgbm as lgb
+
+    started = time.perf_counter()
+    timings = {}
+    jobs = jobs or os.cpu_count() or 1
+    candidates = CANDIDATES[:n_candidates] if n_candidates else CANDIDATES
+
+    # 1-2. Données float32 (mmap) et split
+    cache_dir = ensure_cache(csv_path)
+    source_hash = _read_meta(cache_dir)['source_hash']
+    X, y, _ = load_arrays(csv_path)
+    if y is None:
+        raise SystemExit(f"❌ {csv_path} n'a pas de colonne target")
+    train_idx, val_idx = stratified_split(y, val_size, seed)
+    y_train, y_val = y[train_idx], y[val_idx]
+    timings['load_s'] = time.perf_counter() - started
+
+    # 3. Scaler par blocs + Dataset binaire en cache
+    step = time.perf_counter()
+    scaler = fit_scaler(X, train_idx)
+    key = dataset_key(source_hash, train_idx, scaler, seed)
+    work_dir = os.path.join(cache_dir, 'training', key)
+    os.makedirs(work_dir, exist_ok=True)
+    scaled_path = os.path.join(work_dir, 'train_scaled.npy')
+    dataset_path = os.path.join(work_dir, 'train.bin')
+    if os.path.exists(scaled_path) and os.path.exists(dataset_path):
+        print(f"♻️ Dataset en cache : {work_dir}")
+        X_train = np.load(scaled_path, mmap_mode='r')
+    else:
+        print("🔄 Standardisation et construction du Dataset LightGBM...")
+        X_train = write_scaled(X, train_idx, scaler, scaled_path)
+        build_dataset(X_train, y_train, dataset_path)
+    X_val = (np.asarray(X[val_idx], dtype=np.float64) - scaler.mean_) / scaler.scale_
+    timings['prepare_s'] = time.perf_counter() - step
+
+    # 4. Validation croisée parallèle
+    step = time.perf_counter()
+    summary = cross_validate(dataset_path, y_train, candidates, n_folds, jobs, max_rounds, early_stopping, seed)
+    best = max(summary, key=lambda s: s['cv_auc_mean'])
+    timings['cv_s'] = time.perf_counter() - step
+    print(f"🏆 Meilleur candidat : {best['params']} (AUC CV {best['cv_auc_mean']:.4f}, "
+          f"{best['n_estimators']} arbres)")
+
+    # 5. Modèle final (toutes les lignes de train, tous les cœurs) depuis le Dataset binaire en
+    #    cache (pas de second binning), enregistré avec n_jobs=1 comme celui du notebook
+    #    (l'API prédit dans des workers forkés, cf. gunicorn.conf.py)
+    step = time.perf_counter()
+    params = {k: v for k, v in {**BASE_PARAMS, **best['params']}.items() if k not in ('metric', 'verbosity')}
+    booster = lgb.train({**params, 'verbosity': -1, 'num_threads': os.cpu_count() or 1},
+                        lgb.Dataset(dataset_path, params=DATASET_PARAMS),
+                        num_boost_round=best['n_estimators'])
+    model = as_classifier(booster, params, X_train, y_train)
+    timings['final_fit_s'] = time.perf_counter() - step
+    validation = evaluate(model, X_val, y_val)
+    print(f"✅ ROC-AUC validation : {validation['auc']:.4f}")
+
+    # Sorties
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
+    joblib.dump(model, os.path.join(output_dir, 'best_model.pkl'))
+    with open(FEATURES_FILE, 'w') as f:
+        json.dump(FEATURE_NAMES, f)
+    timings['total_s'] = time.perf_counter() - started
+    report = {
+        'source': os.path.abspath(csv_path),
+        'source_hash': source_hash,
+        'rows': {'train': int(len(train_idx)), 'validation': int(len(val_idx))},
+        'positive_rate': {'train': float(y_train.mean()), 'validation': float(y_val.mean())},
+        'seed': seed,
+        'folds': n_folds,
+        'best': {'params': best['params'], 'n_estimators': best['n_estimators'],
+                 'cv_auc_mean': best['cv_auc_mean']},
+        'candidates': summary,
+        'validation': validation,
+        'timings': timings,
+        'env': {'python': platform.python_version(), 'lightgbm': lgb.__version__,
+                'cpus': os.cpu_count(), 'jobs': jobs},
+    }
+    with open(os.path.join(output_dir, 'training_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 scaler.pkl, best_model.pkl, training_report.json -> "
+          f"{os.path.normpath(output_dir)}, features.json -> {os.path.normpath(FEATURES_FILE)} "
+          f"({timings['total_s']:.0f} s)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default=os.path.join(ROOT, 'data', 'train.csv'))
+    parser.add_argument('--output-dir', default=os.path.join(ROOT, 'models'))
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=None, help="Processus parallèles (défaut : nb de cœurs)")
+    parser.add_argument('--max-rounds', type=int, default=2000)
+    parser.add_argument('--early-stopping', type=int, default=100)
+    parser.add_argument('--candidates', type=int, default=None, help="N premiers candidats seulement")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--publish', metavar='VERSION',
+                        help="Publie aussi le modèle comme version du registre (scripts/publish_model.py)")
+    args = parser.parse_args()
+
+    train(args.input, args.output_dir, args.folds, args.jobs, args.max_rounds, args.early_stopping,
+          seed=args.seed, n_candidates=args.candidates)
+    if args.publish:
+        from scripts.publish_model import publish_model
+
+        publish_model(os.path.join(args.output_dir, 'best_model.pkl'),
+                      os.path.join(args.output_dir, 'scaler.pkl'), args.publish)
@@ -3,10 +3,22 @@
 # 1. Lancer l'API Flask en arrière-plan (&) sur le port 5000
 # On utilise gunicorn pour la performance
 echo "🚀 Démarrage de l'API Flask..."
-gunicorn api.app:app --bind 127.0.0.1:5000 --daemon
+# Export unique des artefacts au format natif (chargement sans pickle, cf. api/inference.py)
+if [ ! -f models/best_model.txt ] || [ models/best_model.pkl -nt models/best_model.txt ]; then
+    python scripts/export_model.py
+fi
+# gunicorn.conf.py : modèle préchargé une fois dans le master (--preload), partagé par les workers
+# Workers, threads et threads LightGBM : serving.json (python scripts/calibrate_serving.py) ou 1 worker par cœur
+gunicorn -c gunicorn.conf.py api.app:app --daemon
 
-# Petit temps de pause pour être sûr que l'API est prête
-sleep 5
+# On attend que l'API réponde sur /ready (30 s max) au lieu d'un sleep fixe
+for i in $(seq 1 60); do
+    if curl -sf http://127.0.0.1:5000/ready > /dev/null; then
+        echo "✅ API prête."
+        break
+    fi
+    sleep 0.5
+done
 
 # 2. Lancer Streamlit au premier plan
 # Streamlit doit écouter sur le port fourni par Render ($PORT)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules importés comme par les scripts (api.*, scripts.*) : racine du dépôt dans le path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
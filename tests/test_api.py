@@ -0,0 +1,109 @@
+import io
+
+import numpy as np
+import pytest
+
+import api.app as api_app
+
+ROW = [0.1] * 200
+
+
+@pytest.fixture
+def client():
+    return api_app.app.test_client()
+
+
+@pytest.fixture
+def loaded():
+    if not api_app.registry.active:
+        pytest.skip("Modèle absent de models/")
+
+
+def test_predict_ok(client, loaded):
+    response = client.post('/predict', json={'features': ROW})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert 0.0 <= body['probability'] <= 1.0
+    assert body['prediction'] == int(body['probability'] > 0.5)
+
+
+def test_predict_binary_round_trip(client, loaded):
+    response = client.post('/predict', data=np.asarray([ROW], dtype='<f4').tobytes(),
+                           content_type='application/octet-stream',
+                           headers={'Accept': 'application/octet-stream'})
+    assert response.status_code == 200
+    assert response.headers['X-Rows'] == '1'
+    assert np.frombuffer(response.data, dtype='<f4').shape == (1,)
+
+
+@pytest.mark.parametrize('body', [
+    {'features': [ROW, ROW]},          # plusieurs lignes sur /predict
+    {'features': ROW[:-1]},            # mauvaise largeur
+    {'features': ['a'] * 200},         # pas des nombres
+    {'features': []},                  # vide
+    {'rows': ROW},                     # clé absente
+    [ROW],                             # pas un objet
+])
+def test_predict_invalid_json_is_400(client, loaded, body):
+    response = client.post('/predict', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_predict_empty_npy_is_400(client, loaded):
+    buffer = io.BytesIO()
+    np.save(buffer, np.zeros((0, 200), dtype=np.float32))
+    for path in ('/predict', '/predict_batch', '/explain_batch'):
+        response = client.post(path, data=buffer.getvalue(), content_type='application/x-npy')
+        assert response.status_code == 400, path
+
+
+def test_predict_unsupported_media_type_is_415(client, loaded):
+    response = client.post('/predict', data='1,2,3', content_type='text/csv')
+    assert response.status_code == 415
+    assert 'error' in response.get_json()
+
+
+def test_predict_batch_too_large_is_413(client, loaded, monkeypatch):
+    monkeypatch.setattr(api_app, 'MAX_BATCH_SIZE', 2)
+    assert client.post('/predict_batch', json={'features': [ROW] * 2}).status_code == 200
+    response = client.post('/predict_batch', json={'features': [ROW] * 3})
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('path', ['/predict', '/predict_batch', '/explain', '/predict_stream'])
+def test_model_not_loaded_is_503(client, monkeypatch, path):
+    monkeypatch.setattr(api_app.registry, 'active', None)
+    response = client.post(path, json={'features': ROW})
+    assert response.status_code == 503
+    assert response.get_json()['error'] == 'Model not loaded'
+    assert client.get('/ready').status_code == 503
+
+
+def test_scoring_error_is_500(client, loaded, monkeypatch):
+    def fail(features):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(api_app.registry.active.scorer, 'predict_proba', fail)
+    response = client.post('/predict_batch', json={'features': [ROW]})
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'boom'}
+
+
+def test_explain_non_finite_values_are_null(client, loaded):
+    row = [float('nan')] * 200
+    response = client.post('/explain', json={'features': row, 'top_k': 200})
+    assert response.status_code == 200
+    assert b'NaN' not in response.data
+    assert all(c['value'] is None for c in response.get_json()['contributions'])
+
+
+def test_explain_batch_contributions(client, loaded):
+    response = client.post('/explain_batch', json={'features': [ROW, [0.5] * 200], 'top_k': 3})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert len(results) == 2
+    for result in results:
+        contributions = [abs(c['contribution']) for c in result['contributions']]
+        assert len(contributions) == 3 and contributions == sorted(contributions, reverse=True)
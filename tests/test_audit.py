@@ -0,0 +1,68 @@
+import glob
+import gzip
+import json
+import os
+
+import numpy as np
+import pytest
+
+from api.audit import AuditLog
+
+
+def read_segments(directory):
+    records = []
+    for path in sorted(glob.glob(os.path.join(directory, 'audit-*.jsonl.gz'))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+@pytest.mark.parametrize('fsync', ['always', 'rotate', 'never'])
+def test_round_trip(tmp_path, fsync):
+    log = AuditLog(str(tmp_path), flush_interval_s=0.05, fsync=fsync)
+    rng = np.random.default_rng(0)
+    first, second = rng.normal(size=(1, 200)), rng.normal(size=(3, 200))
+    first[0, 5] = np.nan
+    assert log.record('/predict', first, [0.7], 'v1@abc', 1.5, 'req-1')
+    assert log.record('/predict_batch', second, [0.1, 0.6, 0.4], 'v1@abc', 3.0, 'req-2')
+    log.close()
+
+    assert not glob.glob(os.path.join(str(tmp_path), '*.part'))
+    records = read_segments(str(tmp_path))
+    assert [(r['request_id'], r['row']) for r in records] == [('req-1', 0), ('req-2', 0), ('req-2', 1), ('req-2', 2)]
+    assert records[0]['endpoint'] == '/predict' and records[1]['endpoint'] == '/predict_batch'
+    assert [r['prediction'] for r in records] == [1, 0, 1, 0]
+    np.testing.assert_array_equal(np.array([r['features'] for r in records]), np.vstack([first, second]))
+    np.testing.assert_array_equal([r['probability'] for r in records], [0.7, 0.1, 0.6, 0.4])
+
+    stats = log.stats()
+    assert stats['enqueued'] == stats['written'] == 4
+    assert stats['dropped'] == 0 and stats['errors'] == 0
+
+
+def test_record_copies_caller_buffer(tmp_path):
+    log = AuditLog(str(tmp_path), flush_interval_s=0.05)
+    buffer = np.zeros((1, 200))
+    log.record('/predict_stream', buffer, [0.2], 'v1', 1.0, 'req')
+    buffer[:] = 1.0  # réutilisé par l'appelant avant l'écriture
+    log.close()
+    assert read_segments(str(tmp_path))[0]['features'] == [0.0] * 200
+
+
+def test_segments_rotate_by_size(tmp_path):
+    log = AuditLog(str(tmp_path), flush_interval_s=0.05, batch_size=1, segment_max_bytes=1)
+    for i in range(3):
+        log.record('/predict', np.full((1, 200), i), [0.5], 'v1', 1.0, f'req-{i}')
+    log.close()
+    assert len(glob.glob(os.path.join(str(tmp_path), 'audit-*.jsonl.gz'))) == 3
+    assert [r['request_id'] for r in read_segments(str(tmp_path))] == ['req-0', 'req-1', 'req-2']
+
+
+def test_close_without_records_writes_nothing(tmp_path):
+    AuditLog(str(tmp_path)).close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        AuditLog(str(tmp_path), fsync='sometimes')
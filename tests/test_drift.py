@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from api.drift import PENDING_ROWS, DriftMonitor, _Window, bin_counts
+
+N_FEATURES = 20
+
+
+@pytest.fixture
+def scaler():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=N_FEATURES), rng.uniform(0.5, 2.0, size=N_FEATURES)
+
+
+def sample(scaler, n, seed=1, shift=0.0, missing=0.0):
+    mean, scale = scaler
+    rng = np.random.default_rng(seed)
+    X = mean + scale * (rng.normal(size=(n, N_FEATURES)) + shift)
+    X[rng.random(X.shape) < missing] = np.nan
+    return X
+
+
+def direct_stats(X, mean, scale):
+    """Moyenne, variance, comptes et histogramme calculés d'un bloc, sans fusion."""
+    Z = (X - mean) / scale
+    return (np.nanmean(Z, axis=0), np.nanvar(Z, axis=0, ddof=1), np.isfinite(Z).sum(axis=0), bin_counts(Z))
+
+
+def test_chan_merge_equals_single_pass(scaler):
+    mean, scale = scaler
+    X = sample(scaler, 1000, missing=0.1)
+    window = _Window(N_FEATURES)
+    for part in np.array_split(X, [1, 7, 300, 301, 900]):
+        Z = (part - mean) / scale
+        observed = np.isfinite(Z)
+        count = observed.sum(axis=0)
+        part_mean = np.divide(np.where(observed, Z, 0.0).sum(axis=0), count,
+                              out=np.zeros(N_FEATURES), where=count > 0)
+        m2 = (np.where(observed, Z - part_mean, 0.0) ** 2).sum(axis=0)
+        window.merge(len(part), count, part_mean, m2, bin_counts(Z))
+
+    expected_mean, expected_var, expected_count, expected_hist = direct_stats(X, mean, scale)
+    assert window.n == len(X)
+    np.testing.assert_array_equal(window.count, expected_count)
+    np.testing.assert_allclose(window.mean, expected_mean, atol=1e-12)
+    np.testing.assert_allclose(window.m2 / (window.count - 1), expected_var, rtol=1e-10)
+    np.testing.assert_array_equal(window.hist, expected_hist)
+
+
+@pytest.mark.parametrize('batch', [1, PENDING_ROWS - 1, PENDING_ROWS, 250])
+def test_batch_size_does_not_change_scores(scaler, batch):
+    X = sample(scaler, 1200, missing=0.05)
+    whole = DriftMonitor(*scaler, window_rows=100000)
+    whole.observe(X)
+    pieces = DriftMonitor(*scaler, window_rows=100000)
+    for start in range(0, len(X), batch):
+        pieces.observe(X[start:start + batch])
+
+    expected, got = whole.scores(), pieces.scores()
+    assert got['rows'] == expected['rows'] == len(X)
+    for key in ('count', 'missing_rate', 'z_shift', 'var_ratio', 'psi'):
+        np.testing.assert_allclose(got[key], expected[key], rtol=1e-9, atol=1e-12, err_msg=key)
+
+
+def test_missing_values_are_excluded(scaler):
+    monitor = DriftMonitor(*scaler, min_rows=1)
+    X = sample(scaler, 500)
+    X[:, 3] = np.nan
+    X[::2, 4] = np.inf
+    monitor.observe(X)
+    scores = monitor.scores()
+    assert scores['count'][3] == 0 and scores['missing_rate'][3] == 1.0
+    assert scores['count'][4] == 250 and scores['missing_rate'][4] == 0.5
+    assert np.isfinite(scores['z_shift']).all() and np.isfinite(scores['psi']).all()
+    assert 'var_3' not in monitor.report()['alerts']
+
+
+def test_shift_raises_alert_after_min_rows(scaler):
+    monitor = DriftMonitor(*scaler, min_rows=500)
+    monitor.observe(sample(scaler, 200, shift=1.0))
+    assert monitor.report()['alerts'] == []  # trop peu de lignes : bruit d'échantillonnage
+    monitor.observe(sample(scaler, 400, seed=2, shift=1.0))
+    report = monitor.report()
+    assert len(report['alerts']) == N_FEATURES
+    assert report['max_psi'] > 0.2
+
+
+def test_sliding_window_forgets_old_rows(scaler):
+    monitor = DriftMonitor(*scaler, window_rows=100, n_windows=3, min_rows=1)
+    monitor.observe(sample(scaler, 300, shift=2.0))
+    for seed in range(3, 6):
+        monitor.observe(sample(scaler, 100, seed=seed))
+    scores = monitor.scores()
+    assert monitor.total_rows == 600
+    assert scores['rows'] <= 300
+    assert np.abs(scores['z_shift']).max() < 0.5
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+
+from api.inference import Scorer, load_native_scorer
+from api.tree_engine import FlatEnsemble, check_parity, compile_booster
+
+lgb = pytest.importorskip('lightgbm')
+
+N_FEATURES = 12
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(3.0, 2.0, size=(2000, N_FEATURES))
+    y = (X[:, 0] - X[:, 1] + 0.5 * X[:, 2] * X[:, 3] + rng.normal(size=len(X)) > 3.0).astype(int)
+    X[rng.random(X.shape) < 0.05] = np.nan   # valeurs manquantes (branche par défaut)
+    X[rng.random(X.shape) < 0.05] = 0.0      # zéros exacts
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def scaler(data):
+    X, _ = data
+    return np.nanmean(X, axis=0), np.nanstd(X, axis=0)
+
+
+@pytest.fixture(scope='module')
+def booster(data, scaler):
+    X, y = data
+    mean, scale = scaler
+    params = {'objective': 'binary', 'num_leaves': 31, 'learning_rate': 0.1, 'verbosity': -1, 'seed': 0}
+    return lgb.train(params, lgb.Dataset((X - mean) / scale, label=y), num_boost_round=60)
+
+
+def rows(n, seed=1):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(3.0, 3.0, size=(n, N_FEATURES))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    X[rng.random(X.shape) < 0.05] = 0.0
+    return X
+
+
+def test_flat_matches_booster(booster, scaler):
+    mean, scale = scaler
+    X = (rows(500) - mean) / scale
+    flat = compile_booster(booster)
+    assert flat.n_trees == booster.num_trees()
+    assert check_parity(flat, booster.predict, X) < 1e-12
+
+
+def test_folded_scaler_matches_booster_on_raw_rows(booster, scaler):
+    mean, scale = scaler
+    flat = compile_booster(booster).fold_scaler(mean, scale)
+    X = rows(500, seed=2)
+    assert check_parity(flat, lambda R: booster.predict((R - mean) / scale), X) < 1e-9
+
+
+def test_save_load_round_trip(booster, tmp_path):
+    flat = compile_booster(booster)
+    path = str(tmp_path / 'flat.npz')
+    flat.save(path)
+    X = rows(100, seed=3)
+    np.testing.assert_array_equal(FlatEnsemble.load(path).predict_proba(X), flat.predict_proba(X))
+
+
+def test_check_parity_raises_beyond_tolerance(booster):
+    flat = compile_booster(booster)
+    with pytest.raises(ValueError):
+        check_parity(flat, lambda R: booster.predict(R) + 1e-3, rows(20), tol=1e-6)
+
+
+def test_scorer_flat_backend_parity_and_routing(booster, scaler, monkeypatch):
+    mean, scale = scaler
+    scorer = Scorer(booster, mean, scale, backend='flat')
+    assert scorer.backend == 'flat'
+    assert scorer.parity_error is not None and scorer.parity_error < 1e-6
+
+    reference = Scorer(booster, mean, scale)
+    X = rows(40, seed=4)
+    monkeypatch.setattr(scorer, 'flat_max_rows', 1)
+    # Une ligne : moteur plat ; lot : booster LightGBM (résultat identique au backend lightgbm)
+    np.testing.assert_allclose(scorer.predict_proba(X[:1]), reference.predict_proba(X[:1]), atol=1e-9)
+    np.testing.assert_array_equal(scorer.predict_proba(X), reference.predict_proba(X))
+
+    monkeypatch.setattr(scorer, 'flat_max_rows', 0)  # 0 : moteur plat quel que soit le lot
+    np.testing.assert_allclose(scorer.predict_proba(X), reference.predict_proba(X), atol=1e-9)
+
+
+def test_native_flat_npz_ignored_when_scaler_is_newer(booster, scaler, tmp_path):
+    mean, scale = scaler
+    model_file, params_file = str(tmp_path / 'best_model.txt'), str(tmp_path / 'scaler_params.npy')
+    booster.save_model(model_file)
+    np.save(params_file, np.vstack([mean, scale]))
+    compile_booster(booster).fold_scaler(mean, scale).save(str(tmp_path / 'best_model_flat.npz'))
+
+    # .npz à jour : chargé tel quel, sans booster ni mesure de parité
+    assert load_native_scorer(model_file, params_file, backend='flat').parity_error is None
+
+    # Scaler réécrit après l'export : l'ensemble est recompilé (et la parité mesurée)
+    later = os.path.getmtime(str(tmp_path / 'best_model_flat.npz')) + 10
+    os.utime(params_file, (later, later))
+    assert load_native_scorer(model_file, params_file, backend='flat').parity_error is not None
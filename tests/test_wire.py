@@ -0,0 +1,66 @@
+import io
+
+import numpy as np
+import pytest
+
+from api.wire import NPY, OCTET_STREAM, decode_features, encode_probabilities, is_binary
+
+
+def npy_bytes(X):
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'float64'])
+def test_octet_stream_round_trip(dtype):
+    X = np.random.default_rng(0).normal(size=(3, 200)).astype(np.dtype(dtype).newbyteorder('<'))
+    decoded = decode_features(X.tobytes(), OCTET_STREAM, dtype)
+    assert decoded.shape == (3, 200)
+    np.testing.assert_array_equal(decoded, X)
+
+
+def test_octet_stream_defaults_to_float32():
+    X = np.arange(400, dtype='<f4').reshape(2, 200)
+    np.testing.assert_array_equal(decode_features(X.tobytes(), OCTET_STREAM), X)
+
+
+def test_npy_single_row_and_matrix():
+    row = np.linspace(-1, 1, 200)
+    assert decode_features(npy_bytes(row), NPY).shape == (1, 200)
+    assert decode_features(npy_bytes(np.tile(row, (4, 1))), NPY).shape == (4, 200)
+
+
+def test_custom_width():
+    X = np.ones((2, 7), dtype='<f4')
+    assert decode_features(X.tobytes(), OCTET_STREAM, n_features=7).shape == (2, 7)
+
+
+@pytest.mark.parametrize('body, content_type, dtype', [
+    (b'', OCTET_STREAM, 'float32'),                                 # corps vide
+    (np.zeros(199, dtype='<f4').tobytes(), OCTET_STREAM, 'float32'),  # ligne tronquée
+    (np.zeros(200, dtype='<f4').tobytes(), OCTET_STREAM, 'int32'),    # dtype inconnu
+    (np.zeros(200, dtype='<f4').tobytes(), 'text/csv', 'float32'),    # Content-Type inconnu
+    (npy_bytes(np.zeros((0, 200), dtype=np.float32)), NPY, None),     # matrice sans ligne
+    (npy_bytes(np.zeros((2, 10))), NPY, None),                        # mauvaise largeur
+    (npy_bytes(np.zeros((2, 200), dtype=np.int64)), NPY, None),       # entiers
+])
+def test_invalid_bodies_raise_value_error(body, content_type, dtype):
+    with pytest.raises(ValueError):
+        decode_features(body, content_type, dtype)
+
+
+def test_npy_pickle_refused():
+    with pytest.raises(ValueError):
+        decode_features(npy_bytes(np.array([{'a': 1}], dtype=object)), NPY)
+
+
+def test_encode_probabilities_is_float32_little_endian():
+    data = encode_probabilities([0.25, 0.5, 0.75])
+    assert len(data) == 12
+    np.testing.assert_array_equal(np.frombuffer(data, dtype='<f4'), [0.25, 0.5, 0.75])
+
+
+def test_is_binary():
+    assert is_binary(OCTET_STREAM) and is_binary(NPY)
+    assert not is_binary('application/json')